@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Spec complexity and hotspot report.
+
+Measures every component schema for what makes it expensive to generate, compile and
+decode: $ref depth, fan-out and fan-in, union width and serializer strategy (from
+analyze_union), membership in a $ref cycle, the JsonElement fallbacks get_kotlin_type
+resolves to, and the size of the Kotlin it emits. Schemas are ranked by a hotspot
+score, the sum of each scored metric divided by its largest value in the spec, and
+written as a JSON and a Markdown report.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import time
+from typing import Any, Dict, Iterator, List
+
+import generate_types
+from schema_ir import OPENAPI_PATH, SchemaIR, load_ir
+
+# Metrics summed (each normalised to 0..1) into the hotspot score; emit_ms is left out so
+# the ranking is reproducible, emitted bytes stand in for generation time
+SCORED_METRICS = ("ref_depth", "fan_out", "reachable", "union_variants", "properties", "json_element_fallbacks", "bytes")
+JSON_ELEMENT_TYPES = ("JsonElement", "JsonElement?")
+
+@contextlib.contextmanager
+def counting_json_element_fallbacks() -> Iterator[List[int]]:
+    """
+    Count the get_kotlin_type calls that resolve to a bare JsonElement while the block runs.
+    The memoized helper is wrapped in place, so cache hits and recursive calls are counted too.
+    """
+    counter = [0]
+    original = generate_types.get_kotlin_type
+
+    def counting(schema: Dict[str, Any], components: Dict[str, Any]) -> str:
+        kotlin_type = original(schema, components)
+        if kotlin_type in JSON_ELEMENT_TYPES:
+            counter[0] += 1
+        return kotlin_type
+
+    generate_types.get_kotlin_type = counting
+    try:
+        yield counter
+    finally:
+        generate_types.get_kotlin_type = original
+
+def ref_depths(ir: SchemaIR) -> Dict[str, int]:
+    """Longest $ref chain below each schema, counting a $ref cycle as a single step"""
+    graph = ir.graph
+    depths: Dict[str, int] = {}
+    # SCCs come dependencies first, so every target outside the SCC already has its depth
+    for members in graph.sccs:
+        depth = 0
+        for name in members:
+            for dep in graph.edges[name]:
+                if dep not in members:
+                    depth = max(depth, depths[dep] + 1)
+        for name in members:
+            depths[name] = depth
+    return depths
+
+def analyze_schema(ir: SchemaIR, name: str, depth: int, fan_in: int) -> Dict[str, Any]:
+    node = ir.nodes[name]
+    union_variants = 0
+    serializer = None
+    if node.union_key:
+        model = generate_types.analyze_union(name, node.schema, ir.components)
+        union_variants = len(model.variants)
+        serializer = model.serializer
+
+    with counting_json_element_fallbacks() as fallbacks:
+        started = time.perf_counter()
+        fragment = generate_types.emit_schema_fragment(ir, name)
+        emit_ms = (time.perf_counter() - started) * 1000
+    code = fragment["code"]
+
+    return {
+        "schema": name,
+        "kotlin_name": node.kotlin_name,
+        "kind": node.kind,
+        "ref_depth": depth,
+        "fan_out": len(node.refs),
+        "fan_in": fan_in,
+        "reachable": len(ir.transitive_refs(name)),
+        "union_variants": union_variants,
+        "serializer": serializer,
+        "recursive": ir.graph.is_recursive(name),
+        "scc_size": len(ir.graph.scc_of(name)),
+        "properties": len((node.merged or node.schema).get("properties") or {}),
+        "json_element_fallbacks": fallbacks[0],
+        "kotlin_types": len(fragment["types"]),
+        "bytes": len(code.encode("utf-8")),
+        "lines": code.count("\n") + 1 if code else 0,
+        "emit_ms": round(emit_ms, 3),
+    }
+
+def analyze(ir: SchemaIR) -> List[Dict[str, Any]]:
+    """Metrics for every schema, worst hotspot first"""
+    depths = ref_depths(ir)
+    fan_in = {name: 0 for name in ir.nodes}
+    for node in ir.nodes.values():
+        for ref in node.refs:
+            fan_in[ref] += 1
+
+    # Warm the resolution caches so the first schemas are not charged for them
+    for name in ir.graph.order:
+        generate_types.emit_schema_fragment(ir, name)
+    rows = [analyze_schema(ir, name, depths[name], fan_in[name]) for name in ir.graph.order]
+
+    maxima = {metric: max((row[metric] for row in rows), default=0) or 1 for metric in SCORED_METRICS}
+    for row in rows:
+        row["score"] = round(sum(row[metric] / maxima[metric] for metric in SCORED_METRICS), 3)
+    rows.sort(key=lambda row: (-row["score"], row["schema"]))
+    return rows
+
+def summarize(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {
+        "schemas": len(rows),
+        "recursive_schemas": sum(row["recursive"] for row in rows),
+        "unions": sum(1 for row in rows if row["union_variants"]),
+        "json_element_fallbacks": sum(row["json_element_fallbacks"] for row in rows),
+        "bytes": sum(row["bytes"] for row in rows),
+        "lines": sum(row["lines"] for row in rows),
+        "max_ref_depth": max((row["ref_depth"] for row in rows), default=0),
+    }
+
+def render_markdown(summary: Dict[str, Any], rows: List[Dict[str, Any]], top: int) -> str:
+    lines = [
+        "# Spec complexity report",
+        "",
+        f"- Schemas: {summary['schemas']} ({summary['unions']} unions, {summary['recursive_schemas']} in $ref cycles)",
+        f"- Emitted Kotlin: {summary['lines']} lines, {summary['bytes']} bytes",
+        f"- JsonElement fallbacks: {summary['json_element_fallbacks']}",
+        f"- Deepest $ref chain: {summary['max_ref_depth']}",
+        "",
+        f"## Top {min(top, len(rows))} hotspots",
+        "",
+        "| # | Schema | Score | Depth | Fan-out | Reach | Variants | Serializer | Recursive | JsonElement | Lines | Bytes |",
+        "|---|--------|-------|-------|---------|-------|----------|------------|-----------|-------------|-------|-------|",
+    ]
+    for rank, row in enumerate(rows[:top], 1):
+        lines.append(
+            f"| {rank} | `{row['schema']}` | {row['score']:.2f} | {row['ref_depth']} | {row['fan_out']} | "
+            f"{row['reachable']} | {row['union_variants']} | {row['serializer'] or '-'} | "
+            f"{'yes' if row['recursive'] else 'no'} | {row['json_element_fallbacks']} | {row['lines']} | {row['bytes']} |"
+        )
+
+    for metric, title in (("bytes", "Largest emitted code"), ("union_variants", "Widest unions"),
+                          ("json_element_fallbacks", "Most JsonElement fallbacks"), ("ref_depth", "Deepest $ref chains"),
+                          ("fan_in", "Most referenced")):
+        worst = sorted((row for row in rows if row[metric]), key=lambda row: (-row[metric], row["schema"]))[:5]
+        if worst:
+            lines += ["", f"### {title}", ""]
+            lines += [f"- `{row['schema']}`: {row[metric]}" for row in worst]
+    return "\n".join(lines) + "\n"
+
+def main():
+    parser = argparse.ArgumentParser(description="Report per-schema complexity metrics and rank the codegen hotspots")
+    parser.add_argument("--input", "-i", default=OPENAPI_PATH, help="OpenAPI spec to analyse")
+    parser.add_argument("--json", help="write the full per-schema report to this file")
+    parser.add_argument("--markdown", help="write the ranked Markdown report to this file")
+    parser.add_argument("--top", type=int, default=20, help="hotspots listed in the Markdown report")
+    args = parser.parse_args()
+
+    # Only the checked-in spec shares the pickled IR with the generators
+    ir = load_ir(args.input, use_cache=os.path.abspath(args.input) == os.path.abspath(OPENAPI_PATH))
+    ir.naming.install()
+    rows = analyze(ir)
+    summary = summarize(rows)
+    markdown = render_markdown(summary, rows, args.top)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"input": args.input, "summary": summary, "schemas": rows}, f, indent=2)
+            f.write("\n")
+    if args.markdown:
+        with open(args.markdown, "w", encoding="utf-8") as f:
+            f.write(markdown)
+    if not args.markdown:
+        print(markdown, end="")
+    else:
+        print(f"📊 Analysed {summary['schemas']} schemas, report written to {args.markdown}")
+
+if __name__ == "__main__":
+    main()
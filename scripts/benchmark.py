@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Benchmark the code generation pipeline.
+
+Times every stage (types, mock, tests) plus a few hot functions against the real
+spec and against synthetic specs with 2x, 10x, 100x... the schema count (built by
+spec_scaler.py, optionally with deeper allOf chains, wider unions and cycles). Each run
+happens in a scratch directory, so the repository outputs and caches are left alone.
+Results are written as JSON and can be compared with a previous run via --compare.
+"""
+
+import argparse
+import contextlib
+import functools
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import generate_mock
+import generate_tests
+import generate_types
+import naming
+import schema_ir
+from codegen_cache import CACHE_DIR
+from schema_ir import OPENAPI_PATH, load_openapi
+from spec_scaler import scale_spec
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SCALES = "1,2,10,100"
+STAGE_NAMES = ("types", "mock", "tests")
+HOT_FUNCTIONS = (
+    (generate_types, "generate_kotlin_sealed_interface"),
+    (generate_mock, "generate_sample"),
+    (generate_mock, "generate_sample_for_schema"),
+)
+
+class HotFunctionTimer:
+    """
+    Replaces module-level functions with timing wrappers for the duration of a run.
+    Only outermost calls are timed, so recursive functions are not counted twice.
+    """
+
+    def __init__(self, targets: Tuple[Tuple[Any, str], ...] = HOT_FUNCTIONS):
+        self.targets = targets
+        self.stats: Dict[str, Dict[str, float]] = {}
+        self._originals: List[Tuple[Any, str, Callable[..., Any]]] = []
+
+    def _wrap(self, name: str, func: Callable[..., Any]) -> Callable[..., Any]:
+        stats = self.stats.setdefault(name, {"calls": 0, "seconds": 0.0})
+        depth = [0]
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            stats["calls"] += 1
+            if depth[0]:
+                return func(*args, **kwargs)
+            depth[0] += 1
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                stats["seconds"] += time.perf_counter() - start
+                depth[0] -= 1
+        return wrapper
+
+    def __enter__(self) -> "HotFunctionTimer":
+        for module, name in self.targets:
+            func = getattr(module, name)
+            self._originals.append((module, name, func))
+            setattr(module, name, self._wrap(name, func))
+        return self
+
+    def __exit__(self, *exc_info: Any):
+        for module, name, func in reversed(self._originals):
+            setattr(module, name, func)
+        self._originals.clear()
+
+def reset_generators():
+    """Drop all per-spec state so the next run starts cold"""
+    schema_ir.clear_ir_cache()
+    naming.clear_name_tables()
+    generate_types.reset_resolution_caches()
+    generate_mock.reset_state()
+
+def run_pipeline(scripts_dir: str, stages: Tuple[str, ...], jobs: int) -> Tuple[Dict[str, float], Dict[str, Dict[str, float]]]:
+    """Run the selected stages cold inside `scripts_dir`; returns (stage seconds, hot function stats)"""
+    reset_generators()
+    # The symbol table and output digests go to the scratch tree, never to the repository's caches
+    cache_dir = os.path.join(scripts_dir, ".cache")
+    random.seed(0)
+    timings: Dict[str, float] = {}
+    mock_files: Optional[List[str]] = None
+    previous_cwd = os.getcwd()
+    os.chdir(scripts_dir)
+    try:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull), HotFunctionTimer() as timer:
+            for stage in stages:
+                start = time.perf_counter()
+                if stage == "types":
+                    generate_types.run(no_cache=True, jobs=jobs, size_budget="off", cache_dir=cache_dir)
+                elif stage == "mock":
+                    mock_files = generate_mock.run(no_cache=True, verbose=False, cache_dir=cache_dir)
+                else:
+                    generate_tests.run(no_cache=True, mock_files=mock_files, cache_dir=cache_dir)
+                timings[stage] = time.perf_counter() - start
+    finally:
+        os.chdir(previous_cwd)
+    timings["total"] = sum(timings.values())
+    return timings, timer.stats
+
+def benchmark_scale(openapi: Dict[str, Any], factor: int, stages: Tuple[str, ...], repeat: int, jobs: int,
+                    scaler_options: Dict[str, Any]) -> Dict[str, Any]:
+    """Benchmark one spec size; stage times are the best of `repeat` runs"""
+    spec = scale_spec(openapi, factor, **scaler_options)
+    workdir = tempfile.mkdtemp(prefix=f"codegen-bench-{factor}x-")
+    try:
+        scripts_dir = os.path.join(workdir, "scripts")
+        os.makedirs(scripts_dir)
+        with open(os.path.join(scripts_dir, os.path.basename(OPENAPI_PATH)), "w", encoding="utf-8") as f:
+            json.dump(spec, f)
+
+        runs = []
+        hot_functions: Dict[str, Dict[str, float]] = {}
+        for _ in range(repeat):
+            timings, hot_functions = run_pipeline(scripts_dir, stages, jobs)
+            runs.append(timings)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "scale": factor,
+        "schemas": len(spec.get("components", {}).get("schemas", {})),
+        "methods": sum(1 for item in spec.get("paths", {}).values() if "post" in item),
+        "stages": {stage: min(run[stage] for run in runs) for stage in runs[0]},
+        "runs": runs,
+        "hot_functions": hot_functions,
+    }
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=SCRIPTS_DIR, stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_results(results: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None):
+    """Print a per-scale table of stage times, with the ratio to `baseline` when given"""
+    base_runs = {run["scale"]: run for run in (baseline or {}).get("results", [])}
+    for run in results["results"]:
+        print(f"\n📏 {run['scale']}x: {run['schemas']} schemas, {run['methods']} methods")
+        base_run = base_runs.get(run["scale"])
+        for stage, seconds in run["stages"].items():
+            line = f"   {stage:<8} {seconds:9.3f}s"
+            if base_run and stage in base_run["stages"] and base_run["stages"][stage] > 0:
+                line += f"   ({seconds / base_run['stages'][stage]:.2f}x vs baseline)"
+            print(line)
+        for name, stats in run["hot_functions"].items():
+            print(f"   ↳ {name}: {stats['calls']} calls, {stats['seconds']:.3f}s")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the code generators against the real spec and scaled synthetic specs")
+    parser.add_argument("--scales", default=DEFAULT_SCALES, help=f"comma-separated schema count multipliers (default: {DEFAULT_SCALES})")
+    parser.add_argument("--stages", default=",".join(STAGE_NAMES), help="comma-separated stages to run, in order")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per scale; the fastest is reported")
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="worker processes for type emission (hot function timings only cover the main process)")
+    parser.add_argument("--allof-depth", type=int, default=0, help="see spec_scaler.py --allof-depth")
+    parser.add_argument("--union-width", type=int, default=0, help="see spec_scaler.py --union-width")
+    parser.add_argument("--recursive", action="store_true", help="see spec_scaler.py --recursive")
+    parser.add_argument("--output", help="where to write the JSON results (default: .cache/benchmark/<commit>.json)")
+    parser.add_argument("--compare", help="previous results file to compare against")
+    args = parser.parse_args()
+
+    scales = [int(scale) for scale in args.scales.split(",") if scale.strip()]
+    stages = tuple(stage.strip() for stage in args.stages.split(",") if stage.strip())
+    unknown = [stage for stage in stages if stage not in STAGE_NAMES]
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(unknown)}")
+
+    openapi = load_openapi(os.path.join(SCRIPTS_DIR, os.path.basename(OPENAPI_PATH)))
+    commit = git_commit()
+    results = {
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "jobs": args.jobs,
+        "scaler": {"allof_depth": args.allof_depth, "union_width": args.union_width, "recursive": args.recursive},
+        "results": [],
+    }
+
+    for factor in scales:
+        print(f"⏱️  Benchmarking {factor}x spec...", flush=True)
+        results["results"].append(benchmark_scale(openapi, factor, stages, max(1, args.repeat), args.jobs, results["scaler"]))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+
+    output = args.output or os.path.join(CACHE_DIR, "benchmark", f"{(commit or 'results')[:12]}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n💾 Results written to {output}")
+
+if __name__ == "__main__":
+    main()
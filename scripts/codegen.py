@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Single-process code generation pipeline.
+
+Runs the types, mocks and tests stages in one interpreter so they share the parsed
+spec (see schema_ir.get_ir), hands the mock inventory from the mock stage straight
+to the test stage, and reports the wall time of every stage. With --changes, a
+spec_diff.py report that affects no schema or RPC method skips generation entirely;
+otherwise the per-schema caches and write-if-changed outputs limit the rewritten
+files to the affected ones.
+"""
+
+import argparse
+import os
+import sys
+import time
+from typing import Callable, List, Tuple
+
+import generate_mock
+import generate_tests
+import generate_types
+from output_writer import check_output_root, record_formatted_outputs
+from schema_ir import UnknownMethodsError, parse_method_allowlist
+from size_budget import SizeBudgetExceeded
+from tracing import add_profile_arguments, profiling, span
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(SCRIPTS_DIR)
+
+def run_stage(label: str, action: Callable[[], object], timings: List[Tuple[str, float]]) -> object:
+    """Run one pipeline stage and record its wall time"""
+    print(f"📝 {label}...")
+    start = time.perf_counter()
+    with span(label, "stage"):
+        result = action()
+    elapsed = time.perf_counter() - start
+    timings.append((label, elapsed))
+    print(f"✅ {label} done in {elapsed:.2f}s\n")
+    return result
+
+def format_kotlin() -> bool:
+    """Run ktlintFormat over the generated sources and record the formatted outputs"""
+    import subprocess
+    if subprocess.call(["./gradlew", "ktlintFormat"], cwd=REPO_ROOT) != 0:
+        return False
+    record_formatted_outputs()
+    return True
+
+def print_timings(timings: List[Tuple[str, float]]):
+    total = sum(elapsed for _, elapsed in timings)
+    width = max(len(label) for label, _ in timings)
+    print("⏱️  Stage timings:")
+    for label, elapsed in timings:
+        print(f"   {label:<{width}}  {elapsed:7.2f}s")
+    print(f"   {'Total':<{width}}  {total:7.2f}s")
+
+def main():
+    parser = argparse.ArgumentParser(description="Regenerate Kotlin types, mocks and tests from openapi.json in one process")
+    parser.add_argument("--no-cache", action="store_true", help="ignore the per-schema caches in every stage")
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="worker processes for type emission (0 = one per CPU)")
+    parser.add_argument("--shard-by", choices=generate_types.SHARD_MODES, default="none", help="see generate_types.py --shard-by")
+    parser.add_argument("--format", action="store_true", help="run ./gradlew ktlintFormat after generating")
+    parser.add_argument("--quiet", "-q", action="store_true", help="do not list every written mock file")
+    parser.add_argument("--dedupe", action="store_true", help="see generate_types.py --dedupe")
+    parser.add_argument("--size-budget", choices=generate_types.BUDGET_MODES, default="warn", help="see generate_types.py --size-budget")
+    parser.add_argument("--update-size-budget", action="store_true", help="see generate_types.py --update-size-budget")
+    parser.add_argument("--methods", type=parse_method_allowlist, help="see generate_types.py --methods (applies to every stage)")
+    parser.add_argument("--output-root", help="see generate_types.py --output-root (required with --methods)")
+    parser.add_argument("--changes", help="spec_diff.py --json report; nothing is regenerated when it affects no schema or method")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    if args.methods and args.update_size_budget:
+        parser.error("--update-size-budget records the full spec, it cannot be combined with --methods")
+    if args.format and args.output_root:
+        parser.error("--format runs ktlintFormat over the repository, not over --output-root")
+    output_root = os.path.abspath(args.output_root) if args.output_root else None
+    try:
+        check_output_root(args.methods, output_root)
+    except ValueError as e:
+        parser.error(str(e))
+    trace_path = os.path.abspath(args.profile) if args.profile else None
+    cprofile_path = os.path.abspath(args.cprofile) if args.cprofile else None
+    
+    if args.changes:
+        from spec_diff import load_change_report
+        affected = load_change_report(args.changes)["affected"]
+        if not affected["schemas"] and not affected["methods"]:
+            print(f"♻️  {args.changes} affects no schema or RPC method, nothing to regenerate")
+            return
+        print(f"🔍 {len(affected['schemas'])} schemas and {len(affected['methods'])} RPC methods affected\n")
+    
+    # The generators resolve their inputs and outputs relative to scripts/
+    os.chdir(SCRIPTS_DIR)
+    
+    print("🚀 Starting code generation...\n")
+    timings: List[Tuple[str, float]] = []
+    
+    with profiling(trace_path, cprofile_path):
+        try:
+            run_stage("Types and methods", lambda: generate_types.run(
+                no_cache=args.no_cache, jobs=args.jobs, shard_by=args.shard_by,
+                size_budget=args.size_budget, update_size_budget=args.update_size_budget, dedupe=args.dedupe,
+                methods=args.methods, output_root=output_root,
+            ), timings)
+        except (SizeBudgetExceeded, UnknownMethodsError) as e:
+            print(f"\n❌ {e}")
+            sys.exit(1)
+        mock_files = run_stage("Mock JSON files", lambda: generate_mock.run(
+            no_cache=args.no_cache, verbose=not args.quiet, methods=args.methods, output_root=output_root,
+        ), timings)
+        run_stage("Test files", lambda: generate_tests.run(
+            no_cache=args.no_cache, mock_files=mock_files, methods=args.methods, output_root=output_root,
+        ), timings)
+        
+        if args.format:
+            formatted = run_stage("ktlintFormat", format_kotlin, timings)
+            if not formatted:
+                print("⚠️ Code formatting encountered issues\n")
+    
+    print_timings(timings)
+    print("\n✨ Code generation complete!")
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 #!/bin/bash
-# Code generation pipeline: regenerates Kotlin types, mocks, tests, and formats code from openapi.json
+# Code generation pipeline: regenerates Kotlin types, mocks, tests (in one process, see codegen.py), and formats code from openapi.json
 
 set -e
 
@@ -8,40 +8,22 @@ echo ""
 
 cd "$(dirname "$0")"
 
-echo "📝 Step 1/4: Generating Kotlin types and methods..."
-python3 generate_types.py
+echo "📝 Step 1/2: Generating Kotlin types, methods, mock JSON files and tests..."
+python3 codegen.py "$@"
 if [ $? -eq 0 ]; then
-    echo "✅ Types and methods generated"
+    echo "✅ Types, methods, mocks and tests generated"
 else
-    echo "❌ Failed to generate types and methods"
+    echo "❌ Failed to generate code"
     exit 1
 fi
 echo ""
 
-echo "📝 Step 2/4: Generating mock JSON files..."
-python3 generate_mock.py
-if [ $? -eq 0 ]; then
-    echo "✅ Mock JSON files generated"
-else
-    echo "❌ Failed to generate mock JSON files"
-    exit 1
-fi
-echo ""
-
-echo "📝 Step 3/4: Generating test files..."
-python3 generate_tests.py
-if [ $? -eq 0 ]; then
-    echo "✅ Test files generated"
-else
-    echo "❌ Failed to generate test files"
-    exit 1
-fi
-echo ""
-
-echo "📝 Step 4/4: Formatting Kotlin code..."
+echo "📝 Step 2/2: Formatting Kotlin code..."
 cd ..
 ./gradlew ktlintFormat
 if [ $? -eq 0 ]; then
+    # So the next run leaves the formatted files alone while their generator output is unchanged
+    python3 scripts/output_writer.py
     echo "✅ Code formatted"
 else
     echo "⚠️ Code formatting encountered issues"
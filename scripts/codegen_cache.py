@@ -0,0 +1,90 @@
+"""
+Content-addressed cache of per-schema generator output.
+
+Each stage keeps one JSON file under scripts/.cache/ mapping a schema's content hash
+(see SchemaIR.content_hash) to whatever that stage produced for it. The file is
+tagged with a fingerprint of the generator sources, so editing a generator drops
+its cache automatically.
+"""
+import hashlib
+import json
+import os
+from typing import Any, Dict, Optional
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+CACHE_FORMAT_VERSION = 1
+
+def scoped_cache_dir(output_root: str) -> str:
+    """
+    Cache directory for the per-run state of a --methods run (symbol table, size metrics):
+    scripts/.cache/ below its output root, so the full run's state is never replaced
+    """
+    return os.path.join(output_root, "scripts", ".cache")
+
+def source_fingerprint(*paths: str) -> str:
+    """SHA-256 over the contents of the given source files"""
+    h = hashlib.sha256(str(CACHE_FORMAT_VERSION).encode("ascii"))
+    for path in paths:
+        with open(path, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+class FragmentCache:
+    """Per-stage store of generated fragments keyed by schema content hash"""
+
+    def __init__(self, stage: str, fingerprint: str, enabled: bool = True, cache_dir: str = CACHE_DIR):
+        self.stage = stage
+        self.fingerprint = fingerprint
+        self.enabled = enabled
+        self.path = os.path.join(cache_dir, f"{stage}.json")
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[str, Any] = {}
+        self._used: Dict[str, Any] = {}
+        if enabled:
+            self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("fingerprint") == self.fingerprint:
+            self._entries = data.get("entries", {})
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for `key`, or None on a miss"""
+        if not self.enabled:
+            return None
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._used[key] = value
+        return value
+
+    def put(self, key: str, value: Any):
+        """Store a freshly generated value for `key`"""
+        if self.enabled:
+            self._used[key] = value
+
+    def save(self, prune: bool = True):
+        """
+        Write the entries used by this run; anything not touched is pruned, unless `prune`
+        is off (runs that only cover part of the spec keep the other entries)
+        """
+        if not self.enabled:
+            return
+        entries = self._used if prune else {**self._entries, **self._used}
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"fingerprint": self.fingerprint, "entries": entries}, f, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+
+    def summary(self) -> str:
+        return f"{self.stage} cache: {self.hits} reused, {self.misses} regenerated"
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Long-lived code generation daemon.
+
+Keeps the generators imported and the spec IR, validators and resolution caches in
+memory between runs. It polls openapi.json and the generator sources and regenerates
+when they change (reloading the generator modules after a source edit); together with
+the per-schema caches and write-if-changed output only the affected files are rewritten.
+
+Requests are single-line commands, read from stdin or from a unix socket (--socket):
+    regenerate [types|mock|tests|all]   run the given stages (default: all)
+    status                              report what is loaded
+    quit                                stop the daemon
+Every request is answered with one JSON line. `--send CMD --socket PATH` is a tiny client
+for build tools that cannot speak to a socket directly.
+"""
+
+import argparse
+import contextlib
+import importlib
+import io
+import json
+import os
+import selectors
+import socket
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import codegen_cache
+import emitter
+import generate_mock
+import generate_tests
+import generate_types
+import lazy_spec
+import naming
+import output_writer
+import schema_ir
+import size_budget
+import symbols
+import tracing
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+STAGES = ("types", "mock", "tests")
+# Reload order: helpers before the generators that import from them
+GENERATOR_MODULES = (codegen_cache, naming, lazy_spec, schema_ir, emitter, output_writer, size_budget, symbols, tracing, generate_types, generate_mock, generate_tests)
+POLL_INTERVAL = 0.5
+
+def watched_files() -> List[str]:
+    """The spec plus every generator source"""
+    paths = [os.path.join(SCRIPTS_DIR, os.path.basename(schema_ir.OPENAPI_PATH))]
+    paths.extend(module.__file__ for module in GENERATOR_MODULES)
+    return paths
+
+def snapshot(paths: List[str]) -> Dict[str, Optional[Tuple[float, int]]]:
+    """(mtime, size) of each watched file, None if missing"""
+    result = {}
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            result[path] = (stat.st_mtime, stat.st_size)
+        except FileNotFoundError:
+            result[path] = None
+    return result
+
+class CodegenDaemon:
+    """Runs pipeline stages on request, keeping everything warm in between"""
+
+    def __init__(self, jobs: int = 1, shard_by: str = "none", verbose: bool = False, methods: Optional[Tuple[str, ...]] = None,
+                 output_root: Optional[str] = None):
+        self.jobs = jobs
+        self.shard_by = shard_by
+        self.methods = methods
+        self.output_root = output_root
+        self.verbose = verbose
+        self.runs = 0
+        self.mock_files: Optional[List[str]] = None
+        self._files = watched_files()
+        self._snapshot = snapshot(self._files)
+
+    def reload_generators(self):
+        """Re-import the generator modules (in place) after one of their sources changed"""
+        for module in GENERATOR_MODULES:
+            importlib.reload(module)
+
+    def forget_spec(self):
+        """Drop every in-memory table derived from the previous spec"""
+        schema_ir.clear_ir_cache()
+        generate_types.reset_resolution_caches()
+        generate_mock.reset_state()
+
+    def apply_changes(self) -> List[str]:
+        """Reload generators / forget the IR for whatever changed since the last check; returns the changed paths"""
+        current = snapshot(self._files)
+        changed = [path for path in self._files if current[path] != self._snapshot.get(path)]
+        self._snapshot = current
+        if changed:
+            print(f"👀 Changed: {', '.join(os.path.basename(path) for path in changed)}", file=sys.stderr)
+            if any(path.endswith(".py") for path in changed):
+                self.reload_generators()
+            self.forget_spec()
+        return changed
+
+    def check_for_changes(self) -> Optional[Dict[str, Any]]:
+        """Regenerate everything if the spec or a generator changed since the last check"""
+        if not self.apply_changes():
+            return None
+        return self.regenerate(STAGES)
+
+    def regenerate(self, stages: Tuple[str, ...]) -> Dict[str, Any]:
+        """Run the given stages in order and report their wall time and output summaries"""
+        timings: Dict[str, float] = {}
+        captured = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(sys.stderr if self.verbose else captured):
+                for stage in stages:
+                    start = time.perf_counter()
+                    if stage == "types":
+                        generate_types.run(jobs=self.jobs, shard_by=self.shard_by, methods=self.methods, output_root=self.output_root)
+                    elif stage == "mock":
+                        self.mock_files = generate_mock.run(verbose=self.verbose, methods=self.methods, output_root=self.output_root)
+                    else:
+                        generate_tests.run(mock_files=self.mock_files, methods=self.methods, output_root=self.output_root)
+                    timings[stage] = round(time.perf_counter() - start, 4)
+        except Exception as e:
+            return {"ok": False, "error": f"{type(e).__name__}: {e}", "stages": timings}
+        self.runs += 1
+        summary = [line.strip() for line in captured.getvalue().splitlines() if "outputs:" in line]
+        response = {"ok": True, "stages": timings, "total": round(sum(timings.values()), 4), "outputs": summary}
+        print(f"✅ Regenerated {'+'.join(stages)} in {response['total']:.2f}s", file=sys.stderr)
+        return response
+
+    def status(self) -> Dict[str, Any]:
+        ir = schema_ir._ir_cache.get(schema_ir.ir_cache_key(methods=self.methods))
+        return {
+            "ok": True,
+            "runs": self.runs,
+            "schemas": len(ir.nodes) if ir else None,
+            "validators": len(generate_mock._validators),
+            "mock_files": len(self.mock_files) if self.mock_files is not None else None,
+        }
+
+    def handle(self, line: str) -> Tuple[Dict[str, Any], bool]:
+        """Execute one command; returns (response, keep_running)"""
+        parts = line.split()
+        if not parts:
+            return {"ok": False, "error": "empty command"}, True
+        command, args = parts[0], parts[1:]
+        if command == "quit":
+            return {"ok": True, "bye": True}, False
+        if command == "status":
+            return self.status(), True
+        if command == "regenerate":
+            stages = STAGES if not args or args == ["all"] else tuple(args)
+            unknown = [stage for stage in stages if stage not in STAGES]
+            if unknown:
+                return {"ok": False, "error": f"unknown stages: {', '.join(unknown)}"}, True
+            # Pick up edits made since the last poll before running
+            self.apply_changes()
+            return self.regenerate(stages), True
+        return {"ok": False, "error": f"unknown command: {command}"}, True
+
+def serve(daemon: CodegenDaemon, socket_path: Optional[str], use_stdin: bool):
+    """Event loop: answer stdin/socket commands, poll the watched files in between"""
+    selector = selectors.DefaultSelector()
+    server = None
+    if socket_path:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(socket_path)
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(socket_path)
+        server.listen()
+        selector.register(server, selectors.EVENT_READ, "socket")
+        print(f"🔌 Listening on {socket_path}", file=sys.stderr)
+    if use_stdin:
+        selector.register(sys.stdin, selectors.EVENT_READ, "stdin")
+
+    running = True
+    try:
+        while running:
+            for key, _ in selector.select(timeout=POLL_INTERVAL):
+                if key.data == "stdin":
+                    line = sys.stdin.readline()
+                    if not line:
+                        selector.unregister(sys.stdin)
+                        if server is None:
+                            running = False
+                        continue
+                    response, running = daemon.handle(line)
+                    print(json.dumps(response), flush=True)
+                else:
+                    conn, _ = server.accept()
+                    with conn, conn.makefile("rw", encoding="utf-8") as stream:
+                        response, running = daemon.handle(stream.readline())
+                        stream.write(json.dumps(response) + "\n")
+            if running:
+                result = daemon.check_for_changes()
+                if result is not None and use_stdin:
+                    print(json.dumps({"event": "changed", **result}), flush=True)
+    finally:
+        if server is not None:
+            server.close()
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(socket_path)
+
+def send(socket_path: str, command: str) -> int:
+    """Send one command to a running daemon and print its JSON reply"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(socket_path)
+        client.sendall((command + "\n").encode("utf-8"))
+        with client.makefile("r", encoding="utf-8") as stream:
+            reply = stream.readline()
+    print(reply.strip())
+    return 0 if json.loads(reply).get("ok") else 1
+
+def main():
+    parser = argparse.ArgumentParser(description="Keep the code generators warm and regenerate on change or on request")
+    parser.add_argument("--socket", help="unix socket to accept commands on")
+    parser.add_argument("--no-stdin", action="store_true", help="do not read commands from stdin")
+    parser.add_argument("--send", metavar="COMMAND", help="send COMMAND to the daemon on --socket and exit")
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="worker processes for type emission (0 = one per CPU)")
+    parser.add_argument("--shard-by", choices=generate_types.SHARD_MODES, default="none", help="see generate_types.py --shard-by")
+    parser.add_argument("--methods", type=schema_ir.parse_method_allowlist, help="see generate_types.py --methods")
+    parser.add_argument("--output-root", help="see generate_types.py --output-root (required with --methods)")
+    parser.add_argument("--verbose", action="store_true", help="show the generators' own output (on stderr)")
+    args = parser.parse_args()
+
+    if args.send:
+        if not args.socket:
+            parser.error("--send needs --socket")
+        sys.exit(send(args.socket, args.send))
+    if args.no_stdin and not args.socket:
+        parser.error("--no-stdin needs --socket")
+
+    # The generators resolve their inputs and outputs relative to scripts/
+    socket_path = os.path.abspath(args.socket) if args.socket else None
+    output_root = os.path.abspath(args.output_root) if args.output_root else None
+    try:
+        output_writer.check_output_root(args.methods, output_root)
+    except ValueError as e:
+        parser.error(str(e))
+    os.chdir(SCRIPTS_DIR)
+
+    daemon = CodegenDaemon(jobs=args.jobs, shard_by=args.shard_by, verbose=args.verbose, methods=args.methods,
+                           output_root=output_root)
+    print("🔥 Warming up...", file=sys.stderr)
+    print(json.dumps({"event": "ready", **daemon.regenerate(STAGES)}), flush=True)
+    serve(daemon, socket_path, use_stdin=not args.no_stdin)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Append-only code emitter shared by the generators.
+"""
+from contextlib import contextmanager
+from typing import IO, Iterable, Iterator, List, Optional
+
+class CodeEmitter:
+    """
+    Collects generated code as a list of fragments, or writes it straight to a stream,
+    so building large files stays linear in the size of the output.
+    """
+    INDENT = "    "
+
+    def __init__(self, stream: Optional[IO[str]] = None, level: int = 0):
+        self._stream = stream
+        self._parts: List[str] = []
+        self._level = level
+        self._prefix = self.INDENT * level
+        self.length = 0
+
+    def write(self, text: str) -> "CodeEmitter":
+        """Append raw text (no indentation is added)"""
+        if text:
+            if self._stream is not None:
+                self._stream.write(text)
+            else:
+                self._parts.append(text)
+            self.length += len(text)
+        return self
+
+    def line(self, text: str = "") -> "CodeEmitter":
+        """Append one line at the current indentation; an empty line gets no indentation"""
+        if text:
+            return self.write(f"{self._prefix}{text}\n")
+        return self.write("\n")
+
+    def lines(self, texts: Iterable[str]) -> "CodeEmitter":
+        """Append several lines at the current indentation"""
+        for text in texts:
+            self.line(text)
+        return self
+
+    @contextmanager
+    def indented(self, levels: int = 1) -> Iterator["CodeEmitter"]:
+        """Indent every line() written inside the block by `levels` more steps"""
+        self._level += levels
+        self._prefix = self.INDENT * self._level
+        try:
+            yield self
+        finally:
+            self._level -= levels
+            self._prefix = self.INDENT * self._level
+
+    def getvalue(self) -> str:
+        """Everything written so far (always empty when streaming)"""
+        if len(self._parts) > 1:
+            self._parts[:] = ["".join(self._parts)]
+        return self._parts[0] if self._parts else ""
+
+    def __len__(self) -> int:
+        return self.length
@@ -1,58 +1,57 @@
+import argparse
 import json
 import os
 import random
-from typing import Any, Dict, List, Optional, Set, Tuple
+import sys
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Type
 
-import jsonschema
+import schema_ir
+from codegen_cache import CACHE_DIR, FragmentCache, source_fingerprint
+from output_writer import OutputWriter, check_output_root, relocate_output
+from symbols import load_symbols, symbols_path
+from tracing import add_profile_arguments, profiling, span, traced
+from schema_ir import SchemaIR, UnknownMethodsError, get_ir, parse_method_allowlist, resolve_ref_schema
 
-OPENAPI_PATH = "./openapi.json"
 TARGET_DIRECTORIES = [
     ("Types tests", "../types/src/test/resources/mock"),
     ("Client tests", "../client/src/test/resources/mock")
 ]
 MAX_ATTEMPTS = 5
 
-def to_kotlin_type_name(name: str) -> str:
-    """Convert schema name to Kotlin type name (PascalCase)"""
-    if not name:
-        return name
-    
-    if "_" in name:
-        parts = name.split("_")
-        processed_parts = []
-        for part in parts:
-            if part.islower():
-                processed_parts.append(part.capitalize())
-            else:
-                processed_parts.append(part)
-        return "".join(processed_parts)
-    
-    if name and name[0].islower():
-        return name[0].upper() + name[1:]
-    
-    return name
-
-def load_openapi() -> Dict[str, Any]:
-    if not os.path.exists(OPENAPI_PATH):
-        raise FileNotFoundError(f"{OPENAPI_PATH} not found")
-    with open(OPENAPI_PATH, "r", encoding="utf-8") as f:
-        return json.load(f)
-
+_ir: Optional[SchemaIR] = None
 _openapi: Optional[Dict[str, Any]] = None
 _components_schemas: Dict[str, Any] = {}
-
-def ensure_loaded():
-    global _openapi, _components_schemas
-    if _openapi is None:
-        _openapi = load_openapi()
-        _components_schemas = _openapi.get("components", {}).get("schemas", {}) or {}
-
-
-def resolve_ref_schema(ref: str, components: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-    if not ref.startswith("#/components/schemas/"):
-        return None
-    name = ref.split("/")[-1]
-    return components.get(name)
+_recursive_schemas: Set[str] = set()
+
+def ensure_loaded(use_cache: bool = True, methods: Optional[Tuple[str, ...]] = None, cache_dir: str = CACHE_DIR):
+    global _ir, _openapi, _components_schemas, _recursive_schemas
+    if _ir is None:
+        _ir = get_ir(use_cache=use_cache, methods=methods, cache_dir=cache_dir)
+        _openapi = _ir.openapi
+        _components_schemas = _ir.components
+        _recursive_schemas = _ir.graph.recursive_schemas()
+
+# Samples cached by schema content hash; only set while main() runs
+_cache: Optional[FragmentCache] = None
+# Schemas whose last sample failed validation this run (never cached)
+_failed_schemas: Set[str] = set()
+
+def cached_samples(schema_name: str, kind: str, produce: Callable[[], Any]) -> Any:
+    """
+    Return the samples generated for `schema_name`, reusing the cached ones when the
+    schema and everything it references are unchanged since the last run.
+    """
+    if _cache is None:
+        return produce()
+    key = f"{_ir.content_hash(schema_name)}:{kind}"
+    cached = _cache.get(key)
+    if cached is not None:
+        return cached["samples"]
+    _failed_schemas.discard(schema_name)
+    samples = produce()
+    if schema_name not in _failed_schemas:
+        _cache.put(key, {"samples": samples})
+    return samples
 
 def get_fallback_for_ref(ref_name: str, components: Dict[str, Any], depth: int = 0) -> Any:
     """Generate appropriate fallback values for common schema references"""
@@ -209,22 +208,30 @@ def generate_sample(schema: Dict[str, Any],
                     seen_refs: Optional[Set[str]] = None) -> Any:
     if depth > 100:  # Increased depth limit to handle complex nested schemas
         return None
-    seen_refs = seen_refs or set()
+    if seen_refs is None:
+        seen_refs = set()
 
     if schema is None:
         return None
 
     if "$ref" in schema:
         ref = schema["$ref"]
+        ref_name = ref.split("/")[-1]
         if ref in seen_refs:
             # Instead of returning None for circular refs, return a basic fallback
-            ref_name = ref.split("/")[-1]
             return get_fallback_for_ref(ref_name, components, depth + 5)  # Use high depth to get simple fallback
-        seen_refs.add(ref)
         resolved = resolve_ref_schema(ref, components)
         if resolved is None:
             return None
-        return generate_sample(resolved, components, depth + 1, seen_refs)
+        if ref_name not in _recursive_schemas:
+            # Only schemas in a $ref cycle (per the dependency graph) can recur on a path
+            return generate_sample(resolved, components, depth + 1, seen_refs)
+        # seen_refs holds the recursive refs on the current path; it is restored on the way out
+        seen_refs.add(ref)
+        try:
+            return generate_sample(resolved, components, depth + 1, seen_refs)
+        finally:
+            seen_refs.discard(ref)
 
     if "default" in schema:
         return schema["default"]
@@ -269,7 +276,7 @@ def generate_sample(schema: Dict[str, Any],
                     # Try to get the property schema from parent or choice
                     prop_schema = parent_props.get(prop_name) or choice_props.get(prop_name, {})
                     if prop_schema:
-                        prop_sample = generate_sample(prop_schema, components, depth + 1, seen_refs.copy())
+                        prop_sample = generate_sample(prop_schema, components, depth + 1, seen_refs)
                         if prop_sample is not None:
                             sample[prop_name] = prop_sample
                         # If None, we'll leave it out and let validation catch it
@@ -279,7 +286,7 @@ def generate_sample(schema: Dict[str, Any],
                 if prop_name not in sample:
                     prop_schema = choice_props.get(prop_name) or parent_props.get(prop_name, {})
                     if prop_schema:
-                        prop_sample = generate_sample(prop_schema, components, depth + 1, seen_refs.copy())
+                        prop_sample = generate_sample(prop_schema, components, depth + 1, seen_refs)
                         if prop_sample is not None:
                             sample[prop_name] = prop_sample
                         # If None, we'll leave it out and let validation catch it
@@ -332,15 +339,13 @@ def generate_sample(schema: Dict[str, Any],
                             is_nullable = True
                             break
 
-            # Create a new seen_refs copy for each property to avoid cross-property circular ref detection
-            property_seen_refs = seen_refs.copy()
-            val = generate_sample(subs, components, depth + 1, property_seen_refs)
+            val = generate_sample(subs, components, depth + 1, seen_refs)
 
             # If we got None but field is required and NOT nullable → try regenerating
             if val is None and is_required and not is_nullable:
                 # Try a few more times with different random seeds
                 for retry in range(3):
-                    val = generate_sample(subs, components, depth + 1, seen_refs.copy())
+                    val = generate_sample(subs, components, depth + 1, seen_refs)
                     if val is not None:
                         break
                 
@@ -403,7 +408,7 @@ def generate_sample(schema: Dict[str, Any],
                 if val is None and not item_sch.get("nullable", False):
                     # Try a few more times
                     for retry in range(3):
-                        val = generate_sample(item_sch, components, depth + 1, seen_refs.copy())
+                        val = generate_sample(item_sch, components, depth + 1, seen_refs)
                         if val is not None:
                             break
                     # If still None, we'll skip this item or add it anyway
@@ -412,7 +417,7 @@ def generate_sample(schema: Dict[str, Any],
             if min_items and len(arr) < min_items:
                 while len(arr) < min_items:
                     last_sch = items_schema[-1]
-                    val = generate_sample(last_sch, components, depth + 1, seen_refs.copy())
+                    val = generate_sample(last_sch, components, depth + 1, seen_refs)
                     arr.append(val)
             return arr
 
@@ -427,11 +432,11 @@ def generate_sample(schema: Dict[str, Any],
 
         arr = []
         for _ in range(count):
-            val = generate_sample(items_schema, components, depth + 1, seen_refs.copy())
+            val = generate_sample(items_schema, components, depth + 1, seen_refs)
             if val is None and not items_schema.get("nullable", False):
                 # Try a few more times
                 for retry in range(3):
-                    val = generate_sample(items_schema, components, depth + 1, seen_refs.copy())
+                    val = generate_sample(items_schema, components, depth + 1, seen_refs)
                     if val is not None:
                         break
                 # If still None after retries, keep it as None
@@ -486,6 +491,72 @@ def convert_openapi_nullable_to_jsonschema(schema):
     
     return converted
 
+# Validation state, built once per run: the nullable-converted spec, one shared resolver
+# and one compiled validator per component schema.
+_validation_root: Optional[Dict[str, Any]] = None
+_resolver: Optional[Any] = None
+_validators: Dict[str, Any] = {}
+# jsonschema.ValidationError, bound together with the resolver
+_validation_error: Type[Exception] = Exception
+
+def build_validation_root(openapi: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Build a JSON Schema compatible copy of the OpenAPI document.
+    Every component schema is converted exactly once; the original spec is left untouched.
+    """
+    components = openapi.get("components", {}) or {}
+    converted_schemas = {
+        name: convert_openapi_nullable_to_jsonschema(schema_def)
+        for name, schema_def in (components.get("schemas", {}) or {}).items()
+    }
+    return {**openapi, "components": {**components, "schemas": converted_schemas}}
+
+def get_validator(schema_name: str) -> Any:
+    """
+    Return the validator for a component schema, compiling it on first use.
+    All validators share one resolver rooted at the converted document so "#/components/..." refs resolve.
+    """
+    global _validation_root, _resolver, _validation_error
+    validator = _validators.get(schema_name)
+    if validator is not None:
+        return validator
+    
+    # Imported here so that stages and tools that never validate do not pay for jsonschema
+    import jsonschema
+    if _validation_root is None:
+        _validation_root = build_validation_root(_openapi or {})
+        _resolver = jsonschema.RefResolver.from_schema(_validation_root)
+        _validation_error = jsonschema.ValidationError
+    
+    converted_schema = _validation_root["components"]["schemas"][schema_name]
+    # choose appropriate validator class for the schema
+    ValidatorClass = jsonschema.validators.validator_for(converted_schema)
+    validator = ValidatorClass(converted_schema, resolver=_resolver)
+    _validators[schema_name] = validator
+    return validator
+
+def validation_error(schema_name: str, sample: Any) -> Optional[Exception]:
+    """Validate `sample` against the converted component schema; returns the ValidationError, or None if valid"""
+    validator = get_validator(schema_name)
+    try:
+        validator.validate(sample)
+    except _validation_error as e:
+        return e
+    return None
+
+def reset_state():
+    """Forget the loaded spec and everything derived from it, so the next run can load a different spec"""
+    global _ir, _openapi, _components_schemas, _recursive_schemas, _validation_root, _resolver
+    _ir = None
+    _openapi = None
+    _components_schemas = {}
+    _recursive_schemas = set()
+    _validation_root = None
+    _resolver = None
+    _validators.clear()
+    _failed_schemas.clear()
+
+@traced("mock")
 def generate_sample_for_schema(schema_name: str) -> Optional[Any]:
     """
     Generate a sample JSON for `schema_name` and validate it against the full schema using jsonschema.
@@ -501,44 +572,30 @@ def generate_sample_for_schema(schema_name: str) -> Optional[Any]:
     if schema.get("enum") == [None]:
         return None
 
-    # Prepare a jsonschema resolver rooted at the whole OpenAPI doc so "#/components/..." refs resolve.
-    # But first convert nullable fields to be compatible with JSON Schema
-    converted_root_doc = _openapi.copy() if _openapi else {}
-    if "components" in converted_root_doc and "schemas" in converted_root_doc["components"]:
-        converted_root_doc["components"]["schemas"] = {
-            name: convert_openapi_nullable_to_jsonschema(schema_def)
-            for name, schema_def in converted_root_doc["components"]["schemas"].items()
-        }
-    
-    resolver = jsonschema.RefResolver.from_schema(converted_root_doc)
-    
-    # Also convert the current schema for validation
-    converted_schema = convert_openapi_nullable_to_jsonschema(schema)
-
     last_error = None
     last_sample = None
 
-    # choose appropriate validator class for the schema
-    ValidatorClass = jsonschema.validators.validator_for(converted_schema)
-    # instantiate validator with schema and resolver
     for attempt in range(1, MAX_ATTEMPTS + 1):
-        sample = generate_sample(schema, _components_schemas)  # Generate from original schema
-        last_sample = sample
-        try:
-            validator = ValidatorClass(converted_schema, resolver=resolver)  # Validate against converted schema
-            validator.validate(sample)
-            # success - sample can be None for schemas that only allow null
-            return sample
-        except jsonschema.ValidationError as ve:
-            last_error = ve
+        with span(f"attempt {attempt}", "validation", schema=schema_name) as span_args:
+            sample = generate_sample(schema, _components_schemas)  # Generate from original schema
+            last_sample = sample
+            try:
+                error = validation_error(schema_name, sample)  # Validate against converted schema
+            except Exception as e:
+                # unexpected error (schema not valid for chosen validator or other issues)
+                last_error = e
+                span_args["error"] = str(e)
+                break
+            if error is None:
+                # success - sample can be None for schemas that only allow null
+                span_args["valid"] = True
+                return sample
+            last_error = error
+            span_args["valid"] = False
             # try again (randomness may produce a different valid sample)
-            continue
-        except Exception as e:
-            # unexpected error (schema not valid for chosen validator or other issues)
-            last_error = e
-            break
 
     # If we get here, attempts failed
+    _failed_schemas.add(schema_name)
     print(f"❌ Failed to generate valid sample for '{schema_name}': {last_error}")
     return last_sample  # Return last attempt even if invalid
 
@@ -551,6 +608,7 @@ def is_response_schema(schema_name: str) -> bool:
     """Check if schema name is a response schema"""
     return schema_name.startswith("JsonRpcResponse_")
 
+@traced("mock")
 def generate_response_variant(schema_name: str, variant_type: str) -> Optional[Dict[str, Any]]:
     """
     Generate a sample for a specific response variant (result or error).
@@ -644,6 +702,7 @@ def should_generate_standalone_mock(schema_name: str, schema: Dict[str, Any]) ->
     
     return False
 
+@traced("mock")
 def generate_all_oneof_variants(schema_name: str, schema: Dict[str, Any]) -> List[Tuple[str, Dict[str, Any]]]:
     """
     Generate a sample for EACH variant of a oneOf/anyOf schema.
@@ -690,28 +749,43 @@ def generate_all_oneof_variants(schema_name: str, schema: Dict[str, Any]) -> Lis
     
     return variants_list
 
-def main():
-    """Generate sample JSON files for all request and response schemas for Kotlin types"""
-    ensure_loaded()
+def write_mock_file(writer: OutputWriter, filename: str, sample: Any, inventory: Set[str], verbose: bool = True,
+                    directories: List[Tuple[str, str]] = TARGET_DIRECTORIES):
+    """Write one mock JSON file to every target directory and record it in the inventory"""
+    content = json.dumps(sample, indent=2)
+    for label, directory in directories:
+        writer.write(os.path.join(directory, filename), content)
+    inventory.add(filename)
+    if verbose:
+        print(f"✅ {filename}")
+
+def run(no_cache: bool = False, verbose: bool = True, methods: Optional[Tuple[str, ...]] = None,
+        output_root: Optional[str] = None, cache_dir: str = CACHE_DIR) -> List[str]:
+    """
+    Generate sample JSON files for all request and response schemas for Kotlin types.
+    Returns the sorted names of the mock files written (the same set in every target directory).
+    With verbose=False only failures and the summary are printed, not every written file.
+    With methods (operationIds), only the schemas those RPC methods reach get mocks, written
+    below output_root (with the repository's layout) instead of the repository.
+    Caches are read from and written to cache_dir.
+    """
+    global _cache
+    check_output_root(methods, output_root)
+    target_directories = [(label, relocate_output(directory, output_root)) for label, directory in TARGET_DIRECTORIES]
+    if _ir is not None and _ir is not get_ir(use_cache=not no_cache, methods=methods, cache_dir=cache_dir):
+        # Loaded for another spec or method scope earlier in this process
+        reset_state()
+    ensure_loaded(use_cache=not no_cache, methods=methods, cache_dir=cache_dir)
+    # Mock files are named after the Kotlin symbols the types stage emitted
+    symbols = load_symbols(symbols_path(output_root, cache_dir))
+    _cache = FragmentCache("mock", source_fingerprint(__file__, schema_ir.__file__), enabled=not no_cache, cache_dir=cache_dir)
+    inventory: Set[str] = set()
+    writer = OutputWriter("mock", cache_dir)
     
     # Create target directories if they don't exist
-    for _, directory in TARGET_DIRECTORIES:
+    for _, directory in target_directories:
         os.makedirs(directory, exist_ok=True)
     
-    # Clean up old response files (without _Success or _Error suffix)
-    print("🧹 Cleaning up old response files...")
-    total_removed = 0
-    for label, directory in TARGET_DIRECTORIES:
-        if os.path.exists(directory):
-            for filename in os.listdir(directory):
-                if filename.startswith("JsonRpcResponseFor") and filename.endswith(".json"):
-                    if not (filename.endswith("_Success.json") or filename.endswith("_Error.json")):
-                        filepath = os.path.join(directory, filename)
-                        os.remove(filepath)
-                        print(f"   Removed old file: {filename}")
-                        total_removed += 1
-    print()
-    
     # Filter schemas to only request and response types
     request_response_schemas = {
         name: schema for name, schema in _components_schemas.items()
@@ -720,7 +794,7 @@ def main():
     
     print(f"📋 Found {len(request_response_schemas)} request/response schemas")
     print(f"📁 Output directories:")
-    for label, directory in TARGET_DIRECTORIES:
+    for label, directory in target_directories:
         print(f"   {label}: {directory}")
     print()
     
@@ -728,7 +802,7 @@ def main():
     failed_count = 0
     
     for schema_name in sorted(request_response_schemas.keys()):
-        kotlin_name = to_kotlin_type_name(schema_name)
+        kotlin_name = symbols.symbol_for(schema_name, _ir.kotlin_name(schema_name))
         
         if is_response_schema(schema_name):
             # Generate both success and error variants
@@ -736,14 +810,13 @@ def main():
                 suffix = "_Success" if variant_type == "result" else "_Error"
                 filename = f"{kotlin_name}{suffix}.json"
                 
-                sample = generate_response_variant(schema_name, variant_type)
+                sample = cached_samples(
+                    schema_name, variant_type,
+                    lambda: generate_response_variant(schema_name, variant_type)
+                )
                 
                 if sample:
-                    for label, directory in TARGET_DIRECTORIES:
-                        filepath = os.path.join(directory, filename)
-                        with open(filepath, "w", encoding="utf-8") as f:
-                            json.dump(sample, f, indent=2)
-                    print(f"✅ {filename}")
+                    write_mock_file(writer, filename, sample, inventory, verbose, target_directories)
                     success_count += 1
                 else:
                     print(f"❌ Failed: {filename}")
@@ -751,16 +824,12 @@ def main():
         else:
             # Regular request schema
             filename = f"{kotlin_name}.json"
-            sample = generate_sample_for_schema(schema_name)
+            sample = cached_samples(schema_name, "sample", lambda: generate_sample_for_schema(schema_name))
             
             # sample can be None for schemas that only allow null (e.g., enum: [null])
             # Check if we successfully generated (not checking for truthiness)
             if sample is not None or _components_schemas.get(schema_name, {}).get("enum") == [None]:
-                for label, directory in TARGET_DIRECTORIES:
-                    filepath = os.path.join(directory, filename)
-                    with open(filepath, "w", encoding="utf-8") as f:
-                        json.dump(sample, f, indent=2)
-                print(f"✅ {filename}")
+                write_mock_file(writer, filename, sample, inventory, verbose, target_directories)
                 success_count += 1
             else:
                 print(f"❌ Failed: {filename}")
@@ -785,38 +854,33 @@ def main():
     variant_success = 0
     
     for schema_name in sorted(standalone_schemas.keys()):
-        kotlin_name = to_kotlin_type_name(schema_name)
+        kotlin_name = symbols.symbol_for(schema_name, _ir.kotlin_name(schema_name))
         schema = standalone_schemas[schema_name]
         
         # Check if this is a oneOf/anyOf type
         if "oneOf" in schema or "anyOf" in schema:
             # Generate samples for ALL variants
-            variants = generate_all_oneof_variants(schema_name, schema)
+            variants = cached_samples(
+                schema_name, "variants",
+                lambda: generate_all_oneof_variants(schema_name, schema)
+            )
             
             if variants:
                 for variant_name, variant_sample in variants:
                     filename = f"{variant_name}.json"
-                    for label, directory in TARGET_DIRECTORIES:
-                        filepath = os.path.join(directory, filename)
-                        with open(filepath, "w", encoding="utf-8") as f:
-                            json.dump(variant_sample, f, indent=2)
-                    print(f"✅ {filename}")
+                    write_mock_file(writer, filename, variant_sample, inventory, verbose, target_directories)
                     variant_success += 1
             else:
                 print(f"⚠️  No variants generated for: {kotlin_name}")
         else:
             # Regular type (struct, enum, etc.)
             filename = f"{kotlin_name}.json"
-            sample = generate_sample_for_schema(schema_name)
+            sample = cached_samples(schema_name, "sample", lambda: generate_sample_for_schema(schema_name))
             
             # sample can be None for schemas that only allow null (e.g., enum: [null])
             # Check if we successfully generated (not checking for truthiness)
             if sample is not None or _components_schemas.get(schema_name, {}).get("enum") == [None]:
-                for label, directory in TARGET_DIRECTORIES:
-                    filepath = os.path.join(directory, filename)
-                    with open(filepath, "w", encoding="utf-8") as f:
-                        json.dump(sample, f, indent=2)
-                print(f"✅ {filename}")
+                write_mock_file(writer, filename, sample, inventory, verbose, target_directories)
                 standalone_success += 1
             else:
                 print(f"❌ Failed: {filename}")
@@ -825,20 +889,56 @@ def main():
     print()
     print(f"✨ Standalone type generation complete! Generated {standalone_success} regular + {variant_success} variant files")
     
+    # Anything left in the mock directories that this run did not produce is stale
+    print()
+    print("🧹 Removing orphaned mock files...")
+    for label, directory in target_directories:
+        for path in writer.remove_orphans(directory, lambda path: path.endswith(".json")):
+            print(f"   Removed old file: {path}")
+    
+    # A --methods run must not evict the samples of schemas outside its scope
+    _cache.save(prune=not methods)
+    writer.save()
+    
     print()
     print(f"📊 Summary:")
+    if _cache.enabled:
+        print(f"   ♻️  {_cache.summary()}")
+    print(f"   📝 {writer.summary()}")
     print(f"   Request/Response: {success_count} files")
     print(f"   Standalone types: {standalone_success} files")
     print(f"   OneOf/AnyOf variants: {variant_success} files")
     print(f"   Total: {success_count + standalone_success + variant_success} files")
     print()
     print("📂 Files saved to:")
-    for label, directory in TARGET_DIRECTORIES:
+    for label, directory in target_directories:
         print(f"   {label}: {directory}")
     print()
     print("🎉 All done! Mock JSON files are ready for testing.")
     print()
     print("💡 Variant files significantly improve coverage by testing all enum cases!")
+    
+    return sorted(inventory)
+
+def main():
+    """Command-line entry point"""
+    parser = argparse.ArgumentParser(description="Generate mock JSON files from the OpenAPI spec")
+    parser.add_argument("--no-cache", action="store_true", help="regenerate every sample instead of reusing cached ones")
+    parser.add_argument("--quiet", "-q", action="store_true", help="do not list every written file")
+    parser.add_argument("--methods", type=parse_method_allowlist, help="see generate_types.py --methods")
+    parser.add_argument("--output-root", help="see generate_types.py --output-root")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    try:
+        check_output_root(args.methods, args.output_root)
+    except ValueError as e:
+        parser.error(str(e))
+    try:
+        with profiling(args.profile, args.cprofile), span("mock", "stage"):
+            run(no_cache=args.no_cache, verbose=not args.quiet, methods=args.methods, output_root=args.output_root)
+    except UnknownMethodsError as e:
+        print(f"\n❌ {e}")
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
@@ -3,42 +3,23 @@
 Generates Kotlin test files from OpenAPI schema and mock JSON files.
 """
 
-import json
+import argparse
 import os
-from typing import Any, Dict, List, Optional, Set
+import sys
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from codegen_cache import CACHE_DIR
+from emitter import CodeEmitter
+from output_writer import OutputWriter, check_output_root, relocate_output
+from symbols import SymbolTable, load_symbols, symbols_path
+from tracing import add_profile_arguments, profiling, span
+from schema_ir import SchemaIR, UnknownMethodsError, get_ir, parse_method_allowlist, to_kotlin_type_name
 
-OPENAPI_PATH = "./openapi.json"
 OUTPUT_TYPES_TEST_PATH = "../types/src/test/kotlin/org/near/jsonrpc/types/TypesMockValidationTest.kt"
 OUTPUT_CLIENT_TEST_PATH = "../client/src/test/kotlin/org/near/jsonrpc/client/ClientMockValidationTest.kt"
 MOCK_DIRECTORY_TYPES = "../types/src/test/resources/mock"
 MOCK_DIRECTORY_CLIENT = "../client/src/test/resources/mock"
 
-def load_openapi() -> Dict[str, Any]:
-    if not os.path.exists(OPENAPI_PATH):
-        raise FileNotFoundError(f"{OPENAPI_PATH} not found")
-    with open(OPENAPI_PATH, "r", encoding="utf-8") as f:
-        return json.load(f)
-
-def to_kotlin_type_name(name: str) -> str:
-    """Convert schema name to Kotlin type name (PascalCase)"""
-    if not name:
-        return name
-    
-    if "_" in name:
-        parts = name.split("_")
-        processed_parts = []
-        for part in parts:
-            if part.islower():
-                processed_parts.append(part.capitalize())
-            else:
-                processed_parts.append(part)
-        return "".join(processed_parts)
-    
-    if name and name[0].islower():
-        return name[0].upper() + name[1:]
-    
-    return name
-
 def get_mock_files(directory: str) -> List[str]:
     """Get all mock JSON files in a directory"""
     if not os.path.exists(directory):
@@ -78,12 +59,136 @@ def get_kotlin_deserializer_call(type_name: str, schema: Dict[str, Any]) -> str:
     # For objects and unions
     return f"json.decodeFromString<{kotlin_name}>(jsonContent)"
 
-def generate_types_test_file(openapi: Dict[str, Any]) -> str:
-    """Generate the TypesMockValidationTest.kt file"""
-    components_schemas = openapi.get("components", {}).get("schemas", {})
-    
-    # Get all mock files
-    mock_files = get_mock_files(MOCK_DIRECTORY_TYPES)
+def render_primitive_type_test(kotlin_name: str, mock_file: str) -> str:
+    """Render the test block for one primitive typealias"""
+    return f'''        // Test {kotlin_name}
+        try {{
+            val file = File(mockDirectory, "{mock_file}")
+            if (file.exists()) {{
+                val jsonContent = file.readText()
+                val value = json.decodeFromString<{kotlin_name}>(jsonContent)
+                assertNotNull(value, "{kotlin_name} should not be null")
+                successCount++
+                println("✅ {kotlin_name}")
+            }}
+        }} catch (e: Exception) {{
+            println("❌ {kotlin_name}: ${{e.message}}")
+            failureCount++
+        }}
+        
+'''
+
+def render_enum_type_test(kotlin_name: str, mock_file: str) -> str:
+    """Render the test block for one enum type"""
+    return f'''        // Test {kotlin_name}
+        try {{
+            val file = File(mockDirectory, "{mock_file}")
+            if (file.exists()) {{
+                val jsonContent = file.readText()
+                val value = json.decodeFromString<{kotlin_name}>(jsonContent)
+                assertNotNull(value, "{kotlin_name} should not be null")
+                successCount++
+                println("✅ {kotlin_name} = $value")
+            }}
+        }} catch (e: Exception) {{
+            println("❌ {kotlin_name}: ${{e.message}}")
+            failureCount++
+        }}
+        
+'''
+
+def render_data_class_type_test(kotlin_name: str, mock_file: str) -> str:
+    """Render the test block for one data class type"""
+    return f'''        // Test {kotlin_name}
+        try {{
+            val file = File(mockDirectory, "{mock_file}")
+            if (file.exists()) {{
+                val jsonContent = file.readText()
+                val value = json.decodeFromString<{kotlin_name}>(jsonContent)
+                assertNotNull(value, "{kotlin_name} should not be null")
+                
+                // Verify round-trip serialization
+                val encoded = json.encodeToString(value)
+                val decoded = json.decodeFromString<{kotlin_name}>(encoded)
+                assertNotNull(decoded, "{kotlin_name} round-trip should work")
+                
+                successCount++
+                println("✅ {kotlin_name}")
+            }}
+        }} catch (e: Exception) {{
+            println("❌ {kotlin_name}: ${{e.message}}")
+            failureCount++
+        }}
+        
+'''
+
+def render_sealed_interface_type_test(kotlin_name: str, mock_file: str) -> str:
+    """Render the test block for one sealed interface type"""
+    return f'''        // Test {kotlin_name}
+        try {{
+            val file = File(mockDirectory, "{mock_file}")
+            if (file.exists()) {{
+                val jsonContent = file.readText()
+                val value = json.decodeFromString<{kotlin_name}>(jsonContent)
+                assertNotNull(value, "{kotlin_name} should not be null")
+                successCount++
+                println("✅ {kotlin_name}")
+            }}
+        }} catch (e: Exception) {{
+            println("❌ {kotlin_name}: ${{e.message}}")
+            failureCount++
+        }}
+        
+'''
+
+def render_comprehensive_type_test(kotlin_name: str, mock_file: str) -> str:
+    """Render the comprehensive round-trip test block for one type"""
+    out = CodeEmitter()
+    out.line(f'        // Test {kotlin_name}')
+    out.line('        try {')
+    out.line(f'            val file = File(mockDirectory, "{mock_file}")')
+    out.line('            if (file.exists()) {')
+    out.line('                val jsonContent = file.readText()')
+    out.line(f'                val value = json.decodeFromString<{kotlin_name}>(jsonContent)')
+    out.line(f'                assertNotNull(value, "{kotlin_name} should not be null")')
+    out.line('                ')
+    out.line('                // Round-trip test: deserialize -> serialize -> deserialize -> verify')
+    out.line('                try {')
+    out.line(f'                    val serialized = json.encodeToString<{kotlin_name}>(value)')
+    out.line(f'                    val deserialized = json.decodeFromString<{kotlin_name}>(serialized)')
+    out.line(f'                    assertNotNull(deserialized, "{kotlin_name} round-trip should work")')
+    out.line('                    ')
+    out.line('                    // Test value properties/methods to improve coverage')
+    out.line('                    try {')
+    out.line('                        value.toString() // Exercise toString')
+    out.line('                        value.hashCode() // Exercise hashCode')
+    out.line('                        value.equals(value) // Exercise equals')
+    out.line('                    } catch (e: Exception) {')
+    out.line('                        // Some types may have issues, skip')
+    out.line('                    }')
+    out.line('                } catch (e: Exception) {')
+    out.line('                    // Some types may have serialization issues, but deserialization worked')
+    out.line(f'                    println("⚠️  {kotlin_name} deserialized OK, but serialization failed: ${{e.message}}")')
+    out.line('                }')
+    out.line('                ')
+    out.line('                successCount++')
+    out.line(f'                println("✅ {kotlin_name}")')
+    out.line('            }')
+    out.line('        } catch (e: Exception) {')
+    out.line(f'            println("❌ {kotlin_name}: ${{e.message}}")')
+    out.line(f'            failures.add("{kotlin_name}: ${{e.message}}")')
+    out.line('            failureCount++')
+    out.line('        }')
+    out.line('        ')
+    return out.getvalue()
+
+def generate_types_test_file(ir: SchemaIR, mock_files: Optional[List[str]] = None, symbols: Optional[SymbolTable] = None) -> str:
+    """Generate the TypesMockValidationTest.kt file; Kotlin names come from the types stage's symbol table"""
+    if symbols is None:
+        symbols = load_symbols()
+    # Get all mock files (unless the mock stage already handed them over)
+    if mock_files is None:
+        mock_files = get_mock_files(MOCK_DIRECTORY_TYPES)
     
     # Filter to non-request/response types
     type_mock_files = [f for f in mock_files 
@@ -97,30 +202,33 @@ def generate_types_test_file(openapi: Dict[str, Any]) -> str:
     union_types = []
     
     # Also collect ALL types with mocks for comprehensive testing
+    kotlin_names = {name: symbols.symbol_for(name, node.kotlin_name) for name, node in ir.nodes.items()}
     all_types_with_mocks = []
     for mock_file in type_mock_files:
         if "Variant" not in mock_file:  # Skip variant files for now
             kotlin_name = mock_file.replace(".json", "")
             all_types_with_mocks.append((kotlin_name, mock_file))
     
-    for schema_name, schema in components_schemas.items():
-        kotlin_name = to_kotlin_type_name(schema_name)
+    categories = {
+        "enum": enum_types,
+        "union": union_types,
+        "object": object_types,
+        "primitive": primitive_types,
+    }
+    for schema_name, node in ir.nodes.items():
+        kotlin_name = kotlin_names[schema_name]
         mock_file = f"{kotlin_name}.json"
         
         if mock_file not in type_mock_files:
             continue
         
-        if is_enum_type(schema):
-            enum_types.append((schema_name, kotlin_name, mock_file))
-        elif is_union_type(schema):
-            union_types.append((schema_name, kotlin_name, mock_file))
-        elif is_object_type(schema):
-            object_types.append((schema_name, kotlin_name, mock_file))
-        elif is_primitive_type(schema):
-            primitive_types.append((schema_name, kotlin_name, mock_file))
+        category = categories.get(node.kind)
+        if category is not None:
+            category.append((kotlin_name, mock_file))
     
     # Generate test file
-    code = '''package org.near.jsonrpc.types
+    out = CodeEmitter()
+    out.write('''package org.near.jsonrpc.types
 
 import java.io.File
 import kotlin.test.Test
@@ -197,145 +305,79 @@ class TypesMockValidationTest {
         }
     }
 
-'''
+''')
     
     # Generate tests for primitive types
     if primitive_types:
-        code += '''    @Test
+        out.write('''    @Test
     fun `validate primitive type aliases`() {
         if (!mockDirectory.exists()) return
         
         var successCount = 0
         var failureCount = 0
         
-'''
-        for schema_name, kotlin_name, mock_file in primitive_types:
-            code += f'''        // Test {kotlin_name}
-        try {{
-            val file = File(mockDirectory, "{mock_file}")
-            if (file.exists()) {{
-                val jsonContent = file.readText()
-                val value = json.decodeFromString<{kotlin_name}>(jsonContent)
-                assertNotNull(value, "{kotlin_name} should not be null")
-                successCount++
-                println("✅ {kotlin_name}")
-            }}
-        }} catch (e: Exception) {{
-            println("❌ {kotlin_name}: ${{e.message}}")
-            failureCount++
-        }}
-        
-'''
-        code += '''        println("\\n📊 Primitive Types: $successCount passed, $failureCount failed")
+''')
+        for kotlin_name, mock_file in primitive_types:
+            out.write(render_primitive_type_test(kotlin_name, mock_file))
+        out.write('''        println("\\n📊 Primitive Types: $successCount passed, $failureCount failed")
         assertTrue(successCount > 0, "Should validate at least some primitive types")
     }
 
-'''
+''')
     
     # Generate tests for enum types
     if enum_types:
-        code += '''    @Test
+        out.write('''    @Test
     fun `validate enum types`() {
         if (!mockDirectory.exists()) return
         
         var successCount = 0
         var failureCount = 0
         
-'''
-        for schema_name, kotlin_name, mock_file in enum_types:
-            code += f'''        // Test {kotlin_name}
-        try {{
-            val file = File(mockDirectory, "{mock_file}")
-            if (file.exists()) {{
-                val jsonContent = file.readText()
-                val value = json.decodeFromString<{kotlin_name}>(jsonContent)
-                assertNotNull(value, "{kotlin_name} should not be null")
-                successCount++
-                println("✅ {kotlin_name} = $value")
-            }}
-        }} catch (e: Exception) {{
-            println("❌ {kotlin_name}: ${{e.message}}")
-            failureCount++
-        }}
-        
-'''
-        code += '''        println("\\n📊 Enum Types: $successCount passed, $failureCount failed")
+''')
+        for kotlin_name, mock_file in enum_types:
+            out.write(render_enum_type_test(kotlin_name, mock_file))
+        out.write('''        println("\\n📊 Enum Types: $successCount passed, $failureCount failed")
         assertTrue(successCount > 0, "Should validate at least some enum types")
     }
 
-'''
+''')
     
     # Generate tests for object types (data classes)
     if object_types:
-        code += '''    @Test
+        out.write('''    @Test
     fun `validate data class types`() {
         if (!mockDirectory.exists()) return
         
         var successCount = 0
         var failureCount = 0
         
-'''
-        for schema_name, kotlin_name, mock_file in object_types[:20]:  # Limit to first 20 to keep test file reasonable
-            code += f'''        // Test {kotlin_name}
-        try {{
-            val file = File(mockDirectory, "{mock_file}")
-            if (file.exists()) {{
-                val jsonContent = file.readText()
-                val value = json.decodeFromString<{kotlin_name}>(jsonContent)
-                assertNotNull(value, "{kotlin_name} should not be null")
-                
-                // Verify round-trip serialization
-                val encoded = json.encodeToString(value)
-                val decoded = json.decodeFromString<{kotlin_name}>(encoded)
-                assertNotNull(decoded, "{kotlin_name} round-trip should work")
-                
-                successCount++
-                println("✅ {kotlin_name}")
-            }}
-        }} catch (e: Exception) {{
-            println("❌ {kotlin_name}: ${{e.message}}")
-            failureCount++
-        }}
-        
-'''
-        code += '''        println("\\n📊 Data Class Types: $successCount passed, $failureCount failed")
+''')
+        for kotlin_name, mock_file in object_types[:20]:  # Limit to first 20 to keep test file reasonable
+            out.write(render_data_class_type_test(kotlin_name, mock_file))
+        out.write('''        println("\\n📊 Data Class Types: $successCount passed, $failureCount failed")
         assertTrue(successCount > 0, "Should validate at least some data class types")
     }
 
-'''
+''')
     
     # Generate tests for union types (sealed interfaces)
     if union_types:
-        code += '''    @Test
+        out.write('''    @Test
     fun `validate sealed interface types`() {
         if (!mockDirectory.exists()) return
         
         var successCount = 0
         var failureCount = 0
         
-'''
-        for schema_name, kotlin_name, mock_file in union_types[:15]:  # Limit to first 15
-            code += f'''        // Test {kotlin_name}
-        try {{
-            val file = File(mockDirectory, "{mock_file}")
-            if (file.exists()) {{
-                val jsonContent = file.readText()
-                val value = json.decodeFromString<{kotlin_name}>(jsonContent)
-                assertNotNull(value, "{kotlin_name} should not be null")
-                successCount++
-                println("✅ {kotlin_name}")
-            }}
-        }} catch (e: Exception) {{
-            println("❌ {kotlin_name}: ${{e.message}}")
-            failureCount++
-        }}
-        
-'''
-        code += '''        println("\\n📊 Sealed Interface Types: $successCount passed, $failureCount failed")
+''')
+        for kotlin_name, mock_file in union_types[:15]:  # Limit to first 15
+            out.write(render_sealed_interface_type_test(kotlin_name, mock_file))
+        out.write('''        println("\\n📊 Sealed Interface Types: $successCount passed, $failureCount failed")
         // Note: Some sealed interfaces may not have mock files, so we don't assert success count
     }
 
-'''
+''')
     
     # Generate comprehensive tests for ALL types with mocks - split into batches
     # This is the key to achieving 80% coverage!
@@ -349,65 +391,30 @@ class TypesMockValidationTest {
             batch = all_types_with_mocks[start_idx:end_idx]
             batch_num = batch_idx + 1
             
-            code += f'    @Test\n'
-            code += f'    fun `comprehensive type deserialization batch {batch_num}`() {{\n'
-            code += '        // Test ALL types with mock files - this achieves comprehensive coverage\n'
-            code += '        if (!mockDirectory.exists()) return\n'
-            code += '        \n'
-            code += '        var successCount = 0\n'
-            code += '        var failureCount = 0\n'
-            code += '        val failures = mutableListOf<String>()\n'
-            code += '        \n'
+            out.line('    @Test')
+            out.line(f'    fun `comprehensive type deserialization batch {batch_num}`() {{')
+            out.line('        // Test ALL types with mock files - this achieves comprehensive coverage')
+            out.line('        if (!mockDirectory.exists()) return')
+            out.line('        ')
+            out.line('        var successCount = 0')
+            out.line('        var failureCount = 0')
+            out.line('        val failures = mutableListOf<String>()')
+            out.line('        ')
             
             for kotlin_name, mock_file in batch:
-                code += f'        // Test {kotlin_name}\n'
-                code += '        try {\n'
-                code += f'            val file = File(mockDirectory, "{mock_file}")\n'
-                code += '            if (file.exists()) {\n'
-                code += '                val jsonContent = file.readText()\n'
-                code += f'                val value = json.decodeFromString<{kotlin_name}>(jsonContent)\n'
-                code += f'                assertNotNull(value, "{kotlin_name} should not be null")\n'
-                code += '                \n'
-                code += '                // Round-trip test: deserialize -> serialize -> deserialize -> verify\n'
-                code += '                try {\n'
-                code += f'                    val serialized = json.encodeToString<{kotlin_name}>(value)\n'
-                code += f'                    val deserialized = json.decodeFromString<{kotlin_name}>(serialized)\n'
-                code += f'                    assertNotNull(deserialized, "{kotlin_name} round-trip should work")\n'
-                code += '                    \n'
-                code += '                    // Test value properties/methods to improve coverage\n'
-                code += '                    try {\n'
-                code += '                        value.toString() // Exercise toString\n'
-                code += '                        value.hashCode() // Exercise hashCode\n'
-                code += '                        value.equals(value) // Exercise equals\n'
-                code += '                    } catch (e: Exception) {\n'
-                code += '                        // Some types may have issues, skip\n'
-                code += '                    }\n'
-                code += '                } catch (e: Exception) {\n'
-                code += '                    // Some types may have serialization issues, but deserialization worked\n'
-                code += f'                    println("⚠️  {kotlin_name} deserialized OK, but serialization failed: ${{e.message}}")\n'
-                code += '                }\n'
-                code += '                \n'
-                code += '                successCount++\n'
-                code += f'                println("✅ {kotlin_name}")\n'
-                code += '            }\n'
-                code += '        } catch (e: Exception) {\n'
-                code += f'            println("❌ {kotlin_name}: ${{e.message}}")\n'
-                code += f'            failures.add("{kotlin_name}: ${{e.message}}")\n'
-                code += '            failureCount++\n'
-                code += '        }\n'
-                code += '        \n'
+                out.write(render_comprehensive_type_test(kotlin_name, mock_file))
             
-            code += f'        println("\\n📊 Comprehensive Batch {batch_num}: $successCount passed, $failureCount failed")\n'
-            code += f'        assertTrue(successCount > 0, "Should test at least some types in batch {batch_num}")\n'
-            code += '        if (failures.isNotEmpty() && failures.size < 20) {\n'
-            code += '            println("\\n⚠️ Failures:")\n'
-            code += '            failures.forEach { println("   $it") }\n'
-            code += '        }\n'
-            code += '    }\n'
-            code += '    \n'
+            out.write(f'        println("\\n📊 Comprehensive Batch {batch_num}: $successCount passed, $failureCount failed")\n')
+            out.line(f'        assertTrue(successCount > 0, "Should test at least some types in batch {batch_num}")')
+            out.line('        if (failures.isNotEmpty() && failures.size < 20) {')
+            out.write('            println("\\n⚠️ Failures:")\n')
+            out.line('            failures.forEach { println("   $it") }')
+            out.line('        }')
+            out.line('    }')
+            out.line('    ')
     
     # Generate test for variant files
-    code += '''    @Test
+    out.write('''    @Test
     fun `validate oneOf anyOf variant files`() {
         if (!mockDirectory.exists()) return
         
@@ -468,16 +475,15 @@ class TypesMockValidationTest {
         assertTrue(allFiles.isNotEmpty(), "Should have generated mock files")
     }
 }
-'''
+''')
     
-    return code
+    return out.getvalue()
 
-def generate_client_test_file(openapi: Dict[str, Any]) -> str:
+def generate_client_test_file(ir: SchemaIR, mock_files: Optional[List[str]] = None) -> str:
     """Generate the ClientMockValidationTest.kt file"""
-    components_schemas = openapi.get("components", {}).get("schemas", {})
-    
-    # Get all mock files
-    mock_files = get_mock_files(MOCK_DIRECTORY_CLIENT)
+    # Get all mock files (unless the mock stage already handed them over)
+    if mock_files is None:
+        mock_files = get_mock_files(MOCK_DIRECTORY_CLIENT)
     
     # Filter request and response types
     request_files = [f for f in mock_files if f.startswith("JsonRpcRequest")]
@@ -488,15 +494,14 @@ def generate_client_test_file(openapi: Dict[str, Any]) -> str:
     error_response_files = [f for f in response_files if f.endswith("_Error.json")]
     
     # Extract method names from paths
-    paths = openapi.get("paths", {})
     methods = []
-    for path, path_item in paths.items():
-        if "post" in path_item:
-            operation_id = path_item["post"].get("operationId", "")
-            if operation_id:
-                methods.append(operation_id)
+    for path, post_op in ir.methods():
+        operation_id = post_op.get("operationId", "")
+        if operation_id:
+            methods.append(operation_id)
     
-    code = '''package org.near.jsonrpc.client
+    out = CodeEmitter()
+    out.write('''package org.near.jsonrpc.client
 
 import kotlinx.serialization.json.Json
 import kotlinx.serialization.json.jsonObject
@@ -531,10 +536,10 @@ class ClientMockValidationTest {
         )
     }
     
-'''
+''')
     
     # Generate test for all request files
-    code += '''    @Test
+    out.write('''    @Test
     fun `all request JSON files have valid JSON-RPC structure`() {
         if (!mockDirectory.exists()) {
             println("⚠️ Mock directory not found. Run generate_mock.py first.")
@@ -586,10 +591,10 @@ class ClientMockValidationTest {
         }
     }
     
-'''
+''')
     
     # Generate test for all response files
-    code += '''    @Test
+    out.write('''    @Test
     fun `all response JSON files have valid JSON-RPC structure`() {
         if (!mockDirectory.exists()) {
             println("⚠️ Mock directory not found. Run generate_mock.py first.")
@@ -656,10 +661,10 @@ class ClientMockValidationTest {
         }
     }
     
-'''
+''')
     
     # Generate test for success responses
-    code += '''    @Test
+    out.write('''    @Test
     fun `all success response files have result field`() {
         if (!mockDirectory.exists()) return
         
@@ -693,10 +698,10 @@ class ClientMockValidationTest {
         assertTrue(validCount == successFiles.size, "All success responses should be valid")
     }
     
-'''
+''')
     
     # Generate test for error responses
-    code += '''    @Test
+    out.write('''    @Test
     fun `all error response files have error field with code and message`() {
         if (!mockDirectory.exists()) return
         
@@ -735,11 +740,11 @@ class ClientMockValidationTest {
         assertTrue(validCount == errorFiles.size, "All error responses should be valid")
     }
     
-'''
+''')
     
     # Generate test for method-specific responses
     if methods:
-        code += f'''    @Test
+        out.write(f'''    @Test
     fun `validate method-specific response structures`() {{
         if (!mockDirectory.exists()) return
         
@@ -781,111 +786,111 @@ class ClientMockValidationTest {
         println("\\n📊 Method-specific responses: $foundCount found and validated")
     }}
     
-'''
+''')
     
     # Add comprehensive method testing with request/response pairs
     # This tests all 31 RPC methods by deserializing their request and response types
     if methods:
-        code += '    @Test\n'
-        code += '    fun `test all RPC methods request and response deserialization`() {\n'
-        code += '        // This test validates all 31 RPC method request/response types\n'
-        code += '        if (!mockDirectory.exists()) return\n'
-        code += '        \n'
-        code += '        val allMethods = listOf(\n'
+        out.line('    @Test')
+        out.line('    fun `test all RPC methods request and response deserialization`() {')
+        out.line('        // This test validates all 31 RPC method request/response types')
+        out.line('        if (!mockDirectory.exists()) return')
+        out.line('        ')
+        out.line('        val allMethods = listOf(')
         for i, method in enumerate(methods):
             comma = ',' if i < len(methods) - 1 else ''
-            code += f'            "{method}"{comma}\n'
-        code += '        )\n'
-        code += '        \n'
-        code += '        var requestSuccessCount = 0\n'
-        code += '        var responseSuccessCount = 0\n'
-        code += '        var failureCount = 0\n'
-        code += '        val failures = mutableListOf<String>()\n'
-        code += '        \n'
-        code += '        println("\\n🧪 Testing all ${allMethods.size} RPC methods...")\n'
-        code += '        \n'
-        code += '        for (method in allMethods) {\n'
-        code += '            // Test request file\n'
-        code += '            try {\n'
-        code += '                val requestFiles = mockDirectory.listFiles { file ->\n'
-        code += '                    file.isFile && \n'
-        code += '                    file.extension == "json" &&\n'
-        code += '                    file.nameWithoutExtension.startsWith("JsonRpcRequest") &&\n'
-        code += '                    file.nameWithoutExtension.contains(method, ignoreCase = true)\n'
-        code += '                } ?: emptyArray()\n'
-        code += '                \n'
-        code += '                if (requestFiles.isNotEmpty()) {\n'
-        code += '                    val file = requestFiles.first()\n'
-        code += '                    val jsonContent = file.readText()\n'
-        code += '                    val element = json.parseToJsonElement(jsonContent).jsonObject\n'
-        code += '                    \n'
-        code += '                    // Validate request structure\n'
-        code += '                    assertNotNull(element["jsonrpc"], "Request should have jsonrpc")\n'
-        code += '                    assertNotNull(element["method"], "Request should have method")\n'
-        code += '                    assertNotNull(element["id"], "Request should have id")\n'
-        code += '                    assertNotNull(element["params"], "Request should have params")\n'
-        code += '                    \n'
-        code += '                    requestSuccessCount++\n'
-        code += '                    println("✅ Request: $method")\n'
-        code += '                }\n'
-        code += '            } catch (e: Exception) {\n'
-        code += '                failures.add("Request $method: ${e.message}")\n'
-        code += '                failureCount++\n'
-        code += '                println("❌ Request $method: ${e.message}")\n'
-        code += '            }\n'
-        code += '            \n'
-        code += '            // Test response file\n'
-        code += '            try {\n'
-        code += '                val responseFiles = mockDirectory.listFiles { file ->\n'
-        code += '                    file.isFile && \n'
-        code += '                    file.extension == "json" &&\n'
-        code += '                    file.nameWithoutExtension.startsWith("JsonRpcResponse") &&\n'
-        code += '                    file.nameWithoutExtension.contains(method, ignoreCase = true) &&\n'
-        code += '                    file.nameWithoutExtension.endsWith("_Success")\n'
-        code += '                } ?: emptyArray()\n'
-        code += '                \n'
-        code += '                if (responseFiles.isNotEmpty()) {\n'
-        code += '                    val file = responseFiles.first()\n'
-        code += '                    val jsonContent = file.readText()\n'
-        code += '                    val element = json.parseToJsonElement(jsonContent).jsonObject\n'
-        code += '                    \n'
-        code += '                    // Validate response structure\n'
-        code += '                    assertNotNull(element["jsonrpc"], "Response should have jsonrpc")\n'
-        code += '                    assertNotNull(element["id"], "Response should have id")\n'
-        code += '                    assertNotNull(element["result"], "Success response should have result")\n'
-        code += '                    \n'
-        code += '                    // Try to deserialize the result\n'
-        code += '                    val result = element["result"]\n'
-        code += '                    assertNotNull(result, "Result should not be null")\n'
-        code += '                    \n'
-        code += '                    responseSuccessCount++\n'
-        code += '                    println("✅ Response: $method")\n'
-        code += '                }\n'
-        code += '            } catch (e: Exception) {\n'
-        code += '                failures.add("Response $method: ${e.message}")\n'
-        code += '                failureCount++\n'
-        code += '                println("❌ Response $method: ${e.message}")\n'
-        code += '            }\n'
-        code += '        }\n'
-        code += '        \n'
-        code += '        println("\\n📊 RPC Methods Test Summary:")\n'
-        code += '        println("   ✅ Requests tested: $requestSuccessCount")\n'
-        code += '        println("   ✅ Responses tested: $responseSuccessCount")\n'
-        code += '        println("   ❌ Failures: $failureCount")\n'
-        code += '        println("   📁 Total methods: ${allMethods.size}")\n'
-        code += '        \n'
-        code += '        assertTrue(requestSuccessCount > 0, "Should test at least some request types")\n'
-        code += '        assertTrue(responseSuccessCount > 0, "Should test at least some response types")\n'
-        code += '        \n'
-        code += '        if (failures.isNotEmpty() && failures.size < 20) {\n'
-        code += '            println("\\n⚠️ Failures:")\n'
-        code += '            failures.forEach { println("   $it") }\n'
-        code += '        }\n'
-        code += '    }\n'
-        code += '    \n'
+            out.line(f'            "{method}"{comma}')
+        out.line('        )')
+        out.line('        ')
+        out.line('        var requestSuccessCount = 0')
+        out.line('        var responseSuccessCount = 0')
+        out.line('        var failureCount = 0')
+        out.line('        val failures = mutableListOf<String>()')
+        out.line('        ')
+        out.write('        println("\\n🧪 Testing all ${allMethods.size} RPC methods...")\n')
+        out.line('        ')
+        out.line('        for (method in allMethods) {')
+        out.line('            // Test request file')
+        out.line('            try {')
+        out.line('                val requestFiles = mockDirectory.listFiles { file ->')
+        out.line('                    file.isFile && ')
+        out.line('                    file.extension == "json" &&')
+        out.line('                    file.nameWithoutExtension.startsWith("JsonRpcRequest") &&')
+        out.line('                    file.nameWithoutExtension.contains(method, ignoreCase = true)')
+        out.line('                } ?: emptyArray()')
+        out.line('                ')
+        out.line('                if (requestFiles.isNotEmpty()) {')
+        out.line('                    val file = requestFiles.first()')
+        out.line('                    val jsonContent = file.readText()')
+        out.line('                    val element = json.parseToJsonElement(jsonContent).jsonObject')
+        out.line('                    ')
+        out.line('                    // Validate request structure')
+        out.line('                    assertNotNull(element["jsonrpc"], "Request should have jsonrpc")')
+        out.line('                    assertNotNull(element["method"], "Request should have method")')
+        out.line('                    assertNotNull(element["id"], "Request should have id")')
+        out.line('                    assertNotNull(element["params"], "Request should have params")')
+        out.line('                    ')
+        out.line('                    requestSuccessCount++')
+        out.line('                    println("✅ Request: $method")')
+        out.line('                }')
+        out.line('            } catch (e: Exception) {')
+        out.line('                failures.add("Request $method: ${e.message}")')
+        out.line('                failureCount++')
+        out.line('                println("❌ Request $method: ${e.message}")')
+        out.line('            }')
+        out.line('            ')
+        out.line('            // Test response file')
+        out.line('            try {')
+        out.line('                val responseFiles = mockDirectory.listFiles { file ->')
+        out.line('                    file.isFile && ')
+        out.line('                    file.extension == "json" &&')
+        out.line('                    file.nameWithoutExtension.startsWith("JsonRpcResponse") &&')
+        out.line('                    file.nameWithoutExtension.contains(method, ignoreCase = true) &&')
+        out.line('                    file.nameWithoutExtension.endsWith("_Success")')
+        out.line('                } ?: emptyArray()')
+        out.line('                ')
+        out.line('                if (responseFiles.isNotEmpty()) {')
+        out.line('                    val file = responseFiles.first()')
+        out.line('                    val jsonContent = file.readText()')
+        out.line('                    val element = json.parseToJsonElement(jsonContent).jsonObject')
+        out.line('                    ')
+        out.line('                    // Validate response structure')
+        out.line('                    assertNotNull(element["jsonrpc"], "Response should have jsonrpc")')
+        out.line('                    assertNotNull(element["id"], "Response should have id")')
+        out.line('                    assertNotNull(element["result"], "Success response should have result")')
+        out.line('                    ')
+        out.line('                    // Try to deserialize the result')
+        out.line('                    val result = element["result"]')
+        out.line('                    assertNotNull(result, "Result should not be null")')
+        out.line('                    ')
+        out.line('                    responseSuccessCount++')
+        out.line('                    println("✅ Response: $method")')
+        out.line('                }')
+        out.line('            } catch (e: Exception) {')
+        out.line('                failures.add("Response $method: ${e.message}")')
+        out.line('                failureCount++')
+        out.line('                println("❌ Response $method: ${e.message}")')
+        out.line('            }')
+        out.line('        }')
+        out.line('        ')
+        out.write('        println("\\n📊 RPC Methods Test Summary:")\n')
+        out.line('        println("   ✅ Requests tested: $requestSuccessCount")')
+        out.line('        println("   ✅ Responses tested: $responseSuccessCount")')
+        out.line('        println("   ❌ Failures: $failureCount")')
+        out.line('        println("   📁 Total methods: ${allMethods.size}")')
+        out.line('        ')
+        out.line('        assertTrue(requestSuccessCount > 0, "Should test at least some request types")')
+        out.line('        assertTrue(responseSuccessCount > 0, "Should test at least some response types")')
+        out.line('        ')
+        out.line('        if (failures.isNotEmpty() && failures.size < 20) {')
+        out.write('            println("\\n⚠️ Failures:")\n')
+        out.line('            failures.forEach { println("   $it") }')
+        out.line('        }')
+        out.line('    }')
+        out.line('    ')
     
     # Add comprehensive report
-    code += '''    @Test
+    out.write('''    @Test
     fun `comprehensive client mock coverage report`() {
         if (!mockDirectory.exists()) return
         
@@ -909,34 +914,44 @@ class ClientMockValidationTest {
         assertTrue(responseFiles.isNotEmpty(), "Should have response files")
     }
 }
-'''
+''')
     
-    return code
+    return out.getvalue()
 
-def main():
-    """Main function to generate test files"""
+def run(no_cache: bool = False, mock_files: Optional[List[str]] = None, methods: Optional[Tuple[str, ...]] = None,
+        output_root: Optional[str] = None, cache_dir: str = CACHE_DIR):
+    """
+    Generate both test files. `mock_files` is the inventory produced by generate_mock.run();
+    when omitted the mock directories are listed instead. `methods` scopes the spec like
+    generate_types.py --methods, and output_root relocates the outputs like its --output-root.
+    The IR and symbol table are read from cache_dir.
+    """
+    check_output_root(methods, output_root)
+    if mock_files is None and output_root is not None:
+        # Both mock directories hold the same files
+        mock_files = get_mock_files(relocate_output(MOCK_DIRECTORY_TYPES, output_root))
+    types_test_path = relocate_output(OUTPUT_TYPES_TEST_PATH, output_root)
+    client_test_path = relocate_output(OUTPUT_CLIENT_TEST_PATH, output_root)
     print("🔧 Loading OpenAPI specification...")
-    openapi = load_openapi()
+    ir = get_ir(use_cache=not no_cache, methods=methods, cache_dir=cache_dir)
+    writer = OutputWriter("tests", cache_dir)
     
     print("📝 Generating TypesMockValidationTest.kt...")
-    types_test_code = generate_types_test_file(openapi)
+    types_test_code = generate_types_test_file(ir, mock_files, load_symbols(symbols_path(output_root, cache_dir)))
     
     # Write types test file
-    output_dir = os.path.dirname(os.path.abspath(OUTPUT_TYPES_TEST_PATH))
-    os.makedirs(output_dir, exist_ok=True)
-    with open(OUTPUT_TYPES_TEST_PATH, "w", encoding="utf-8") as f:
-        f.write(types_test_code)
-    print(f"   ✅ Written to: {OUTPUT_TYPES_TEST_PATH}")
+    writer.write(types_test_path, types_test_code)
+    print(f"   ✅ Written to: {types_test_path}")
     
     print("\n📝 Generating ClientMockValidationTest.kt...")
-    client_test_code = generate_client_test_file(openapi)
+    client_test_code = generate_client_test_file(ir, mock_files)
     
     # Write client test file
-    output_dir = os.path.dirname(os.path.abspath(OUTPUT_CLIENT_TEST_PATH))
-    os.makedirs(output_dir, exist_ok=True)
-    with open(OUTPUT_CLIENT_TEST_PATH, "w", encoding="utf-8") as f:
-        f.write(client_test_code)
-    print(f"   ✅ Written to: {OUTPUT_CLIENT_TEST_PATH}")
+    writer.write(client_test_path, client_test_code)
+    print(f"   ✅ Written to: {client_test_path}")
+    
+    writer.save()
+    print(f"📝 {writer.summary()}")
     
     print("\n✨ Test generation complete!")
     print("\n📋 Summary:")
@@ -948,5 +963,24 @@ def main():
     print("   3. Fix any validation issues")
     print("\n💡 Tip: Run 'python generate_tests.py' after any OpenAPI spec changes")
 
+def main():
+    """Main function to generate test files"""
+    parser = argparse.ArgumentParser(description="Generate Kotlin mock validation tests")
+    parser.add_argument("--no-cache", action="store_true", help="rebuild the schema IR instead of reusing the cached one")
+    parser.add_argument("--methods", type=parse_method_allowlist, help="see generate_types.py --methods")
+    parser.add_argument("--output-root", help="see generate_types.py --output-root")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    try:
+        check_output_root(args.methods, args.output_root)
+    except ValueError as e:
+        parser.error(str(e))
+    try:
+        with profiling(args.profile, args.cprofile), span("tests", "stage"):
+            run(no_cache=args.no_cache, methods=args.methods, output_root=args.output_root)
+    except UnknownMethodsError as e:
+        print(f"\n❌ {e}")
+        sys.exit(1)
+
 if __name__ == "__main__":
     main()
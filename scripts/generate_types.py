@@ -1,28 +1,45 @@
 """
 Generates Kotlin types and RPC methods from OpenAPI specification.
 """
-import json
+import argparse
+import functools
 import os
-import hashlib
-from typing import Any, Dict, List, Optional, Set, Tuple
+import re
+import sys
+from collections import Counter
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+
+import emitter
+import naming
+import schema_ir
+import symbols as symbols_module
+from codegen_cache import CACHE_DIR, FragmentCache, source_fingerprint
+from emitter import CodeEmitter
+from naming import escape_kotlin_keyword, to_kotlin_property_name, to_screaming_snake_case
+from output_writer import OutputWriter, check_output_root, relocate_output
+from size_budget import (
+    BUDGET_MODES, SIZE_BUDGET_PATH, SizeBudgetExceeded, budget_from_metrics,
+    check_budget, load_budget, measure_fragment, metrics_path, write_metrics,
+)
+from symbols import SymbolTable, symbols_path
+from tracing import add_profile_arguments, profiling, span, traced
+from schema_ir import (
+    OPENAPI_PATH,
+    SchemaIR,
+    SchemaNode,
+    UnknownMethodsError,
+    canonical_json,
+    get_ir,
+    parse_method_allowlist,
+    resolve_ref_name,
+    resolve_ref_schema,
+    to_kotlin_type_name,
+)
 
-OPENAPI_PATH = "./openapi.json"
 OUTPUT_TYPES_PATH = "../types/src/main/kotlin/org/near/jsonrpc/types/Types.kt"
 OUTPUT_METHODS_PATH = "../client/src/main/kotlin/org/near/jsonrpc/client/Methods.kt"
 
-KOTLIN_RESERVED_KEYWORDS = {
-    "as", "break", "class", "continue", "do", "else", "false", "for", "fun",
-    "if", "in", "interface", "is", "null", "object", "package", "return", "super",
-    "this", "throw", "true", "try", "typealias", "typeof", "val", "var", "when", "while",
-    "by", "catch", "constructor", "delegate", "dynamic", "field", "file", "finally",
-    "get", "import", "init", "param", "property", "receiver", "set", "setparam", "where",
-    "actual", "abstract", "annotation", "companion", "const", "crossinline", "data",
-    "enum", "expect", "external", "final", "infix", "inline", "inner", "internal",
-    "lateinit", "noinline", "open", "operator", "out", "override", "private", "protected",
-    "public", "reified", "sealed", "suspend", "tailrec", "vararg"
-}
-
-HEADER_CODE = """@file:OptIn(ExperimentalSerializationApi::class)
+FILE_HEADER = """@file:OptIn(ExperimentalSerializationApi::class)
 
 package org.near.jsonrpc.types
 
@@ -32,7 +49,9 @@ import kotlinx.serialization.encoding.*
 import kotlinx.serialization.json.*
 import kotlinx.serialization.modules.*
 
-@Serializer(forClass = JsonElement::class)
+"""
+
+POLYMORPHIC_SERIALIZER_CODE = """@Serializer(forClass = JsonElement::class)
 object PolymorphicSerializer : KSerializer<JsonElement> {
     override val descriptor: SerialDescriptor = JsonElement.serializer().descriptor
     override fun serialize(encoder: Encoder, value: JsonElement) = JsonElement.serializer().serialize(encoder, value)
@@ -41,125 +60,136 @@ object PolymorphicSerializer : KSerializer<JsonElement> {
 
 """
 
-def load_openapi() -> Dict[str, Any]:
-    if not os.path.exists(OPENAPI_PATH):
-        raise FileNotFoundError(f"{OPENAPI_PATH} not found")
-    with open(OPENAPI_PATH, "r", encoding="utf-8") as f:
-        return json.load(f)
-
-def escape_kotlin_keyword(property_name: str) -> str:
-    """Escape Kotlin reserved keywords by wrapping in backticks"""
-    if property_name in KOTLIN_RESERVED_KEYWORDS:
-        return f"`{property_name}`"
-    return property_name
-
-def to_kotlin_type_name(name: str) -> str:
-    """Convert schema name to Kotlin type name (PascalCase)"""
-    if not name:
-        return name
-    
-    if "_" in name:
-        parts = name.split("_")
-        processed_parts = []
-        for part in parts:
-            if part.islower():
-                processed_parts.append(part.capitalize())
-            else:
-                processed_parts.append(part)
-        return "".join(processed_parts)
-    
-    if name and name[0].islower():
-        return name[0].upper() + name[1:]
-    
-    return name
+HEADER_CODE = FILE_HEADER + POLYMORPHIC_SERIALIZER_CODE
 
-def to_kotlin_property_name(name: str) -> str:
-    """Convert property name to Kotlin property name (camelCase)"""
-    if "_" in name:
-        parts = name.split("_")
-        
-        def transform_part(part: str) -> str:
-            if not part:
-                return ""
-            if part.islower():
-                if any(ch.isdigit() for ch in part):
-                    digit_indices = [idx for idx, ch in enumerate(part) if ch.isdigit()]
-                    if digit_indices:
-                        has_letter_before = any(ch.isalpha() for ch in part[:digit_indices[0]])
-                        has_letter_after = any(ch.isalpha() for ch in part[digit_indices[-1] + 1:])
-                        if has_letter_before and has_letter_after:
-                            return "".join(ch.upper() if ch.isalpha() else ch for ch in part)
-                return part.capitalize()
-            if part.isupper():
-                return part
-            return part[0].upper() + part[1:]
-        
-        first_part = parts[0].lower() if parts else ""
-        transformed = [transform_part(part) for part in parts[1:]]
-        return first_part + "".join(transformed)
-    
-    if name.isupper() and len(name) > 1:
-        return name.lower()
-    
-    return name[0].lower() + name[1:] if name else name
-
-def to_screaming_snake_case(value: str) -> str:
-    """Convert a string to SCREAMING_SNAKE_CASE"""
-    import re
-    result = value.replace("-", "_").replace(" ", "_").replace(".", "_").replace("/", "_").replace("@", "_")
-    result = re.sub(r'([a-z0-9])([A-Z])', r'\1_\2', result)
-    result = re.sub(r'([A-Z]+)([A-Z][a-z])', r'\1_\2', result)
-    return result.upper()
-
-def resolve_ref_name(ref: str) -> Optional[str]:
-    """Extract type name from $ref"""
-    if not ref.startswith("#/components/schemas/"):
-        return None
-    return ref.split("/")[-1]
+# Every module that shapes a cached fragment; editing one of them invalidates the cache
+FRAGMENT_SOURCES = (__file__, schema_ir.__file__, naming.__file__, emitter.__file__, symbols_module.__file__)
 
-def resolve_ref_schema(ref: str, components: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-    """Resolve a $ref to its schema definition"""
-    name = resolve_ref_name(ref)
-    if name:
-        return components.get(name)
-    return None
+# Sharded output (--shard-by): every shard file starts with this marker so stale
+# shards can be told apart from hand-written sources in the same package
+SHARD_MODES = ("none", "scc", "area", "type")
+SHARD_MARKER = "// Generated by scripts/generate_types.py from openapi.json. Do not edit."
+COMMON_AREA = "Common"
 
-def ensure_unique_type_name(name: str, generated_types: Set[str]) -> str:
-    """Ensure a type name is unique by adding suffix if needed"""
-    kotlin_name = to_kotlin_type_name(name)
-    original_kotlin_name = kotlin_name
-    
-    if kotlin_name in generated_types:
-        counter = 2
-        while kotlin_name in generated_types:
-            kotlin_name = f"{original_kotlin_name}{counter}"
-            counter += 1
-    
+def ensure_unique_type_name(name: str, symbols: SymbolTable) -> str:
+    """Claim a unique Kotlin type name for schema `name` (Name, Name2, Name3, ...) and bind the schema to it"""
+    kotlin_name = symbols.allocate(to_kotlin_type_name(name))
+    symbols.bind(name, kotlin_name)
     return kotlin_name
 
-def register_generated_type(kotlin_name: str, generated_types: Set[str]) -> bool:
-    """Register a type as generated"""
-    if kotlin_name in generated_types:
+def register_generated_type(kotlin_name: str, symbols: SymbolTable, schema_name: Optional[str] = None) -> bool:
+    """Register a type as generated, bound to `schema_name` if given; False if the name is already taken"""
+    if not symbols.claim(kotlin_name):
         return False
-    generated_types.add(kotlin_name)
+    if schema_name is not None:
+        symbols.bind(schema_name, kotlin_name)
     return True
 
-def get_kotlin_primitive_type(schema: Dict[str, Any], components: Dict[str, Any], seen_refs: Optional[Set[str]] = None) -> str:
+class ResolutionCache:
+    """Hit/miss counters and entries for one memoized schema resolution helper"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self.entries: Dict[Any, Tuple[Any, Any, Any]] = {}
+
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def clear(self):
+        self.hits = 0
+        self.misses = 0
+        self.entries.clear()
+
+_resolution_caches: Dict[str, ResolutionCache] = {}
+
+def memoize_schema_resolution(func: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Memoize a `func(schema, components, ...)` helper by the identity of its first two arguments.
+    A list argument (allOf) is keyed by the identity of its items. Every entry pins the objects
+    its key was built from, so an id can never be reused by another schema while cached.
+    Results are shared between callers and must be treated as read-only.
+    """
+    cache = ResolutionCache(func.__name__)
+    _resolution_caches[func.__name__] = cache
+
+    @functools.wraps(func)
+    def wrapper(schema: Any, components: Dict[str, Any], *args: Any, **kwargs: Any) -> Any:
+        if isinstance(schema, list):
+            pinned = tuple(schema)
+            key = (tuple(map(id, pinned)), id(components))
+        else:
+            pinned = schema
+            key = (id(schema), id(components))
+        entry = cache.entries.get(key)
+        if entry is not None and entry[1] is components and (
+            entry[0] is pinned or (isinstance(pinned, tuple) and all(a is b for a, b in zip(entry[0], pinned)))
+        ):
+            cache.hits += 1
+            return entry[2]
+        cache.misses += 1
+        value = func(schema, components, *args, **kwargs)
+        cache.entries[key] = (pinned, components, value)
+        return value
+
+    wrapper.cache = cache
+    return wrapper
+
+def print_resolution_cache_stats():
+    """Print hit/miss statistics for every memoized resolution helper"""
+    print("📊 Resolution cache statistics:")
+    for cache in _resolution_caches.values():
+        print(f"   {cache.name}: {cache.hits} hits, {cache.misses} misses ({cache.hit_rate():.1%} hit rate)")
+
+def reset_resolution_caches():
+    """Drop every memoized resolution (and the spec objects the entries pin)"""
+    for cache in _resolution_caches.values():
+        cache.clear()
+
+merge_allof = memoize_schema_resolution(schema_ir.merge_allof)
+
+# Set by run() (and in every worker) for --dedupe: identical inline classes of a union share one class
+_dedupe_shapes = False
+
+def strip_descriptions(schema: Any) -> Any:
+    """Copy of a schema without its description fields, which only end up in KDoc"""
+    if isinstance(schema, dict):
+        return {key: strip_descriptions(value) for key, value in schema.items() if key != "description"}
+    if isinstance(schema, list):
+        return [strip_descriptions(item) for item in schema]
+    return schema
+
+def shape_key(schema: Dict[str, Any]) -> str:
+    """Key under which structurally identical schemas compare equal"""
+    return canonical_json(strip_descriptions(schema))
+
+@memoize_schema_resolution
+def merge_allof_variant(variant: Dict[str, Any], components: Dict[str, Any]) -> Dict[str, Any]:
+    """Merge a union variant's allOf list together with the variant's own properties/required/type"""
+    allof_schemas = variant["allOf"].copy()
+    # If variant has its own properties, add them as an inline schema to merge
+    if "properties" in variant or "required" in variant or "type" in variant:
+        inline_schema = {}
+        if "properties" in variant:
+            inline_schema["properties"] = variant["properties"]
+        if "required" in variant:
+            inline_schema["required"] = variant["required"]
+        if "type" in variant:
+            inline_schema["type"] = variant["type"]
+        allof_schemas.append(inline_schema)
+    return merge_allof(allof_schemas, components)
+
+@memoize_schema_resolution
+def get_kotlin_primitive_type(schema: Dict[str, Any], components: Dict[str, Any]) -> str:
     """Map OpenAPI primitive types to Kotlin types"""
-    seen_refs = seen_refs or set()
-    
     typ = schema.get("type")
     fmt = schema.get("format", "")
     
     if "$ref" in schema:
-        ref = schema["$ref"]
-        if ref in seen_refs:
-            ref_name = resolve_ref_name(ref)
-            if ref_name:
-                return to_kotlin_type_name(ref_name)
-            return "JsonElement"
-        seen_refs.add(ref)
-        ref_name = resolve_ref_name(ref)
+        # References are emitted by name, so recursive types need no cycle tracking here
+        ref_name = resolve_ref_name(schema["$ref"])
         if ref_name:
             return to_kotlin_type_name(ref_name)
         return "JsonElement"
@@ -187,18 +217,18 @@ def get_kotlin_primitive_type(schema: Dict[str, Any], components: Dict[str, Any]
         return "Boolean"
     elif typ == "array":
         items = schema.get("items", {})
-        items_type = get_kotlin_type(items, components, seen_refs)
+        items_type = get_kotlin_type(items, components)
         return f"List<{items_type}>"
     elif typ == "object":
         if "patternProperties" in schema and "properties" not in schema:
             pattern_props = schema.get("patternProperties", {})
             if pattern_props:
                 first_pattern_schema = next(iter(pattern_props.values()))
-                value_type = get_kotlin_type(first_pattern_schema, components, seen_refs)
+                value_type = get_kotlin_type(first_pattern_schema, components)
                 return f"Map<String, {value_type}>"
         if "additionalProperties" in schema and "properties" not in schema:
             if isinstance(schema["additionalProperties"], dict):
-                value_type = get_kotlin_type(schema["additionalProperties"], components, seen_refs)
+                value_type = get_kotlin_type(schema["additionalProperties"], components)
                 return f"Map<String, {value_type}>"
             else:
                 return "JsonElement"
@@ -206,25 +236,18 @@ def get_kotlin_primitive_type(schema: Dict[str, Any], components: Dict[str, Any]
     
     return "JsonElement"
 
-def get_kotlin_type(schema: Dict[str, Any], components: Dict[str, Any], seen_refs: Optional[Set[str]] = None) -> str:
+@memoize_schema_resolution
+def get_kotlin_type(schema: Dict[str, Any], components: Dict[str, Any]) -> str:
     """Get Kotlin type for a schema"""
-    seen_refs = seen_refs or set()
-    
     if "$ref" in schema:
-        ref = schema["$ref"]
-        if ref in seen_refs:
-            ref_name = resolve_ref_name(ref)
-            if ref_name:
-                return to_kotlin_type_name(ref_name)
-            return "JsonElement"
-        seen_refs.add(ref)
-        ref_name = resolve_ref_name(ref)
+        # References are emitted by name, so recursive types need no cycle tracking here
+        ref_name = resolve_ref_name(schema["$ref"])
         if ref_name:
             return to_kotlin_type_name(ref_name)
         return "JsonElement"
     
     if "enum" in schema:
-        return get_kotlin_primitive_type(schema, components, seen_refs)
+        return get_kotlin_primitive_type(schema, components)
     
     if "allOf" in schema:
         # Try to resolve the primary type from allOf
@@ -237,7 +260,7 @@ def get_kotlin_type(schema: Dict[str, Any], components: Dict[str, Any], seen_ref
         
         # If no refs found, merge and get type
         merged = merge_allof(schema["allOf"], components)
-        return get_kotlin_primitive_type(merged, components, seen_refs)
+        return get_kotlin_primitive_type(merged, components)
     
     if "oneOf" in schema or "anyOf" in schema:
         choices = schema.get("oneOf") or schema.get("anyOf")
@@ -248,14 +271,14 @@ def get_kotlin_type(schema: Dict[str, Any], components: Dict[str, Any], seen_ref
             
             if len(non_null_choices) == 1:
                 # Simple nullable type
-                base_type = get_kotlin_type(non_null_choices[0], components, seen_refs)
+                base_type = get_kotlin_type(non_null_choices[0], components)
                 return base_type + "?" if has_null else base_type
             elif len(non_null_choices) == 0:
                 # Only null - return nullable JsonElement
                 return "JsonElement?"
         return "JsonElement"
     
-    return get_kotlin_primitive_type(schema, components, seen_refs)
+    return get_kotlin_primitive_type(schema, components)
 
 def generate_kotlin_enum(name: str, schema: Dict[str, Any]) -> str:
     """Generate Kotlin enum for schemas with enum values"""
@@ -300,8 +323,11 @@ object {kotlin_name}
 """
     
     if typ == "string":
-        code = f"@Serializable\nenum class {kotlin_name}(val value: String) {{\n"
+        out = CodeEmitter()
+        out.line("@Serializable")
+        out.line(f"enum class {kotlin_name}(val value: String) {{")
         seen_cases = set()
+        cases = []
         
         for value in non_null_values:
             if value is None:
@@ -318,15 +344,17 @@ object {kotlin_name}
                 counter += 1
             seen_cases.add(case_name)
             
-            code += f'    @SerialName("{value}")\n'
-            code += f'    {case_name}("{value}"),\n'
+            cases.append(f'    @SerialName("{value}")\n    {case_name}("{value}")')
         
-        code = code.rstrip(",\n") + ";\n"
-        code += "}\n"
-        return code
+        out.write(",\n".join(cases)).line(";")
+        out.line("}")
+        return out.getvalue()
     else:
-        code = f"@Serializable\nenum class {kotlin_name}(val value: Int) {{\n"
+        out = CodeEmitter()
+        out.line("@Serializable")
+        out.line(f"enum class {kotlin_name}(val value: Int) {{")
         seen_cases = set()
+        cases = []
         
         for value in non_null_values:
             if value is None:
@@ -339,61 +367,15 @@ object {kotlin_name}
                 counter += 1
             seen_cases.add(case_name)
             
-            code += f'    @SerialName("{value}")\n'
-            code += f'    {case_name}({value}),\n'
-        
-        code = code.rstrip(",\n") + ";\n"
-        code += "}\n"
-        return code
-
-def merge_allof(allof_list: List[Dict[str, Any]], components: Dict[str, Any]) -> Dict[str, Any]:
-    """Merge allOf schemas"""
-    merged = {"properties": {}, "required": []}
-    
-    for item in allof_list:
-        if "$ref" in item:
-            resolved = resolve_ref_schema(item["$ref"], components)
-            if resolved:
-                # If resolved schema is a primitive type, use it directly
-                if "type" in resolved and resolved["type"] in ["string", "integer", "number", "boolean"]:
-                    if "properties" not in resolved:
-                        return resolved.copy()
-                
-                if "properties" in resolved:
-                    merged["properties"].update(resolved["properties"])
-                if "required" in resolved:
-                    merged["required"].extend(resolved["required"])
-                if "type" in resolved:
-                    merged["type"] = resolved["type"]
-                for key in ["format", "description", "minimum", "maximum", "nullable"]:
-                    if key in resolved and key not in merged:
-                        merged[key] = resolved[key]
+            cases.append(f'    @SerialName("{value}")\n    {case_name}({value})')
         
-        if "properties" in item:
-            merged["properties"].update(item["properties"])
-        if "required" in item:
-            merged["required"].extend(item["required"])
-        if "type" in item:
-            merged["type"] = item["type"]
-        for key in ["format", "description", "minimum", "maximum", "nullable"]:
-            if key in item and key not in merged:
-                merged[key] = item[key]
-    
-    if "type" not in merged:
-        merged["type"] = "object"
-    
-    merged["required"] = list(dict.fromkeys(merged["required"]))
-    return merged
-
-def generate_kotlin_data_class(name: str, schema: Dict[str, Any], components: Dict[str, Any], generated_types: Set[str]) -> str:
-    """Generate Kotlin data class for object schemas"""
-    kotlin_name = ensure_unique_type_name(name, generated_types)
-    
-    if not register_generated_type(kotlin_name, generated_types):
-        return ""
-    
-    if "allOf" in schema:
-        schema = merge_allof(schema["allOf"], components)
+        out.write(",\n".join(cases)).line(";")
+        out.line("}")
+        return out.getvalue()
+
+def generate_kotlin_data_class(name: str, schema: Dict[str, Any], components: Dict[str, Any], symbols: SymbolTable) -> str:
+    """Generate Kotlin data class for object schemas (allOf already merged)"""
+    kotlin_name = ensure_unique_type_name(name, symbols)
     
     properties = schema.get("properties", {})
     required = set(schema.get("required", []))
@@ -408,7 +390,9 @@ def generate_kotlin_data_class(name: str, schema: Dict[str, Any], components: Di
     if not properties:
         return f"@Serializable\nobject {kotlin_name}\n\n"
     
-    code = f"@Serializable\ndata class {kotlin_name}(\n"
+    out = CodeEmitter()
+    out.line("@Serializable")
+    out.line(f"data class {kotlin_name}(")
     
     property_lines = []
     for prop_name, prop_schema in properties.items():
@@ -439,16 +423,19 @@ def generate_kotlin_data_class(name: str, schema: Dict[str, Any], components: Di
         
         property_lines.append(prop_line)
     
-    code += ",\n".join(property_lines)
+    out.write(",\n".join(property_lines))
     
     if properties:
-        code += "\n"
+        out.line()
     
-    code += ")\n\n"
-    return code
+    out.line(")").line()
+    return out.getvalue()
 
-def generate_inline_data_class(base_name: str, obj_schema: Dict[str, Any], components: Dict[str, Any]) -> Tuple[str, str, str]:
+def generate_inline_data_class(base_name: str, obj_schema: Dict[str, Any], components: Dict[str, Any],
+                               shared_classes: Optional[Dict[str, str]] = None) -> Tuple[str, str, str]:
     """Generate an inline data class for an object schema.
+    With shared_classes (shape key -> class name, see --dedupe) a nested object whose shape
+    already has a class in the same union reuses it instead of declaring another one.
     Returns: (class_name, class_code, nested_classes_code)
     """
     props = obj_schema.get("properties", {})
@@ -463,15 +450,21 @@ def generate_inline_data_class(base_name: str, obj_schema: Dict[str, Any], compo
         
         # Check if this property is an inline object with properties
         if prop_schema.get("type") == "object" and "properties" in prop_schema and "$ref" not in prop_schema:
-            # Generate a nested data class for this property
-            nested_class_name = f"{base_name}{to_kotlin_type_name(prop_name)}"
-            _, nested_props, nested_nested = generate_inline_data_class(nested_class_name, prop_schema, components)
-            
-            nested_classes.append(f"    @Serializable\n    data class {nested_class_name}({nested_props})\n")
-            if nested_nested:
-                nested_classes.append(nested_nested)
-            
-            prop_type = nested_class_name
+            key = shape_key(prop_schema) if shared_classes is not None else None
+            if key is not None and key in shared_classes:
+                prop_type = shared_classes[key]
+            else:
+                # Generate a nested data class for this property
+                nested_class_name = f"{base_name}{to_kotlin_type_name(prop_name)}"
+                _, nested_props, nested_nested = generate_inline_data_class(nested_class_name, prop_schema, components, shared_classes)
+                
+                nested_classes.append(f"    @Serializable\n    data class {nested_class_name}({nested_props})\n")
+                if nested_nested:
+                    nested_classes.append(nested_nested)
+                if key is not None:
+                    shared_classes[key] = nested_class_name
+                
+                prop_type = nested_class_name
         else:
             prop_type = get_kotlin_type(prop_schema, components)
         
@@ -517,7 +510,320 @@ def extract_discriminator_name(variant: Dict[str, Any]) -> Optional[str]:
     
     return None
 
-def generate_kotlin_sealed_interface(name: str, schema: Dict[str, Any], components: Dict[str, Any], generated_types: Set[str]) -> str:
+PRIMITIVE_JSON_TYPES = ("string", "integer", "number", "boolean")
+
+# Content-based checks for primitive union variants, by JSON type
+PRIMITIVE_VARIANT_CHECKS = {
+    "integer": "element is JsonPrimitive && element.longOrNull != null",
+    "number": "element is JsonPrimitive && element.doubleOrNull != null",
+    "boolean": "element is JsonPrimitive && element.booleanOrNull != null",
+    "string": "element is JsonPrimitive && element.isString",
+}
+
+class UnionVariant(NamedTuple):
+    """
+    One analysed oneOf/anyOf variant: the nested class it becomes and how the union's
+    serializer recognises it. Built once per variant and only read by the emitters.
+
+    kind is one of: allof, enum, discriminated, wrapped_object (externally tagged
+    {"key": {...}}), wrapped_value ({"key": value}), object, ref, primitive, json.
+    """
+    kind: str
+    class_name: str
+    serial_name: Optional[str] = None
+    # Key of the {"key": ...} wrapper for externally-tagged variants
+    wrapper_key: Optional[str] = None
+    # Property of a wrapped_value variant
+    field_name: Optional[str] = None
+    inline_props: str = ""
+    nested_classes: str = ""
+    value_type: Optional[str] = None
+    # JSON type of primitive variants, and "string"/"object" for refs detected by content
+    json_type: Optional[str] = None
+    is_enum: bool = False
+    # Object keys that identify the variant during content-based deserialization
+    match_keys: Tuple[str, ...] = ()
+
+class UnionModel(NamedTuple):
+    """Analysed sealed interface; serializer is none, content, content_with_enums or externally_tagged"""
+    kotlin_name: str
+    description: str
+    discriminator_field: Optional[str]
+    variants: Tuple[UnionVariant, ...]
+    serializer: str
+    # Whether @Serializable references the custom serializer
+    annotate_serializer: bool
+
+def find_discriminator_field(variants: List[Dict[str, Any]]) -> Optional[str]:
+    """First property of the first variant that every variant declares with an enum value"""
+    is_reference_only_union = all("$ref" in v and len([k for k in v.keys() if k != "description"]) == 1 for v in variants)
+    if is_reference_only_union:
+        return None
+    if not all(v.get("type") == "object" and "properties" in v for v in variants):
+        return None
+    for prop_name in variants[0].get("properties", {}):
+        if all("enum" in v.get("properties", {}).get(prop_name, {}) for v in variants):
+            return prop_name
+    return None
+
+def analyze_union_variant(idx: int, variant: Dict[str, Any], discriminator_field: Optional[str],
+                          components: Dict[str, Any], used_names: SymbolTable,
+                          shared_classes: Optional[Dict[str, str]] = None) -> Optional[UnionVariant]:
+    """Work out the nested class for one variant; None when the variant produces no class"""
+    # allOf variants (common in complex schemas like RpcQueryRequest): merge them, name after the title
+    if "allOf" in variant:
+        merged = merge_allof_variant(variant, components)
+        class_name = used_names.allocate(to_kotlin_type_name(variant.get("title", f"Variant{idx}")), first_suffix=1)
+        _, inline_props, nested_classes = generate_inline_data_class(class_name, merged, components, shared_classes)
+        return UnionVariant("allof", class_name, inline_props=inline_props, nested_classes=nested_classes)
+    
+    # Simple string enum variants; NEAR sends them externally tagged as {"EnumValue": null}
+    if "enum" in variant and variant.get("type") == "string":
+        enum_vals = variant.get("enum", [])
+        if not enum_vals:
+            return None
+        enum_val = str(enum_vals[0])
+        safe_name = enum_val.replace("-", "").replace("_", "").replace(" ", "").capitalize()
+        class_name = used_names.allocate(safe_name, first_suffix=1)
+        return UnionVariant("enum", class_name, serial_name=enum_val, wrapper_key=enum_val)
+    
+    if variant.get("type") == "object" and "properties" in variant:
+        props = variant.get("properties", {})
+        
+        # Internally-discriminated: kotlinx.serialization handles the discriminator property itself
+        if discriminator_field and discriminator_field in props:
+            discriminator_value = props[discriminator_field].get("enum", [""])[0]
+            base_name = to_kotlin_type_name(discriminator_value) if discriminator_value else f"Variant{idx}"
+            class_name = used_names.allocate(base_name, first_suffix=1)
+            props_copy = props.copy()
+            del props_copy[discriminator_field]
+            _, inline_props, nested_classes = generate_inline_data_class(class_name, {**variant, "properties": props_copy}, components, shared_classes)
+            return UnionVariant("discriminated", class_name, serial_name=discriminator_value,
+                                inline_props=inline_props, nested_classes=nested_classes)
+        
+        discriminator_name = extract_discriminator_name(variant)
+        
+        if len(props) == 1:
+            prop_name = list(props.keys())[0]
+            prop_schema = props[prop_name]
+            prop_type = get_kotlin_type(prop_schema, components)
+            if discriminator_name:
+                base_name = discriminator_name
+            else:
+                base_name = to_kotlin_type_name(prop_name)
+                # Avoid shadowing the property type, e.g. BlockId (variant) vs BlockId (type)
+                if base_name == prop_type.rstrip("?"):
+                    base_name = f"{base_name}Request"
+            class_name = used_names.allocate(base_name, first_suffix=1)
+            
+            resolved_prop_schema = prop_schema
+            if "$ref" in prop_schema:
+                resolved_prop_schema = resolve_ref_schema(prop_schema["$ref"], components) or prop_schema
+            
+            if "properties" in resolved_prop_schema:
+                # Externally tagged {"PropertyName": {"nested": "fields"}}: inline the nested properties
+                _, inline_props, nested_classes = generate_inline_data_class(class_name, resolved_prop_schema, components, shared_classes)
+                return UnionVariant("wrapped_object", class_name, wrapper_key=prop_name, inline_props=inline_props,
+                                    nested_classes=nested_classes, match_keys=(prop_name,))
+            # Simple types or type references: serialized as {"prop_name": value}
+            return UnionVariant("wrapped_value", class_name, field_name=prop_name, value_type=prop_type, match_keys=(prop_name,))
+        
+        # Multiple properties: discriminator-based name, falling back to Variant{idx}
+        class_name = used_names.allocate(discriminator_name or f"Variant{idx}", first_suffix=1)
+        _, inline_props, nested_classes = generate_inline_data_class(class_name, variant, components, shared_classes)
+        return UnionVariant("object", class_name, inline_props=inline_props, nested_classes=nested_classes,
+                            match_keys=tuple(props.keys())[:2])
+    
+    # Reference variants, wrapped in a value class; detected by the referenced schema's shape
+    if "$ref" in variant:
+        ref_name = resolve_ref_name(variant["$ref"])
+        if not ref_name:
+            return None
+        ref_kotlin_name = to_kotlin_type_name(ref_name)
+        ref_schema = components.get(ref_name, {})
+        json_type = None
+        match_keys: Tuple[str, ...] = ()
+        if ref_schema.get("type") == "string":
+            json_type = "string"
+        elif ref_schema.get("type") == "object" or "properties" in ref_schema:
+            json_type = "object"
+            match_keys = tuple(ref_schema.get("properties", {}).keys())[:2]
+        return UnionVariant("ref", f"{ref_kotlin_name}Variant", value_type=ref_kotlin_name, json_type=json_type, match_keys=match_keys)
+    
+    if variant.get("type") in PRIMITIVE_JSON_TYPES:
+        var_type = variant.get("type")
+        return UnionVariant("primitive", f"{var_type.capitalize()}Value", value_type=get_kotlin_primitive_type(variant, components),
+                            json_type=var_type, is_enum="enum" in variant)
+    
+    # Fallback for very complex variants: keep the raw JSON, named after the title if available
+    class_name = used_names.allocate(to_kotlin_type_name(variant.get("title", f"Variant{idx}")), first_suffix=1)
+    return UnionVariant("json", class_name)
+
+def analyze_union(name: str, schema: Dict[str, Any], components: Dict[str, Any]) -> UnionModel:
+    """Analyse a multi-variant oneOf/anyOf schema once: variant classes, discriminator and serializer strategy"""
+    union_key = "oneOf" if "oneOf" in schema else "anyOf"
+    raw_variants = schema.get(union_key, [])
+    discriminator_field = find_discriminator_field(raw_variants)
+    
+    # Variant names only need to be unique within the union: Name, Name1, Name2, ...
+    used_names = SymbolTable()
+    shared_classes: Optional[Dict[str, str]] = {} if _dedupe_shapes else None
+    analysed = (analyze_union_variant(idx, variant, discriminator_field, components, used_names, shared_classes)
+                for idx, variant in enumerate(raw_variants))
+    variants = tuple(variant for variant in analysed if variant is not None)
+    
+    # Unions without a discriminator get a custom serializer, unless they are plain allOf data classes
+    all_allof_variants = all("allOf" in v for v in raw_variants)
+    needs_custom_serializer = not discriminator_field and len(raw_variants) > 1 and not all_allof_variants
+    # Externally tagged only when every variant has a wrapper key, so serialize()'s when is exhaustive
+    tagged_count = sum(1 for variant in variants if variant.wrapper_key is not None)
+    externally_tagged = tagged_count > 0 and tagged_count == len(raw_variants)
+    
+    if needs_custom_serializer and not externally_tagged:
+        # Enum string variants serialize as plain strings, which needs a full KSerializer
+        has_enum_strings = any("enum" in v and v.get("type") == "string" for v in raw_variants)
+        serializer = "content_with_enums" if has_enum_strings else "content"
+    elif externally_tagged:
+        serializer = "externally_tagged"
+    else:
+        serializer = "none"
+    
+    description = schema.get("description", "").strip()
+    return UnionModel(to_kotlin_type_name(name), description, discriminator_field, variants, serializer, needs_custom_serializer)
+
+def emit_union_variant(out: CodeEmitter, kotlin_name: str, variant: UnionVariant):
+    """Render one variant as a class nested in the sealed interface"""
+    kind = variant.kind
+    if kind in ("ref", "primitive"):
+        # @JvmInline value classes unwrap automatically during serialization
+        out.line("    @Serializable")
+        out.line("    @JvmInline")
+        out.line(f"    value class {variant.class_name}(")
+        out.line(f"        val value: {variant.value_type}")
+        out.line(f"    ) : {kotlin_name}").line()
+        return
+    
+    out.line("    @Serializable")
+    if variant.serial_name is not None:
+        out.line(f'    @SerialName("{variant.serial_name}")')
+    
+    if kind == "enum" or (kind == "discriminated" and not variant.inline_props.strip()):
+        out.line(f"    object {variant.class_name} : {kotlin_name}").line()
+    elif kind == "wrapped_object":
+        out.line(f"    data class {variant.class_name}(")
+        indented_props = "\n        ".join(line for line in variant.inline_props.split("\n") if line.strip())
+        if indented_props:
+            out.line(f"        {indented_props}")
+        out.line(f"    ) : {kotlin_name}").line()
+    elif kind == "wrapped_value":
+        out.line(f"    data class {variant.class_name}(")
+        out.line(f"        @SerialName(\"{variant.field_name}\")")
+        out.line(f"        val {to_kotlin_property_name(variant.field_name)}: {variant.value_type}")
+        out.line(f"    ) : {kotlin_name}").line()
+    elif kind == "json":
+        out.line(f"    data class {variant.class_name}(")
+        out.line("        val data: JsonElement")
+        out.line(f"    ) : {kotlin_name}").line()
+    else:
+        out.line(f"    data class {variant.class_name}({variant.inline_props}) : {kotlin_name}").line()
+    
+    if variant.nested_classes:
+        out.write(variant.nested_classes + "\n")
+
+def emit_enum_content_serializer(out: CodeEmitter, model: UnionModel):
+    """KSerializer for content-based unions with enum string variants, which encode as plain strings"""
+    kotlin_name = model.kotlin_name
+    enums = [variant for variant in model.variants if variant.kind == "enum"]
+    wrapped = [variant for variant in model.variants if variant.kind in ("wrapped_object", "wrapped_value")]
+    
+    out.line(f"object {kotlin_name}Serializer : KSerializer<{kotlin_name}> {{")
+    out.line(f"    override val descriptor: SerialDescriptor = buildClassSerialDescriptor(\"{kotlin_name}\")").line()
+    
+    out.line(f"    override fun serialize(encoder: Encoder, value: {kotlin_name}) {{")
+    out.line("        val output = encoder as? JsonEncoder ?: throw SerializationException(\"This serializer only works with JSON\")")
+    out.line("        when (value) {")
+    for variant in enums:
+        out.line(f'            is {kotlin_name}.{variant.class_name} -> output.encodeJsonElement(JsonPrimitive("{variant.serial_name}"))')
+    for variant in wrapped:
+        out.line(f'            is {kotlin_name}.{variant.class_name} -> output.encodeSerializableValue({kotlin_name}.{variant.class_name}.serializer(), value)')
+    out.line("        }")
+    out.line("    }").line()
+    
+    out.line(f"    override fun deserialize(decoder: Decoder): {kotlin_name} {{")
+    out.line("        val input = decoder as? JsonDecoder ?: throw SerializationException(\"This serializer only works with JSON\")")
+    out.line("        val element = input.decodeJsonElement()")
+    out.line("        return when {")
+    for variant in enums:
+        out.line(f'            element is JsonPrimitive && element.content == "{variant.serial_name}" -> {kotlin_name}.{variant.class_name}')
+    for variant in wrapped:
+        out.line(f'            "{variant.match_keys[0]}" in element.jsonObject -> input.json.decodeFromJsonElement({kotlin_name}.{variant.class_name}.serializer(), element)')
+    out.line(f'            else -> throw SerializationException("Unknown variant in {kotlin_name}: ${{element}}")')
+    out.line("        }")
+    out.line("    }")
+    out.line("}").line()
+
+def content_check(variant: UnionVariant) -> Optional[str]:
+    """Condition on `element` that selects this variant in a content-based serializer"""
+    if variant.kind == "primitive":
+        return None if variant.is_enum else PRIMITIVE_VARIANT_CHECKS[variant.json_type]
+    if variant.kind == "ref" and variant.json_type == "string":
+        return PRIMITIVE_VARIANT_CHECKS["string"]
+    if variant.kind == "ref" and variant.json_type == "object" and not variant.match_keys:
+        return "element is JsonObject"
+    if variant.kind in ("ref", "object", "wrapped_object", "wrapped_value") and variant.match_keys:
+        return " && ".join(f'"{key}" in element.jsonObject' for key in variant.match_keys)
+    return None
+
+def emit_content_serializer(out: CodeEmitter, model: UnionModel):
+    """JsonContentPolymorphicSerializer picking the variant from the JSON shape"""
+    kotlin_name = model.kotlin_name
+    out.line(f"object {kotlin_name}Serializer : JsonContentPolymorphicSerializer<{kotlin_name}>({kotlin_name}::class) {{")
+    out.line(f"    override fun selectDeserializer(element: JsonElement): DeserializationStrategy<{kotlin_name}> {{")
+    out.line("        return when {")
+    for variant in model.variants:
+        check = content_check(variant)
+        if check:
+            out.line(f'            {check} -> {kotlin_name}.{variant.class_name}.serializer()')
+    out.line(f'            else -> throw SerializationException("Unknown variant in {kotlin_name}: type=${{element::class.simpleName}}")')
+    out.line("        }")
+    out.line("    }")
+    out.line("}").line()
+
+def emit_externally_tagged_serializer(out: CodeEmitter, model: UnionModel):
+    """KSerializer for NEAR's externally-tagged {"Variant": ...} union format"""
+    kotlin_name = model.kotlin_name
+    out.line(f"object {kotlin_name}Serializer : KSerializer<{kotlin_name}> {{")
+    out.line(f"    override val descriptor: SerialDescriptor = buildClassSerialDescriptor(\"{kotlin_name}\")").line()
+    
+    out.line(f"    override fun serialize(encoder: Encoder, value: {kotlin_name}) {{")
+    out.line("        val output = encoder as? JsonEncoder ?: throw SerializationException(\"This serializer only works with JSON\")")
+    out.line("        when (value) {")
+    for variant in model.variants:
+        if variant.kind == "enum":
+            # Singleton objects encode as {"key": null}
+            out.line(f'            is {kotlin_name}.{variant.class_name} -> output.encodeJsonElement(buildJsonObject {{ put("{variant.wrapper_key}", JsonNull) }})')
+        else:
+            # Data classes carry the wrapper key through their @SerialName annotations
+            out.line(f'            is {kotlin_name}.{variant.class_name} -> output.encodeSerializableValue({kotlin_name}.{variant.class_name}.serializer(), value)')
+    out.line("        }")
+    out.line("    }").line()
+    
+    out.line(f"    override fun deserialize(decoder: Decoder): {kotlin_name} {{")
+    out.line("        val input = decoder as? JsonDecoder ?: throw SerializationException(\"This serializer only works with JSON\")")
+    out.line("        val element = input.decodeJsonElement().jsonObject")
+    out.line("        return when {")
+    for variant in model.variants:
+        if variant.kind == "enum":
+            out.line(f'            "{variant.wrapper_key}" in element -> {kotlin_name}.{variant.class_name}')
+        else:
+            # Data classes are decoded from the object inside the wrapper key
+            out.line(f'            "{variant.wrapper_key}" in element -> input.json.decodeFromJsonElement({kotlin_name}.{variant.class_name}.serializer(), element["{variant.wrapper_key}"]!!)')
+    out.line(f"            else -> throw SerializationException(\"Unknown variant in {kotlin_name}: ${{element.keys}}\")")
+    out.line("        }")
+    out.line("    }")
+    out.line("}").line()
+
+def generate_kotlin_sealed_interface(name: str, schema: Dict[str, Any], components: Dict[str, Any], symbols: SymbolTable) -> str:
     """Generate Kotlin sealed interface for oneOf/anyOf schemas"""
     kotlin_name = to_kotlin_type_name(name)
     
@@ -525,7 +831,7 @@ def generate_kotlin_sealed_interface(name: str, schema: Dict[str, Any], componen
     variants = schema.get(union_key, [])
     
     if not variants:
-        if not register_generated_type(kotlin_name, generated_types):
+        if not register_generated_type(kotlin_name, symbols, name):
             return ""
         return f"typealias {kotlin_name} = JsonElement\n\n"
     
@@ -534,640 +840,124 @@ def generate_kotlin_sealed_interface(name: str, schema: Dict[str, Any], componen
         
         if "allOf" in variant:
             # Merge allOf schemas including variant-level properties
-            allof_schemas = variant["allOf"].copy()
-            if "properties" in variant or "required" in variant or "type" in variant:
-                inline_schema = {}
-                if "properties" in variant:
-                    inline_schema["properties"] = variant["properties"]
-                if "required" in variant:
-                    inline_schema["required"] = variant["required"]
-                if "type" in variant:
-                    inline_schema["type"] = variant["type"]
-                allof_schemas.append(inline_schema)
-            
-            merged = merge_allof(allof_schemas, components)
-            return generate_kotlin_data_class(name, merged, components, generated_types)
+            merged = merge_allof_variant(variant, components)
+            return generate_kotlin_data_class(name, merged, components, symbols)
         elif "type" in variant and variant.get("type") == "object" and "properties" in variant:
-            return generate_kotlin_data_class(name, variant, components, generated_types)
+            return generate_kotlin_data_class(name, variant, components, symbols)
         elif "$ref" in variant:
             ref_name = resolve_ref_name(variant["$ref"])
             if ref_name:
                 ref_kotlin_name = to_kotlin_type_name(ref_name)
+                symbols.bind(name, kotlin_name)
                 return f"typealias {kotlin_name} = {ref_kotlin_name}\n\n"
     
-    if not register_generated_type(kotlin_name, generated_types):
+    if not register_generated_type(kotlin_name, symbols, name):
         return ""
     
-    is_reference_only_union = all("$ref" in v and len([k for k in v.keys() if k != "description"]) == 1 for v in variants)
-    
-    discriminator_field = None
-    if not is_reference_only_union:
-        # Check if all variants are objects with properties
-        all_have_properties = all(v.get("type") == "object" and "properties" in v for v in variants)
-        if all_have_properties:
-            # Find common property name across all variants
-            first_props = variants[0].get("properties", {})
-            for prop_name in first_props:
-                # Check if this property exists in ALL variants and has enum values
-                if all(prop_name in v.get("properties", {}) for v in variants):
-                    # Check if all have enum values for this property
-                    all_have_enum = all(
-                        "enum" in v.get("properties", {}).get(prop_name, {})
-                        for v in variants
-                    )
-                    if all_have_enum:
-                        discriminator_field = prop_name
-                        break
-    
-    description = schema.get("description", "").strip()
+    # Phase 1: analyse the union once; phase 2: render the interface and its serializer from the model
+    model = analyze_union(name, schema, components)
+    out = CodeEmitter()
     
-    # Track used variant class names to ensure uniqueness
-    used_variant_names = set()
-    # Track mapping of wrapper keys to actual variant class names and whether they're objects/primitives
-    # Format: [(wrapper_key, variant_class, is_object, is_primitive), ...]
-    # is_object: True if object singleton, False if data class
-    # is_primitive: True if data class wraps a single primitive/string value
-    variant_serializer_map = []
-    
-    # Pre-calculate if we'll need a custom serializer (needed for @Serializable annotation)
-    # We'll refine this later after analyzing variants
-    # Don't generate serializers for allOf variants - they're just regular data classes
-    all_allof_variants = all("allOf" in v for v in variants)
-    will_generate_custom_serializer_preliminary = not discriminator_field and len(variants) > 1 and not all_allof_variants
-    
-    code = ""
-    
-    # Add documentation
-    if description:
-        first_line = description.split("\n")[0]
+    if model.description:
+        first_line = model.description.split("\n")[0]
         if len(first_line) > 80:
             first_line = first_line[:77] + "..."
-        code += f"/**\n * {first_line}\n */\n"
+        out.write(f"/**\n * {first_line}\n */\n")
     
-    # Generate sealed interface
-    # For internally-discriminated unions, use @JsonClassDiscriminator
-    # For unions with custom serializers, reference the serializer in @Serializable
-    if will_generate_custom_serializer_preliminary:
-        code += f"@Serializable(with = {kotlin_name}Serializer::class)\n"
+    if model.annotate_serializer:
+        out.line(f"@Serializable(with = {kotlin_name}Serializer::class)")
     else:
-        code += "@Serializable\n"
-    if discriminator_field:
-        code += f'@JsonClassDiscriminator("{discriminator_field}")\n'
-    code += f"sealed interface {kotlin_name} {{\n"
-    
-    # Generate variant data classes as nested types
-    for idx, variant in enumerate(variants):
-        # Handle allOf variants (common in complex schemas like RpcQueryRequest)
-        if "allOf" in variant:
-            # Merge allOf schemas to get full structure
-            # Also include any additional properties/required from the variant itself
-            allof_schemas = variant["allOf"].copy()
-            # If variant has its own properties, add them as an inline schema to merge
-            if "properties" in variant or "required" in variant or "type" in variant:
-                inline_schema = {}
-                if "properties" in variant:
-                    inline_schema["properties"] = variant["properties"]
-                if "required" in variant:
-                    inline_schema["required"] = variant["required"]
-                if "type" in variant:
-                    inline_schema["type"] = variant["type"]
-                allof_schemas.append(inline_schema)
-            
-            merged = merge_allof(allof_schemas, components)
-            
-            # Use title as variant name if available
-            variant_class_name = variant.get("title", f"Variant{idx}")
-            variant_class_name = to_kotlin_type_name(variant_class_name)
-            
-            # Ensure unique variant name
-            original_variant_name = variant_class_name
-            counter = 1
-            while variant_class_name in used_variant_names:
-                variant_class_name = f"{original_variant_name}{counter}"
-                counter += 1
-            used_variant_names.add(variant_class_name)
-            
-            # Generate data class with merged properties
-            _, inline_props, nested_classes = generate_inline_data_class(variant_class_name, merged, components)
-            code += f"    @Serializable\n"
-            code += f"    data class {variant_class_name}({inline_props}) : {kotlin_name}\n\n"
-            if nested_classes:
-                code += nested_classes + "\n"
-        
-        # Handle simple string enum variants
-        elif "enum" in variant and variant.get("type") == "string":
-            enum_vals = variant.get("enum", [])
-            if enum_vals:
-                enum_val = str(enum_vals[0])
-                safe_name = enum_val.replace("-", "").replace("_", "").replace(" ", "").capitalize()
-                
-                # Ensure unique name
-                original_safe_name = safe_name
-                counter = 1
-                while safe_name in used_variant_names:
-                    safe_name = f"{original_safe_name}{counter}"
-                    counter += 1
-                used_variant_names.add(safe_name)
-                
-                # Track this enum variant for serializer (externally-tagged format)
-                # NEAR sends enum variants as {"EnumValue": null} or similar
-                variant_serializer_map.append((enum_val, safe_name, True, False))  # is_object=True, is_primitive=False
-                
-                code += f"    @Serializable\n"
-                code += f'    @SerialName("{enum_val}")\n'
-                code += f"    object {safe_name} : {kotlin_name}\n\n"
-        
-        # Handle single-property object (discriminated union pattern)
-        elif variant.get("type") == "object" and "properties" in variant:
-            props = variant.get("properties", {})
-            
-            # For internally-discriminated unions, generate as regular data class with all properties
-            if discriminator_field and discriminator_field in props:
-                # Get discriminator value for @SerialName
-                discriminator_value = props[discriminator_field].get("enum", [""])[0]
-                variant_class_name = to_kotlin_type_name(discriminator_value) if discriminator_value else f"Variant{idx}"
-                
-                # Ensure unique variant name
-                original_variant_name = variant_class_name
-                counter = 1
-                while variant_class_name in used_variant_names:
-                    variant_class_name = f"{original_variant_name}{counter}"
-                    counter += 1
-                used_variant_names.add(variant_class_name)
-                
-                # Remove the discriminator field from properties since kotlinx.serialization handles it
-                variant_without_discriminator = variant.copy()
-                props_copy = props.copy()
-                del props_copy[discriminator_field]
-                variant_without_discriminator["properties"] = props_copy
-                
-                # Generate data class without the discriminator property
-                _, inline_props, nested_classes = generate_inline_data_class(variant_class_name, variant_without_discriminator, components)
-                code += f"    @Serializable\n"
-                code += f'    @SerialName("{discriminator_value}")\n'
-                if inline_props.strip():  # Only add data class if there are properties
-                    code += f"    data class {variant_class_name}({inline_props}) : {kotlin_name}\n\n"
-                else:
-                    # No properties besides discriminator - use object
-                    code += f"    object {variant_class_name} : {kotlin_name}\n\n"
-                if nested_classes:
-                    code += nested_classes + "\n"
-                continue  # Skip the rest of this section
-            
-            # Try to extract discriminator-based name first
-            discriminator_name = extract_discriminator_name(variant)
-            
-            if len(props) == 1:
-                prop_name = list(props.keys())[0]
-                prop_schema = props[prop_name]
-                
-                # Use discriminator name if available, otherwise use property name
-                if discriminator_name:
-                    variant_class_name = discriminator_name
-                else:
-                    # Get the property type name to check for conflicts
-                    prop_type = get_kotlin_type(prop_schema, components)
-                    prop_type_base = prop_type.rstrip("?")  # Remove nullable marker
-                    
-                    # Use property name as base for variant class name
-                    variant_class_name = to_kotlin_type_name(prop_name)
-                    
-                    # If the variant class name would shadow the property type, add "Request" suffix
-                    # This prevents naming collisions like BlockId (variant) vs BlockId (type)
-                    if variant_class_name == prop_type_base:
-                        variant_class_name = f"{variant_class_name}Request"
-                
-                # Ensure unique variant name
-                original_variant_name = variant_class_name
-                counter = 1
-                while variant_class_name in used_variant_names:
-                    variant_class_name = f"{original_variant_name}{counter}"
-                    counter += 1
-                used_variant_names.add(variant_class_name)
-                
-                # For single-property oneOf variants, serialize the property directly at the root level
-                # Use @SerialName on the data class itself (NOT on property) to indicate this is a content-based variant
-                code += f"    @Serializable\n"
-                code += f"    data class {variant_class_name}(\n"
-                
-                # Handle the wrapped property - inline it directly into the variant class
-                # First, resolve $ref if present to check the actual schema structure
-                resolved_prop_schema = prop_schema
-                if "$ref" in prop_schema:
-                    resolved_schema = resolve_ref_schema(prop_schema["$ref"], components)
-                    if resolved_schema:
-                        resolved_prop_schema = resolved_schema
-                
-                prop_type = get_kotlin_type(prop_schema, components)
-                
-                # Now check if the resolved schema has properties to inline
-                if "properties" in resolved_prop_schema:
-                    # Inline nested object properties directly
-                    # This is externally-tagged format: {"PropertyName": {"nested": "fields"}}
-                    variant_serializer_map.append((prop_name, variant_class_name, False, False))  # is_object=False, is_primitive=False
-                    
-                    _, inline_props, nested_classes = generate_inline_data_class(variant_class_name, resolved_prop_schema, components)
-                    # Ensure proper indentation for the inlined properties
-                    indented_props = "\n        ".join(line for line in inline_props.split("\n") if line.strip())
-                    if indented_props:
-                        code += f"        {indented_props}\n"
-                    code += f"    ) : {kotlin_name}\n\n"
-                    if nested_classes:
-                        code += nested_classes + "\n"
-                else:
-                    # For simple types or type references - generate data class with @SerialName on the property
-                    # This tells kotlinx.serialization to serialize as {"prop_name": value}
-                    # Don't add to variant_serializer_map - let it use content-based serialization
-                    
-                    code += f"        @SerialName(\"{prop_name}\")\n"
-                    code += f"        val {to_kotlin_property_name(prop_name)}: {prop_type}\n"
-                    code += f"    ) : {kotlin_name}\n\n"
-            else:
-                # Multiple properties - try discriminator name, fallback to Variant{idx}
-                if discriminator_name:
-                    variant_class_name = discriminator_name
-                else:
-                    variant_class_name = f"Variant{idx}"
-                
-                # Ensure unique variant name
-                original_variant_name = variant_class_name
-                counter = 1
-                while variant_class_name in used_variant_names:
-                    variant_class_name = f"{original_variant_name}{counter}"
-                    counter += 1
-                used_variant_names.add(variant_class_name)
-                
-                _, inline_props, nested_classes = generate_inline_data_class(variant_class_name, variant, components)
-                code += f"    @Serializable\n"
-                code += f"    data class {variant_class_name}({inline_props}) : {kotlin_name}\n\n"
-                if nested_classes:
-                    code += nested_classes + "\n"
-        
-        # Handle reference variants
-        elif "$ref" in variant:
-            ref_name = resolve_ref_name(variant["$ref"])
-            if ref_name:
-                ref_kotlin_name = to_kotlin_type_name(ref_name)
-                # Use @JvmInline value class for automatic unwrapping
-                code += f"    @Serializable\n"
-                code += f"    @JvmInline\n"
-                code += f"    value class {ref_kotlin_name}Variant(\n"
-                code += f"        val value: {ref_kotlin_name}\n"
-                code += f"    ) : {kotlin_name}\n\n"
-        
-        # Handle primitive type variants
-        elif variant.get("type") in ["string", "integer", "number", "boolean"]:
-            var_type = variant.get("type")
-            kotlin_type = get_kotlin_primitive_type(variant, components)
-            type_name = var_type.capitalize()
-            # Use @JvmInline value class for automatic unwrapping during serialization
-            code += f"    @Serializable\n"
-            code += f"    @JvmInline\n"
-            code += f"    value class {type_name}Value(\n"
-            code += f"        val value: {kotlin_type}\n"
-            code += f"    ) : {kotlin_name}\n\n"
-        
+        out.line("@Serializable")
+    if model.discriminator_field:
+        out.line(f'@JsonClassDiscriminator("{model.discriminator_field}")')
+    out.line(f"sealed interface {kotlin_name} {{")
+    for variant in model.variants:
+        emit_union_variant(out, kotlin_name, variant)
+    out.line("}").line()
+    
+    if model.serializer in ("content", "content_with_enums"):
+        out.line(f"// Custom serializer for {kotlin_name} to handle content-based polymorphism")
+        if model.serializer == "content_with_enums":
+            emit_enum_content_serializer(out, model)
         else:
-            # Fallback for very complex variants - generate with title if available
-            variant_class_name = variant.get("title", f"Variant{idx}")
-            variant_class_name = to_kotlin_type_name(variant_class_name)
-            
-            # Ensure unique variant name
-            original_variant_name = variant_class_name
-            counter = 1
-            while variant_class_name in used_variant_names:
-                variant_class_name = f"{original_variant_name}{counter}"
-                counter += 1
-            used_variant_names.add(variant_class_name)
-            
-            code += f"    @Serializable\n"
-            code += f"    data class {variant_class_name}(\n"
-            code += f"        val data: JsonElement\n"
-            code += f"    ) : {kotlin_name}\n\n"
-    
-    code += "}\n\n"
-    
-    # Check if this is a content-based union (needs JsonContentPolymorphicSerializer)
-    # This includes reference-only unions AND mixed unions with primitives
-    # Also includes ANY sealed interface without a discriminator field
-    is_content_based_union = False
-    has_primitive_variants = False
-    
-    if not discriminator_field and len(variants) > 1:
-        # Check if any variant is a primitive type (but not enum, since enums become objects)
-        has_primitive_variants = any(
-            v.get("type") in ["string", "integer", "number", "boolean"] and "enum" not in v
-            for v in variants
-        )
-        # Check if any variant is a reference
-        has_ref_variants = any("$ref" in v for v in variants)
-        
-        # Need content-based serializer if:
-        # 1. We have refs or plain primitives (without external tags), OR
-        # 2. We don't have variant_serializer_map (no externally-tagged serializer will be generated)
-        is_content_based_union = has_ref_variants or has_primitive_variants or not variant_serializer_map
-    
-    # Check if all variants are allOf - these don't need custom serializers
-    all_allof_variants = all("allOf" in v for v in variants)
-    
-    # Check if we'll generate externally-tagged serializer (all variants have wrappers)
-    will_generate_externally_tagged = variant_serializer_map and len(variant_serializer_map) == len(variants)
-    
-    # Check if we have enum string variants - these need special handling
-    has_enum_string_variants = any(
-        "enum" in v and v.get("type") == "string"
-        for v in variants
-    )
-    
-    # Generate custom serializer for ALL sealed interfaces without discriminators
-    # These unions have no discriminator, so we detect variant type by inspecting JSON content
-    # Generate this BEFORE checking externally-tagged serializers
-    # BUT skip if all variants are allOf (just regular data classes) OR if externally-tagged serializer will be generated
-    if not discriminator_field and len(variants) > 1 and not all_allof_variants and not will_generate_externally_tagged:
-        will_generate_custom_serializer = True
-        code += f"// Custom serializer for {kotlin_name} to handle content-based polymorphism\n"
-        
-        # If we have enum string variants, we need a full KSerializer (not just JsonContentPolymorphicSerializer)
-        # because enum string objects need to serialize as plain strings
-        if has_enum_string_variants:
-            code += f"object {kotlin_name}Serializer : KSerializer<{kotlin_name}> {{\n"
-            code += f"    override val descriptor: SerialDescriptor = buildClassSerialDescriptor(\"{kotlin_name}\")\n\n"
-            
-            # Generate serialize method
-            code += f"    override fun serialize(encoder: Encoder, value: {kotlin_name}) {{\n"
-            code += f"        val output = encoder as? JsonEncoder ?: throw SerializationException(\"This serializer only works with JSON\")\n"
-            code += f"        when (value) {{\n"
-            
-            # Handle enum string objects - serialize as plain string
-            for idx, variant in enumerate(variants):
-                if "enum" in variant and variant.get("type") == "string":
-                    enum_vals = variant.get("enum", [])
-                    if enum_vals:
-                        enum_val = str(enum_vals[0])
-                        safe_name = enum_val.replace("-", "").replace("_", "").replace(" ", "").capitalize()
-                        code += f'            is {kotlin_name}.{safe_name} -> output.encodeJsonElement(JsonPrimitive("{enum_val}"))\n'
-            
-            # Handle other variants - use their default serializers
-            for idx, variant in enumerate(variants):
-                if "enum" in variant and variant.get("type") == "string":
-                    continue  # Already handled above
-                elif variant.get("type") == "object" and "properties" in variant:
-                    props = variant.get("properties", {})
-                    if props and len(props) == 1:
-                        prop_name = list(props.keys())[0]
-                        discriminator_name = extract_discriminator_name(variant)
-                        prop_schema = props[prop_name]
-                        prop_type = get_kotlin_type(prop_schema, components)
-                        prop_type_base = prop_type.rstrip("?")
-                        
-                        if discriminator_name:
-                            variant_class_name = discriminator_name
-                        else:
-                            variant_class_name = to_kotlin_type_name(prop_name)
-                            if variant_class_name == prop_type_base:
-                                variant_class_name = f"{variant_class_name}Request"
-                        
-                        code += f'            is {kotlin_name}.{variant_class_name} -> output.encodeSerializableValue({kotlin_name}.{variant_class_name}.serializer(), value)\n'
-            
-            code += f"        }}\n"
-            code += f"    }}\n\n"
-            
-            # Generate deserialize method
-            code += f"    override fun deserialize(decoder: Decoder): {kotlin_name} {{\n"
-            code += f"        val input = decoder as? JsonDecoder ?: throw SerializationException(\"This serializer only works with JSON\")\n"
-            code += f"        val element = input.decodeJsonElement()\n"
-            code += f"        return when {{\n"
-            
-            # Check for enum string values first
-            for idx, variant in enumerate(variants):
-                if "enum" in variant and variant.get("type") == "string":
-                    enum_vals = variant.get("enum", [])
-                    if enum_vals:
-                        enum_val = str(enum_vals[0])
-                        safe_name = enum_val.replace("-", "").replace("_", "").replace(" ", "").capitalize()
-                        code += f'            element is JsonPrimitive && element.content == "{enum_val}" -> {kotlin_name}.{safe_name}\n'
-            
-            # Then check for object variants by their properties
-            for idx, variant in enumerate(variants):
-                if "enum" in variant and variant.get("type") == "string":
-                    continue  # Already handled above
-                elif variant.get("type") == "object" and "properties" in variant:
-                    props = variant.get("properties", {})
-                    if props and len(props) == 1:
-                        prop_name = list(props.keys())[0]
-                        discriminator_name = extract_discriminator_name(variant)
-                        prop_schema = props[prop_name]
-                        prop_type = get_kotlin_type(prop_schema, components)
-                        prop_type_base = prop_type.rstrip("?")
-                        
-                        if discriminator_name:
-                            variant_class_name = discriminator_name
-                        else:
-                            variant_class_name = to_kotlin_type_name(prop_name)
-                            if variant_class_name == prop_type_base:
-                                variant_class_name = f"{variant_class_name}Request"
-                        
-                        code += f'            "{prop_name}" in element.jsonObject -> input.json.decodeFromJsonElement({kotlin_name}.{variant_class_name}.serializer(), element)\n'
-            
-            code += f'            else -> throw SerializationException("Unknown variant in {kotlin_name}: ${{element}}")\n'
-            code += f"        }}\n"
-            code += f"    }}\n"
-            code += f"}}\n\n"
-        else:
-            # Use JsonContentPolymorphicSerializer for types without enum strings
-            code += f"object {kotlin_name}Serializer : JsonContentPolymorphicSerializer<{kotlin_name}>({kotlin_name}::class) {{\n"
-            code += f"    override fun selectDeserializer(element: JsonElement): DeserializationStrategy<{kotlin_name}> {{\n"
-            code += f"        return when {{\n"
-            
-            # Generate when branches based on variant type
-            for idx, variant in enumerate(variants):
-                # Handle primitive type variants first (but skip enum variants as they're generated as objects)
-                if variant.get("type") in ["string", "integer", "number", "boolean"] and "enum" not in variant:
-                    var_type = variant.get("type")
-                    type_name = var_type.capitalize()
-                    
-                    if var_type == "integer":
-                        code += f'            element is JsonPrimitive && element.longOrNull != null -> {kotlin_name}.{type_name}Value.serializer()\n'
-                    elif var_type == "number":
-                        code += f'            element is JsonPrimitive && element.doubleOrNull != null -> {kotlin_name}.{type_name}Value.serializer()\n'
-                    elif var_type == "boolean":
-                        code += f'            element is JsonPrimitive && element.booleanOrNull != null -> {kotlin_name}.{type_name}Value.serializer()\n'
-                    elif var_type == "string":
-                        # String is tricky - check if it's not an object and fallback to string
-                        code += f'            element is JsonPrimitive && element.isString -> {kotlin_name}.{type_name}Value.serializer()\n'
-                
-                # Handle enum variants (generated as objects)
-                elif "enum" in variant and variant.get("type") == "string":
-                    enum_vals = variant.get("enum", [])
-                    if enum_vals:
-                        enum_val = str(enum_vals[0])
-                        safe_name = enum_val.replace("-", "").replace("_", "").replace(" ", "").capitalize()
-                        # Note: we assume the variant name was generated uniquely in the variant generation section
-                        # For content-based serializers, enum objects are singleton objects, so check for specific marker
-                        # Since these are objects (not data classes), we can't easily detect them by properties
-                        # For now, we skip enum objects in content-based serializers as they should be handled
-                        # via externally-tagged serializers instead
-                        pass  # Skip enum objects - they should use externally-tagged format
-                
-                # Handle object variants with properties - check for unique property keys
-                elif variant.get("type") == "object" and "properties" in variant:
-                    props = variant.get("properties", {})
-                    if props:
-                        # Get the variant class name - we need to match what was generated above
-                        discriminator_name = extract_discriminator_name(variant)
-                        if len(props) == 1:
-                            prop_name = list(props.keys())[0]
-                            prop_schema = props[prop_name]
-                            prop_type = get_kotlin_type(prop_schema, components)
-                            prop_type_base = prop_type.rstrip("?")
-                            variant_class_name = to_kotlin_type_name(prop_name) if not discriminator_name else discriminator_name
-                            if variant_class_name == prop_type_base:
-                                variant_class_name = f"{variant_class_name}Request"
-                        elif discriminator_name:
-                            variant_class_name = discriminator_name
-                        else:
-                            variant_class_name = f"Variant{idx}"
-                        
-                        # Check for the specific property keys to identify this variant
-                        prop_names = list(props.keys())
-                        if len(prop_names) == 1:
-                            code += f'            "{prop_names[0]}" in element.jsonObject -> {kotlin_name}.{variant_class_name}.serializer()\n'
-                        else:
-                            # Check for first 2 properties
-                            conditions = " && ".join([f'"{prop}" in element.jsonObject' for prop in prop_names[:2]])
-                            code += f'            {conditions} -> {kotlin_name}.{variant_class_name}.serializer()\n'
-                
-                # Handle reference variants
-                elif "$ref" in variant:
-                    ref_name = resolve_ref_name(variant["$ref"])
-                    if ref_name:
-                        ref_kotlin_name = to_kotlin_type_name(ref_name)
-                        variant_class_name = f"{ref_kotlin_name}Variant"
-                        
-                        # Get the schema for this ref to find unique fields
-                        ref_schema = components.get(ref_name, {})
-                        
-                        # Check if the referenced type is a primitive (string, etc)
-                        ref_type = ref_schema.get("type")
-                        if ref_type == "string":
-                            # For string refs like CryptoHash, check if it's a string primitive
-                            code += f'            element is JsonPrimitive && element.isString -> {kotlin_name}.{variant_class_name}.serializer()\n'
-                        elif ref_type == "object" or "properties" in ref_schema:
-                            # For object refs, check for unique fields
-                            props = ref_schema.get("properties", {})
-                            if props:
-                                # Use first few properties as discriminators
-                                prop_names = list(props.keys())[:2]  # Check first 2 properties
-                                conditions = " && ".join([f'"{prop}" in element.jsonObject' for prop in prop_names])
-                                code += f'            {conditions} -> {kotlin_name}.{variant_class_name}.serializer()\n'
-                            else:
-                                # Object with no properties
-                                code += f'            element is JsonObject -> {kotlin_name}.{variant_class_name}.serializer()\n'
-            
-            code += f'            else -> throw SerializationException("Unknown variant in {kotlin_name}: type=${{element::class.simpleName}}")\n'
-            code += f"        }}\n"
-            code += f"    }}\n"
-            code += f"}}\n\n"
-    
-    # Generate custom serializer for externally-tagged unions
-    # Only generate if ALL variants are externally-tagged (100% match)
-    # This ensures the when statement in serialize() will be exhaustive
-    elif variant_serializer_map and len(variant_serializer_map) == len(variants):
-        code += f"// Custom serializer for {kotlin_name} to handle NEAR's externally-tagged union format\n"
-        code += f"object {kotlin_name}Serializer : KSerializer<{kotlin_name}> {{\n"
-        code += f"    override val descriptor: SerialDescriptor = buildClassSerialDescriptor(\"{kotlin_name}\")\n\n"
-        
-        code += f"    override fun serialize(encoder: Encoder, value: {kotlin_name}) {{\n"
-        code += f"        val output = encoder as? JsonEncoder ?: throw SerializationException(\"This serializer only works with JSON\")\n"
-        code += f"        when (value) {{\n"
-        
-        # Generate when branches for serialization
-        for wrapper_key, variant_class, is_object, is_primitive in variant_serializer_map:
-            if is_object:
-                # For object (singleton), encode as {"key": null}
-                code += f'            is {kotlin_name}.{variant_class} -> output.encodeJsonElement(buildJsonObject {{ put("{wrapper_key}", JsonNull) }})\n'
-            else:
-                # For data classes, serialize them directly - kotlinx.serialization will use @SerialName annotations
-                # This ensures {"prop_name": value} format without extra nesting
-                code += f'            is {kotlin_name}.{variant_class} -> output.encodeSerializableValue({kotlin_name}.{variant_class}.serializer(), value)\n'
-        
-        code += f"        }}\n"
-        code += f"    }}\n\n"
-        
-        code += f"    override fun deserialize(decoder: Decoder): {kotlin_name} {{\n"
-        code += f"        val input = decoder as? JsonDecoder ?: throw SerializationException(\"This serializer only works with JSON\")\n"
-        code += f"        val element = input.decodeJsonElement().jsonObject\n"
-        code += f"        return when {{\n"
-        
-        # Generate when branches for deserialization
-        for wrapper_key, variant_class, is_object, is_primitive in variant_serializer_map:
-            if is_object:
-                # For object (singleton), just return the object itself
-                code += f'            "{wrapper_key}" in element -> {kotlin_name}.{variant_class}\n'
-            else:
-                # For data classes, deserialize from the nested object inside the wrapper key
-                # Extract element["{wrapper_key}"] to get the actual data
-                code += f'            "{wrapper_key}" in element -> input.json.decodeFromJsonElement({kotlin_name}.{variant_class}.serializer(), element["{wrapper_key}"]!!)\n'
-        
-        code += f"            else -> throw SerializationException(\"Unknown variant in {kotlin_name}: ${{element.keys}}\")\n"
-        code += f"        }}\n"
-        code += f"    }}\n"
-        code += f"}}\n\n"
+            emit_content_serializer(out, model)
+    elif model.serializer == "externally_tagged":
+        out.line(f"// Custom serializer for {kotlin_name} to handle NEAR's externally-tagged union format")
+        emit_externally_tagged_serializer(out, model)
     
-    return code
+    return out.getvalue()
 
-def generate_kotlin_for_schema(name: str, schema: Dict[str, Any], components: Dict[str, Any], generated_types: Set[str]) -> str:
-    """Generate Kotlin code for a schema"""
+def kotlin_generator_path(node: SchemaNode) -> Optional[str]:
+    """
+    The path generate_kotlin_for_schema emits a schema through: the generate_kotlin_*
+    function it calls, "typealias", or None when nothing is emitted.
+    """
+    schema = node.schema
     
-    # Skip simple references
+    # Simple references
     if "$ref" in schema and len(schema) == 1:
-        return ""
+        return None
     
-    # Generate enum
     if "enum" in schema:
-        return generate_kotlin_enum(name, schema)
+        return "generate_kotlin_enum"
     
-    # Check if this has union types (oneOf/anyOf)
-    has_union = "oneOf" in schema or "anyOf" in schema
-    has_properties = "properties" in schema
-    is_object = schema.get("type") == "object"
+    # Union types (oneOf/anyOf) become sealed interfaces with type-safe variants
+    if "oneOf" in schema or "anyOf" in schema:
+        return "generate_kotlin_sealed_interface"
     
-    # If has union types, generate sealed interface with type-safe variants
-    if has_union:
-        return generate_kotlin_sealed_interface(name, schema, components, generated_types)
+    # allOf resolving to a primitive type becomes a typealias, anything else a data class
+    if node.merged is not None:
+        return "typealias" if node.merged.get("type") in PRIMITIVE_JSON_TYPES else "generate_kotlin_data_class"
     
-    # Handle allOf - need to check if it resolves to a primitive type or object
-    if "allOf" in schema:
-        merged = merge_allof(schema["allOf"], components)
-        merged_type = merged.get("type")
-        
-        # If allOf resolves to a primitive type, generate typealias
-        if merged_type in ["string", "integer", "number", "boolean"]:
-            base_type = get_kotlin_primitive_type(merged, components)
-            kotlin_name = to_kotlin_type_name(name)
-            if not register_generated_type(kotlin_name, generated_types):
-                return ""
-            description = schema.get("description", "").strip()
-            if description:
-                first_line = description.split("\n")[0]
-                if len(first_line) > 80:
-                    first_line = first_line[:77] + "..."
-                return f"/**\n * {first_line}\n */\ntypealias {kotlin_name} = {base_type}\n\n"
-            return f"typealias {kotlin_name} = {base_type}\n\n"
-        
-        # Otherwise treat as object/data class
-        return generate_kotlin_data_class(name, schema, components, generated_types)
+    if "properties" in schema or schema.get("type") == "object":
+        return "generate_kotlin_data_class"
+    
+    # Named primitive and array types
+    if schema.get("type") in PRIMITIVE_JSON_TYPES or schema.get("type") == "array":
+        return "typealias"
+    
+    return None
+
+@traced("types")
+def generate_kotlin_for_schema(name: str, node: SchemaNode, components: Dict[str, Any], symbols: SymbolTable) -> str:
+    """Generate Kotlin code for a component schema"""
+    schema = node.schema
+    path = kotlin_generator_path(node)
+    
+    if path is None:
+        return ""
+    
+    # Generate enum (enum names are not reserved, only bound)
+    if path == "generate_kotlin_enum":
+        symbols.bind(name, to_kotlin_type_name(name))
+        return generate_kotlin_enum(name, schema)
+    
+    if path == "generate_kotlin_sealed_interface":
+        return generate_kotlin_sealed_interface(name, schema, components, symbols)
     
-    # Generate data class for objects with properties
-    if has_properties or is_object:
-        return generate_kotlin_data_class(name, schema, components, generated_types)
+    if path == "generate_kotlin_data_class":
+        return generate_kotlin_data_class(name, node.merged or schema, components, symbols)
+    
+    # Typealias for an allOf that resolves to a primitive type
+    if node.merged is not None:
+        base_type = get_kotlin_primitive_type(node.merged, components)
+        kotlin_name = to_kotlin_type_name(name)
+        if not register_generated_type(kotlin_name, symbols, name):
+            return ""
+        description = schema.get("description", "").strip()
+        if description:
+            first_line = description.split("\n")[0]
+            if len(first_line) > 80:
+                first_line = first_line[:77] + "..."
+            return f"/**\n * {first_line}\n */\ntypealias {kotlin_name} = {base_type}\n\n"
+        return f"typealias {kotlin_name} = {base_type}\n\n"
     
     # Generate typealias for primitive types that are given names in the schema
     schema_type = schema.get("type")
     
     if schema_type in ["string", "integer", "number", "boolean"]:
         kotlin_name = to_kotlin_type_name(name)
-        if not register_generated_type(kotlin_name, generated_types):
+        if not register_generated_type(kotlin_name, symbols, name):
             return ""
         
         # Determine the Kotlin type
@@ -1209,7 +999,7 @@ def generate_kotlin_for_schema(name: str, schema: Dict[str, Any], components: Di
     # Handle array types
     if schema_type == "array":
         kotlin_name = to_kotlin_type_name(name)
-        if not register_generated_type(kotlin_name, generated_types):
+        if not register_generated_type(kotlin_name, symbols, name):
             return ""
         
         items = schema.get("items", {})
@@ -1225,6 +1015,180 @@ def generate_kotlin_for_schema(name: str, schema: Dict[str, Any], components: Di
     
     return ""
 
+# --- Shape Deduplication ---
+
+_KDOC_BLOCK = re.compile(r'^[ \t]*/\*\*.*?\*/\n', re.S | re.M)
+_DECLARES_CLASS = re.compile(r'\b(?:class|interface|object)\s+[A-Z]')
+
+def type_name_pattern(names: List[str]) -> re.Pattern:
+    """Whole-word matcher for Kotlin type names and their generated `NameSerializer` objects"""
+    alternatives = "|".join(re.escape(name) for name in sorted(names, key=len, reverse=True))
+    return re.compile(rf'\b({alternatives})(?=(?:Serializer)?\b)')
+
+def find_duplicate_fragments(ir: SchemaIR, fragments: List[Tuple[str, str]], symbols: SymbolTable) -> Dict[str, str]:
+    """
+    Hash-cons the emitted fragments that declare a class, interface or object. Two schemas are
+    duplicates when their code is identical once KDoc is dropped, each one's own name is
+    abstracted and names already found to be duplicates are replaced by their canonical name;
+    repeating that until nothing changes also merges schemas that only differ in referencing
+    two duplicates. Returns duplicate schema -> canonical schema (the first one emitted).
+    """
+    kotlin_names = {
+        name: symbols.symbol_for(name, ir.nodes[name].kotlin_name)
+        for name, code in fragments if code and _DECLARES_CLASS.search(code)
+    }
+    # Own name abstracted first, so renaming the duplicates never touches a fragment's own declarations
+    codes = {
+        name: type_name_pattern([kotlin_names[name]]).sub("\0", _KDOC_BLOCK.sub("", code))
+        for name, code in fragments if name in kotlin_names
+    }
+    
+    duplicates: Dict[str, str] = {}
+    while True:
+        renames = {kotlin_names[duplicate]: kotlin_names[canonical] for duplicate, canonical in duplicates.items()}
+        renamed = type_name_pattern(list(renames)) if renames else None
+        canonical_by_shape: Dict[str, str] = {}
+        found: Dict[str, str] = {}
+        for name, code in codes.items():
+            shape = renamed.sub(lambda match: renames[match.group(1)], code) if renamed is not None else code
+            canonical = canonical_by_shape.setdefault(shape, name)
+            if canonical != name:
+                found[name] = canonical
+        if found == duplicates:
+            return duplicates
+        duplicates = found
+
+def generate_type_alias(kotlin_name: str, target: str, schema: Dict[str, Any]) -> str:
+    """typealias emitted for a schema deduplicated into `target`, keeping its KDoc"""
+    description = schema.get("description", "").strip()
+    if description:
+        first_line = description.split("\n")[0]
+        if len(first_line) > 80:
+            first_line = first_line[:77] + "..."
+        return f"/**\n * {first_line}\n */\ntypealias {kotlin_name} = {target}\n\n"
+    return f"typealias {kotlin_name} = {target}\n\n"
+
+def dedupe_fragments(ir: SchemaIR, fragments: List[Tuple[str, str]], symbols: SymbolTable) -> Tuple[List[Tuple[str, str]], Dict[str, str]]:
+    """Replace the fragment of every duplicate schema with a typealias to its canonical type"""
+    duplicates = find_duplicate_fragments(ir, fragments, symbols)
+    deduped = []
+    for name, code in fragments:
+        canonical = duplicates.get(name)
+        if canonical is not None:
+            code = generate_type_alias(
+                symbols.symbol_for(name, ir.nodes[name].kotlin_name),
+                symbols.symbol_for(canonical, ir.nodes[canonical].kotlin_name),
+                ir.nodes[name].schema,
+            )
+        deduped.append((name, code))
+    return deduped, duplicates
+
+def generate_cached_kotlin_for_schema(ir: SchemaIR, name: str, symbols: SymbolTable, cache: FragmentCache) -> str:
+    """
+    Generate Kotlin code for a schema, reusing the fragment cached under its content hash.
+    A fragment depends only on the schema's closure and on whether its Kotlin name is
+    already taken, so fragments are only stored or replayed while the name is still free.
+    """
+    node = ir.nodes[name]
+    if node.kotlin_name in symbols:
+        return generate_kotlin_for_schema(name, node, ir.components, symbols)
+    
+    key = ir.content_hash(name)
+    cached = cache.get(key)
+    if cached is not None:
+        replay_fragment(symbols, name, cached)
+        return cached["code"]
+    
+    registered_before = symbols.names()
+    code = generate_kotlin_for_schema(name, node, ir.components, symbols)
+    cache.put(key, {"code": code, "types": sorted(symbols.names() - registered_before), "symbol": symbols.symbol_for(name)})
+    return code
+
+def replay_fragment(symbols: SymbolTable, name: str, fragment: Dict[str, Any]):
+    """Register the type names and schema symbol of a fragment generated elsewhere (cache or worker)"""
+    symbols.update(fragment["types"])
+    if fragment["symbol"] is not None:
+        symbols.bind(name, fragment["symbol"])
+
+def emit_schema_fragment(ir: SchemaIR, name: str) -> Dict[str, Any]:
+    """
+    Generate one schema's Kotlin code against an empty symbol table.
+    Returns the fragment: its code, the type names it registered and the schema's symbol.
+    """
+    symbols = SymbolTable()
+    code = generate_kotlin_for_schema(name, ir.nodes[name], ir.components, symbols)
+    return {"code": code, "types": sorted(symbols), "symbol": symbols.symbol_for(name)}
+
+def find_independent_schemas(ir: SchemaIR, names: List[str]) -> Set[str]:
+    """
+    Resolve name reservation up front: a schema whose Kotlin name no other schema shares
+    (and that cannot clash with a numbered duplicate) never depends on what was emitted
+    before it, so it can be generated in isolation. The rest stay on the serial path.
+    """
+    counts = Counter(ir.nodes[name].kotlin_name for name in names)
+    clashing = [kotlin_name for kotlin_name, count in counts.items() if count > 1]
+    return {
+        name for name in names
+        if not any(ir.nodes[name].kotlin_name.startswith(base) for base in clashing)
+    }
+
+_worker_ir: Optional[SchemaIR] = None
+
+def _init_worker(ir: SchemaIR, dedupe: bool = False):
+    global _worker_ir, _dedupe_shapes
+    _worker_ir = ir
+    _dedupe_shapes = dedupe
+    ir.naming.install()
+
+def _emit_in_worker(name: str) -> Dict[str, Any]:
+    return emit_schema_fragment(_worker_ir, name)
+
+def generate_type_fragments(ir: SchemaIR, cache: FragmentCache, jobs: int = 1) -> Tuple[List[Tuple[str, str]], SymbolTable]:
+    """
+    Generate the Kotlin fragment of every schema in emission order.
+    Independent schemas missing from the cache are emitted across `jobs` worker processes;
+    fragments are merged back in the same stable order, so the result is identical to a serial run.
+    Returns the (schema name, code) pairs and the symbol table of registered type names.
+    """
+    order = ir.graph.order
+    independent = find_independent_schemas(ir, order)
+    
+    fragments: Dict[str, Dict[str, Any]] = {}
+    pending = []
+    for name in order:
+        if name not in independent:
+            continue
+        cached = cache.get(ir.content_hash(name))
+        if cached is not None:
+            fragments[name] = cached
+        else:
+            pending.append(name)
+    
+    if jobs > 1 and len(pending) > 1:
+        # multiprocessing is only worth importing when it is used
+        from concurrent.futures import ProcessPoolExecutor
+        chunksize = max(1, len(pending) // (jobs * 4))
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(ir, _dedupe_shapes)) as pool:
+            for name, fragment in zip(pending, pool.map(_emit_in_worker, pending, chunksize=chunksize)):
+                fragments[name] = fragment
+    else:
+        for name in pending:
+            fragments[name] = emit_schema_fragment(ir, name)
+    
+    for name in pending:
+        cache.put(ir.content_hash(name), fragments[name])
+    
+    symbols = SymbolTable()
+    results = []
+    for name in order:
+        if name in fragments:
+            code = fragments[name]["code"]
+            replay_fragment(symbols, name, fragments[name])
+        else:
+            code = generate_cached_kotlin_for_schema(ir, name, symbols, cache)
+        results.append((name, code))
+    return results, symbols
+
 # --- Methods Generation ---
 
 def generate_methods_code(openapi: Dict[str, Any], components_schemas: Dict[str, Any]) -> str:
@@ -1241,7 +1205,8 @@ import org.near.jsonrpc.types.*
 
 """
     
-    methods_code = header
+    out = CodeEmitter()
+    out.write(header)
     paths = openapi.get("paths", {})
     
     # Sort methods alphabetically for consistency
@@ -1331,64 +1296,202 @@ import org.near.jsonrpc.types.*
                 result_type = get_kotlin_type(result_schema, components_schemas)
         
         # Generate KDoc
-        methods_code += "/**\n"
+        out.line("/**")
         if description:
             desc_lines = description.strip().split("\n")
             first_line = desc_lines[0] if desc_lines else ""
             if first_line:
                 if len(first_line) > 100:
                     first_line = first_line[:97] + "..."
-                methods_code += f" * {first_line}\n"
-        methods_code += " */\n"
+                out.line(f" * {first_line}")
+        out.line(" */")
         
         # Generate extension function
-        methods_code += f"suspend fun NearRpcClient.{method_name}(\n"
-        methods_code += f"    params: {params_type}\n"
-        methods_code += f"): {result_type} = call(\n"
-        methods_code += f"    method = \"{operation_id}\",\n"
-        methods_code += f"    params = params,\n"
+        out.line(f"suspend fun NearRpcClient.{method_name}(")
+        out.line(f"    params: {params_type}")
+        out.line(f"): {result_type} = call(")
+        out.line(f"    method = \"{operation_id}\",")
+        out.line("    params = params,")
         
         # Determine the serializer for params
         if params_type == "JsonElement":
-            methods_code += f"    paramsSerializer = JsonElement.serializer(),\n"
+            out.line("    paramsSerializer = JsonElement.serializer(),")
         elif params_type.startswith("List<"):
             inner_type = params_type[5:-1]  # Extract type from List<Type>
             if inner_type == "String":
-                methods_code += f"    paramsSerializer = ListSerializer(String.serializer()),\n"
+                out.line("    paramsSerializer = ListSerializer(String.serializer()),")
             else:
-                methods_code += f"    paramsSerializer = ListSerializer({inner_type}.serializer()),\n"
+                out.line(f"    paramsSerializer = ListSerializer({inner_type}.serializer()),")
         elif params_type.endswith("?"):
             base_type = params_type[:-1]
-            methods_code += f"    paramsSerializer = {base_type}.serializer(),\n"
+            out.line(f"    paramsSerializer = {base_type}.serializer(),")
         else:
-            methods_code += f"    paramsSerializer = {params_type}.serializer(),\n"
+            out.line(f"    paramsSerializer = {params_type}.serializer(),")
         
         # Determine the serializer for result
         if result_type == "JsonElement":
-            methods_code += f"    resultSerializer = JsonElement.serializer()\n"
+            out.line("    resultSerializer = JsonElement.serializer()")
         elif result_type.startswith("List<"):
             inner_type = result_type[5:-1]
             if inner_type == "String":
-                methods_code += f"    resultSerializer = ListSerializer(String.serializer())\n"
+                out.line("    resultSerializer = ListSerializer(String.serializer())")
             else:
-                methods_code += f"    resultSerializer = ListSerializer({inner_type}.serializer())\n"
+                out.line(f"    resultSerializer = ListSerializer({inner_type}.serializer())")
         elif result_type.endswith("?"):
             base_type = result_type[:-1]
-            methods_code += f"    resultSerializer = {base_type}.serializer()\n"
+            out.line(f"    resultSerializer = {base_type}.serializer()")
         else:
-            methods_code += f"    resultSerializer = {result_type}.serializer()\n"
+            out.line(f"    resultSerializer = {result_type}.serializer()")
         
-        methods_code += ")\n\n"
+        out.line(")").line()
     
-    return methods_code
+    return out.getvalue()
 
+def generate_serializers_module(custom_serializers: List[str]) -> str:
+    """Generate the nearSerializersModule declaration"""
+    out = CodeEmitter()
+    out.line()
+    out.line("/**")
+    out.line(" * SerializersModule for NEAR's externally-tagged unions.")
+    out.line(" */")
+    out.line("val nearSerializersModule = SerializersModule {")
+    
+    with out.indented():
+        for type_name in sorted(custom_serializers):
+            out.line(f"polymorphic({type_name}::class) {{ defaultDeserializer {{ {type_name}Serializer }} }}")
+    
+    out.line("}")
+    return out.getvalue()
 
-def main():
-    """Main function to generate Kotlin types from OpenAPI spec"""
+def method_area_name(operation_id: str) -> str:
+    """RPC method area used as a shard name, e.g. EXPERIMENTAL_changes -> ExperimentalChanges"""
+    return "".join(part.capitalize() for part in operation_id.split("_") if part)
+
+def assign_method_areas(ir: SchemaIR) -> Dict[str, str]:
+    """
+    Map each schema to the RPC method area that uses it.
+    Schemas reachable from more than one method (or from none) belong to the common area.
+    """
+    users: Dict[str, Set[str]] = {}
+    for path, post_op in ir.methods():
+        area = method_area_name(post_op.get("operationId") or path.strip("/"))
+        roots = [ref for ref in schema_ir.collect_ref_names(post_op) if ref in ir.nodes]
+        for root in roots:
+            for name in (root,) + ir.transitive_refs(root):
+                users.setdefault(name, set()).add(area)
+    
+    return {
+        name: next(iter(users[name])) if len(users.get(name, ())) == 1 else COMMON_AREA
+        for name in ir.nodes
+    }
+
+def group_fragments_into_shards(ir: SchemaIR, fragments: List[Tuple[str, str]], shard_by: str) -> Dict[str, List[str]]:
+    """
+    Group emitted fragments into shard files, keyed by file stem.
+    Fragments keep their dependency order inside each shard.
+    """
+    areas = assign_method_areas(ir) if shard_by == "area" else {}
+    shards: Dict[str, List[str]] = {}
+    
+    for name, code in fragments:
+        if not code:
+            continue
+        if shard_by == "type":
+            stem = ir.kotlin_name(name)
+        elif shard_by == "scc":
+            # Recursive groups share a file named after their first member
+            stem = ir.kotlin_name(ir.graph.scc_of(name)[0])
+        else:
+            stem = f"{areas[name]}Types"
+        shards.setdefault(stem, []).append(code)
+    
+    return shards
+
+def is_generated_shard(path: str) -> bool:
+    """True if `path` is a shard file written by a sharded run"""
+    if not path.endswith(".kt"):
+        return False
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return f.readline().rstrip("\n") == SHARD_MARKER
+    except OSError:
+        return False
+
+def write_type_shards(writer: OutputWriter, output_dir: str, shards: Dict[str, List[str]], module_code: str) -> List[str]:
+    """
+    Write one file per shard plus PolymorphicSerializer.kt and NearSerializersModule.kt.
+    Returns the file names.
+    """
+    files = {
+        "PolymorphicSerializer.kt": [POLYMORPHIC_SERIALIZER_CODE],
+        "NearSerializersModule.kt": [module_code.lstrip("\n")],
+    }
+    for stem, codes in shards.items():
+        files[f"{stem}.kt"] = codes
+    
+    for file_name, codes in files.items():
+        out = CodeEmitter()
+        out.line(SHARD_MARKER)
+        out.write(FILE_HEADER)
+        for code in codes:
+            out.write(code)
+        writer.write(os.path.join(output_dir, file_name), out.getvalue())
+    
+    return list(files)
+
+def collect_type_metrics(ir: SchemaIR, fragments: List[Tuple[str, str]], symbols: SymbolTable) -> Dict[str, Dict[str, Any]]:
+    """Size of the code emitted for every top-level schema and the generator path that emitted it"""
+    metrics = {}
+    for name, code in fragments:
+        if not code:
+            continue
+        node = ir.nodes[name]
+        entry = measure_fragment(code)
+        entry["kotlin_name"] = symbols.symbol_for(name, node.kotlin_name)
+        entry["generator"] = kotlin_generator_path(node)
+        metrics[name] = entry
+    return metrics
+
+def enforce_size_budget(type_metrics: Dict[str, Dict[str, Any]], mode: str) -> bool:
+    """Print the findings of the size budget check; returns False if a fail threshold was crossed"""
+    budget = load_budget()
+    if budget is None:
+        print(f"📏 No size budget at {SIZE_BUDGET_PATH} (create one with --update-size-budget)")
+        return True
+    findings = check_budget(type_metrics, budget)
+    failures = [finding for finding in findings if finding.level == "fail"]
+    if not findings:
+        print(f"📏 Generated code within the size budget ({SIZE_BUDGET_PATH})")
+        return True
+    print(f"📏 Size budget: {len(failures)} over the fail threshold, {len(findings) - len(failures)} over the warn threshold")
+    for finding in findings:
+        print(f"   {'❌' if finding.level == 'fail' else '⚠️ '} {finding.describe()}")
+    return not (failures and mode == "fail")
+
+def run(no_cache: bool = False, cache_stats: bool = False, jobs: int = 1, shard_by: str = "none",
+        size_budget: str = "warn", update_size_budget: bool = False, dedupe: bool = False,
+        methods: Optional[Tuple[str, ...]] = None, output_root: Optional[str] = None, cache_dir: str = CACHE_DIR):
+    """
+    Generate Kotlin types and RPC methods from the OpenAPI spec.
+    With methods (operationIds), only those RPC methods and the schemas they reach are emitted,
+    below output_root (with the repository's layout) instead of the repository.
+    With dedupe, structurally identical schemas become typealiases of one type and identical
+    nested inline classes of a union are declared once.
+    Raises SizeBudgetExceeded (after writing every output) when size_budget is "fail" and
+    the generated code grew past a fail threshold of the checked-in budget.
+    Caches, the symbol table and the size metrics go to cache_dir.
+    """
+    check_output_root(methods, output_root)
+    types_path = relocate_output(OUTPUT_TYPES_PATH, output_root)
+    methods_path = relocate_output(OUTPUT_METHODS_PATH, output_root)
+    
     print(f"Loading OpenAPI specification from {OPENAPI_PATH}...")
-    openapi = load_openapi()
+    ir = get_ir(use_cache=not no_cache, methods=methods, cache_dir=cache_dir)
+    openapi = ir.openapi
+    if methods:
+        print(f"🎯 --methods: scoped to {len(ir.methods())} RPC methods and the schemas they reach")
     
-    components_schemas = openapi.get("components", {}).get("schemas", {})
+    components_schemas = ir.components
     if not components_schemas:
         print("No schemas found in OpenAPI specification")
         return
@@ -1396,79 +1499,142 @@ def main():
     print(f"Found {len(components_schemas)} schemas")
     
     # Generate Kotlin code
-    kotlin_code = HEADER_CODE
+    out = CodeEmitter()
+    if shard_by == "none":
+        out.write(HEADER_CODE)
     
-    generated_types = set()
     custom_serializers = []  # Track sealed interfaces with custom serializers
     
-    # Sort schemas by complexity
-    def schema_complexity(item):
-        name, schema = item
-        if "$ref" in schema and len(schema) == 1:
-            return 0
-        elif schema.get("type") in ["string", "integer", "number", "boolean"]:
-            return 1
-        elif "enum" in schema:
-            return 2
-        elif schema.get("type") == "array":
-            return 3
-        elif "oneOf" in schema or "anyOf" in schema:
-            return 4
-        elif "allOf" in schema:
-            return 5
-        else:
-            return 6
+    global _dedupe_shapes
+    _dedupe_shapes = dedupe
+    # Deduplicated fragments differ, so they are cached separately
+    cache = FragmentCache("types-dedupe" if dedupe else "types", source_fingerprint(*FRAGMENT_SOURCES), enabled=not no_cache, cache_dir=cache_dir)
+    jobs = jobs if jobs > 0 else (os.cpu_count() or 1)
+    
+    # Schemas are emitted in dependency order: referenced types first, recursive groups together
+    with span("generate_type_fragments", "types", jobs=jobs):
+        fragments, symbols = generate_type_fragments(ir, cache, jobs)
     
-    sorted_schemas = sorted(components_schemas.items(), key=schema_complexity)
+    if dedupe:
+        fragments, duplicates = dedupe_fragments(ir, fragments, symbols)
+        print(f"♻️  --dedupe: {len(duplicates)} schemas alias a structurally identical type")
     
-    for name, schema in sorted_schemas:
-        code = generate_kotlin_for_schema(name, schema, components_schemas, generated_types)
+    for name, code in fragments:
         if code:
-            kotlin_code += code
+            if shard_by == "none":
+                out.write(code)
             
             # Track if this is a sealed interface with a custom serializer
-            kotlin_name = to_kotlin_type_name(name)
-            if ("oneOf" in schema or "anyOf" in schema) and "@Serializable(with =" in code:
-                custom_serializers.append(kotlin_name)
+            node = ir.nodes[name]
+            if node.kind == "union" and "@Serializable(with =" in code:
+                custom_serializers.append(symbols.symbol_for(name, node.kotlin_name))
     
-    kotlin_code += "\n/**\n"
-    kotlin_code += " * SerializersModule for NEAR's externally-tagged unions.\n"
-    kotlin_code += " */\n"
-    kotlin_code += "val nearSerializersModule = SerializersModule {\n"
+    module_code = generate_serializers_module(custom_serializers)
     
-    for type_name in sorted(custom_serializers):
-        kotlin_code += f"    polymorphic({type_name}::class) {{ defaultDeserializer {{ {type_name}Serializer }} }}\n"
+    output_dir = os.path.dirname(os.path.abspath(types_path))
+    os.makedirs(output_dir, exist_ok=True)
+    
+    writer = OutputWriter("types", cache_dir)
+    if shard_by == "none":
+        # Write Types.kt
+        out.write(module_code)
+        print(f"Writing Kotlin types to {types_path}...")
+        writer.write(types_path, out.getvalue())
+    else:
+        shards = group_fragments_into_shards(ir, fragments, shard_by)
+        print(f"Writing Kotlin types to {len(shards)} shard files (--shard-by {shard_by}) in {output_dir}...")
+        write_type_shards(writer, output_dir, shards, module_code)
+        # The single-file output would redeclare every type
+        writer.remove(types_path)
     
-    kotlin_code += "}\n"
+    # The schema -> Kotlin symbol map, for the mock and test stages
+    writer.write(symbols_path(output_root, cache_dir), symbols.to_json())
     
-    # Write Types.kt
-    output_dir = os.path.dirname(os.path.abspath(OUTPUT_TYPES_PATH))
-    os.makedirs(output_dir, exist_ok=True)
+    # Shards from an earlier sharded run (or another --shard-by mode)
+    for path in writer.remove_orphans(output_dir, is_generated_shard):
+        print(f"🗑️  Removed stale shard: {os.path.basename(path)}")
     
-    print(f"Writing Kotlin types to {OUTPUT_TYPES_PATH}...")
-    with open(OUTPUT_TYPES_PATH, "w", encoding="utf-8") as f:
-        f.write(kotlin_code)
+    # A --methods run must not evict the fragments of schemas outside its scope
+    cache.save(prune=not methods)
     
-    print(f"Successfully generated {len(generated_types)} Kotlin types")
-    print(f"Output written to: {OUTPUT_TYPES_PATH}")
+    # Lines, bytes and nested classes per schema, for the size budget
+    type_metrics = collect_type_metrics(ir, fragments, symbols)
+    if update_size_budget:
+        writer.write(SIZE_BUDGET_PATH, budget_from_metrics(type_metrics, (load_budget() or {}).get("thresholds")))
+    
+    print(f"Successfully generated {len(symbols)} Kotlin types")
+    print(f"Output written to: {types_path if shard_by == 'none' else output_dir}")
+    if cache.enabled:
+        print(f"♻️  {cache.summary()}")
     
     # Generate and write Methods.kt
     print(f"\nGenerating RPC methods...")
-    methods_code = generate_methods_code(openapi, components_schemas)
+    with span("generate_methods_code", "types"):
+        methods_code = generate_methods_code(openapi, components_schemas)
     
-    methods_dir = os.path.dirname(os.path.abspath(OUTPUT_METHODS_PATH))
+    methods_dir = os.path.dirname(os.path.abspath(methods_path))
     os.makedirs(methods_dir, exist_ok=True)
     
-    print(f"Writing methods to {OUTPUT_METHODS_PATH}...")
-    with open(OUTPUT_METHODS_PATH, "w", encoding="utf-8") as f:
-        f.write(methods_code)
+    print(f"Writing methods to {methods_path}...")
+    writer.write(methods_path, methods_code)
     
     # Count methods
     method_count = len([p for p in openapi.get("paths", {}).values() if "post" in p])
     print(f"Successfully generated {method_count} RPC methods")
-    print(f"Output written to: {OUTPUT_METHODS_PATH}")
+    print(f"Output written to: {methods_path}")
+    
+    writer.save()
+    print(f"📝 {writer.summary()}")
+    
+    if cache_stats:
+        print()
+        print_resolution_cache_stats()
+    
+    within_budget = True
+    if size_budget != "off" and not update_size_budget:
+        # Only a budget check leaves metrics behind, so --size-budget off runs (benchmark.py) keep
+        # them intact, and a --methods run writes its own below the output root
+        run_metrics_path = metrics_path(output_root, cache_dir)
+        write_metrics(type_metrics, run_metrics_path)
+        print(f"\nPer-schema size metrics written to {run_metrics_path}")
+        within_budget = enforce_size_budget(type_metrics, size_budget)
+    if not within_budget:
+        raise SizeBudgetExceeded(f"generated code exceeds the size budget in {SIZE_BUDGET_PATH}")
     
     print(f"\n✅ Code generation complete!")
 
+def main():
+    """Main function to generate Kotlin types from OpenAPI spec"""
+    parser = argparse.ArgumentParser(description="Generate Kotlin types and RPC methods from the OpenAPI spec")
+    parser.add_argument("--no-cache", action="store_true", help="regenerate every schema instead of reusing cached fragments")
+    parser.add_argument("--cache-stats", action="store_true", help="print hit/miss statistics of the resolution caches (main process only)")
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="worker processes for type emission (0 = one per CPU)")
+    parser.add_argument("--shard-by", choices=SHARD_MODES, default="none",
+                        help="split the types into several files: one per dependency SCC, per RPC method area or per top-level type")
+    parser.add_argument("--dedupe", action="store_true",
+                        help="emit structurally identical schemas once (the others become typealiases) and share identical inline classes")
+    parser.add_argument("--size-budget", choices=BUDGET_MODES, default="warn",
+                        help=f"check the per-schema code size against {SIZE_BUDGET_PATH}: report only, or also exit with status 1")
+    parser.add_argument("--update-size-budget", action="store_true", help=f"accept the current code size as the new baseline in {SIZE_BUDGET_PATH}")
+    parser.add_argument("--methods", type=parse_method_allowlist,
+                        help="comma-separated operationIds (or @file): generate only these RPC methods and the types they reach")
+    parser.add_argument("--output-root", help="write the outputs below this directory (same layout as the repository); required with --methods")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    if args.methods and args.update_size_budget:
+        parser.error("--update-size-budget records the full spec, it cannot be combined with --methods")
+    try:
+        check_output_root(args.methods, args.output_root)
+    except ValueError as e:
+        parser.error(str(e))
+    try:
+        with profiling(args.profile, args.cprofile), span("types", "stage"):
+            run(no_cache=args.no_cache, cache_stats=args.cache_stats, jobs=args.jobs, shard_by=args.shard_by,
+                size_budget=args.size_budget, update_size_budget=args.update_size_budget, dedupe=args.dedupe,
+                methods=args.methods, output_root=args.output_root)
+    except (SizeBudgetExceeded, UnknownMethodsError) as e:
+        print(f"\n❌ {e}")
+        sys.exit(1)
+
 if __name__ == "__main__":
     main()
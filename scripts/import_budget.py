@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Startup-time budget for the generator modules.
+
+The hard check is deterministic: importing a generator module must not pull in anything
+listed in FORBIDDEN_IMPORTS (jsonschema is only loaded once a mock sample is validated,
+process pools and profilers only when asked for). Import time is checked relative to
+the machine: each module is imported in a fresh interpreter, alternating with
+REFERENCE_IMPORTS (a fixed set of stdlib modules), and the ratio of the best times must
+stay within IMPORT_BUDGET_RATIO (times --slack). Absolute milliseconds are only reported.
+Exits with status 1 when a module imports something it should not or is over budget.
+"""
+
+import argparse
+import compileall
+import json
+import os
+import subprocess
+import sys
+from typing import Any, Dict, List, Set, Tuple
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Stdlib imports every generator needs anyway; their import time is the unit of the budget
+REFERENCE_IMPORTS = ("argparse", "json", "re", "typing", "hashlib", "pickle", "subprocess")
+
+# Import time as a multiple of REFERENCE_IMPORTS; about 1.5x the worst ratios measured
+# when last re-baselined (Python 3.8, 3.10 and 3.11, idle and under CPU load: schema_ir
+# 0.9, generate_types 1.35, generate_mock 1.2, generate_tests 1.15, codegen 1.35), so
+# noise or adding a helper module does not trip the check
+IMPORT_BUDGET_RATIO = {
+    "schema_ir": 1.4,
+    "generate_types": 2.0,
+    "generate_mock": 1.8,
+    "generate_tests": 1.8,
+    "codegen": 2.0,
+}
+
+LAZY_DEPENDENCIES = (
+    "jsonschema", "cProfile", "pstats", "concurrent.futures", "multiprocessing",
+    # Only --methods (lazy_spec) and codegen.py --changes (spec_diff) need these
+    "lazy_spec", "mmap", "spec_diff",
+)
+FORBIDDEN_IMPORTS = {module: LAZY_DEPENDENCIES for module in IMPORT_BUDGET_RATIO}
+
+def measure_import(modules: Tuple[str, ...]) -> Tuple[float, Set[str]]:
+    """Import `modules` in a fresh interpreter; returns (milliseconds, names of every module imported)"""
+    code = "\n".join((
+        "import sys, time",
+        "before = set(sys.modules)",
+        "start = time.perf_counter()",
+        f"import {', '.join(modules)}",
+        "elapsed = time.perf_counter() - start",
+        "print(elapsed)",
+        "print(' '.join(sorted(set(sys.modules) - before)))",
+    ))
+    result = subprocess.run([sys.executable, "-c", code], cwd=SCRIPTS_DIR, capture_output=True, text=True, check=True)
+    elapsed, imported = result.stdout.splitlines()
+    return float(elapsed) * 1000, set(imported.split())
+
+def check_budget(modules: List[str], repeat: int, slack: float) -> List[Dict[str, Any]]:
+    """
+    Measure every module against the reference; a result is ok when it imports nothing
+    forbidden and its ratio is within budget * slack
+    """
+    # Compile the .pyc files first: with PYTHONDONTWRITEBYTECODE set (or a read-only
+    # checkout) the imports below would otherwise compile every module from source
+    compileall.compile_dir(SCRIPTS_DIR, maxlevels=0, quiet=1)
+    for module in modules:
+        measure_import((module,))
+
+    results = []
+    for module in modules:
+        reference_ms, module_ms = [], []
+        imported: Set[str] = set()
+        # Alternate, so a slow phase of the machine affects both sides
+        for _ in range(repeat):
+            reference_ms.append(measure_import(REFERENCE_IMPORTS)[0])
+            ms, imported = measure_import((module,))
+            module_ms.append(ms)
+        best_ms, best_reference_ms = min(module_ms), min(reference_ms)
+        ratio = best_ms / best_reference_ms
+        forbidden = sorted(
+            dependency for dependency in FORBIDDEN_IMPORTS.get(module, ())
+            if any(name == dependency or name.startswith(dependency + ".") for name in imported)
+        )
+        budget = IMPORT_BUDGET_RATIO[module] * slack
+        results.append({
+            "module": module,
+            "ms": round(best_ms, 2),
+            "reference_ms": round(best_reference_ms, 2),
+            "ratio": round(ratio, 2),
+            "budget_ratio": round(budget, 2),
+            "forbidden_imports": forbidden,
+            "ok": ratio <= budget and not forbidden,
+        })
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the import time of the generator modules against a budget")
+    parser.add_argument("modules", nargs="*", help=f"modules to check (default: {', '.join(IMPORT_BUDGET_RATIO)})")
+    parser.add_argument("--repeat", type=int, default=5, help="imports per module; the fastest is compared to the budget")
+    parser.add_argument("--slack", type=float, default=1.0, help="multiply every budget ratio by this factor")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    modules = args.modules or list(IMPORT_BUDGET_RATIO)
+    unknown = [module for module in modules if module not in IMPORT_BUDGET_RATIO]
+    if unknown:
+        parser.error(f"no budget for: {', '.join(unknown)}")
+
+    results = check_budget(modules, max(1, args.repeat), args.slack)
+    for result in results:
+        status = "✅" if result["ok"] else "❌"
+        line = (f"{status} {result['module']:<16} {result['ms']:7.1f} ms  {result['ratio']:5.2f}x reference "
+                f"(budget {result['budget_ratio']:.2f}x, reference {result['reference_ms']:.1f} ms)")
+        if result["forbidden_imports"]:
+            line += f"  imports {', '.join(result['forbidden_imports'])}"
+        print(line)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if not all(result["ok"] for result in results):
+        print("\n⏱️  Startup budget exceeded")
+        sys.exit(1)
+    print("\n⏱️  All modules within the startup budget")
+
+if __name__ == "__main__":
+    main()
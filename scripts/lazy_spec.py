@@ -0,0 +1,147 @@
+"""
+Lazy, JSON-pointer indexed OpenAPI loader.
+
+The spec is memory-mapped and scanned once for the byte range of every
+#/components/schemas/* entry; a schema is only parsed the first time it is looked up
+(e.g. by resolve_ref_schema), so the schemas nobody touches, descriptions included,
+are never materialized. Object keys and descriptions of the parsed parts are interned,
+as large specs repeat the same keys and sentences many times. Everything outside
+components.schemas is small and parsed up front.
+"""
+import json
+import mmap
+import re
+import sys
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, List, Tuple, Union
+
+SCHEMAS_POINTER = ("components", "schemas")
+
+_STRING = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"', re.S)
+# Everything up to and including the next bracket, skipping whole strings so brackets
+# inside them are never counted (an unrolled loop instead of possessive quantifiers,
+# which need Python 3.11; matched anchored, a failure backtracks in linear time)
+_NEXT_BRACKET = re.compile(rb'[^"\[\]{}]*(?:"[^"\\]*(?:\\.[^"\\]*)*"[^"\[\]{}]*)*([\[\]{}])', re.S)
+_WHITESPACE = re.compile(rb'[ \t\n\r]*')
+_SCALAR_END = re.compile(rb'[,}\] \t\n\r]')
+
+Index = Dict[str, Union[Tuple[int, int], "Index"]]
+
+def interning_object(pairs: List[Tuple[str, Any]]) -> Dict[str, Any]:
+    """object_pairs_hook that interns keys and description strings"""
+    obj = {sys.intern(key): value for key, value in pairs}
+    description = obj.get("description")
+    if isinstance(description, str):
+        obj["description"] = sys.intern(description)
+    return obj
+
+def parse_range(buf: Any, start: int, end: int) -> Any:
+    return json.loads(buf[start:end], object_pairs_hook=interning_object)
+
+def skip_whitespace(buf: Any, pos: int) -> int:
+    return _WHITESPACE.match(buf, pos).end()
+
+def value_end(buf: Any, pos: int) -> int:
+    """Offset just past the JSON value starting at `pos`"""
+    first = buf[pos:pos + 1]
+    if first == b'"':
+        return _STRING.match(buf, pos).end()
+    if first not in (b"{", b"["):
+        match = _SCALAR_END.search(buf, pos)
+        return match.start() if match else len(buf)
+    depth = 0
+    offset = pos
+    while True:
+        bracket = _NEXT_BRACKET.match(buf, offset)
+        if bracket is None:
+            raise ValueError(f"unterminated JSON value at offset {pos}")
+        offset = bracket.end()
+        if bracket.group(1) in (b"{", b"["):
+            depth += 1
+        else:
+            depth -= 1
+            if depth == 0:
+                return offset
+
+def index_object(buf: Any, pos: int, expand: Tuple[str, ...] = ()) -> Tuple[Index, int]:
+    """
+    Byte range of every member value of the JSON object at `pos`, in file order, plus the
+    offset just past the object. The member named expand[0] is indexed recursively (with
+    expand[1:]) instead, so every byte is scanned once.
+    """
+    pos = skip_whitespace(buf, pos)
+    if buf[pos:pos + 1] != b"{":
+        raise ValueError(f"expected a JSON object at offset {pos}")
+    members: Index = {}
+    pos = skip_whitespace(buf, pos + 1)
+    if buf[pos:pos + 1] == b"}":
+        return members, pos + 1
+    while True:
+        key_match = _STRING.match(buf, pos)
+        if key_match is None:
+            raise ValueError(f"expected an object key at offset {pos}")
+        key = json.loads(key_match.group())
+        pos = skip_whitespace(buf, key_match.end())
+        if buf[pos:pos + 1] != b":":
+            raise ValueError(f"expected ':' at offset {pos}")
+        start = skip_whitespace(buf, pos + 1)
+        if expand and key == expand[0] and buf[start:start + 1] == b"{":
+            members[key], end = index_object(buf, start, expand[1:])
+        else:
+            end = value_end(buf, start)
+            members[key] = (start, end)
+        pos = skip_whitespace(buf, end)
+        separator = buf[pos:pos + 1]
+        if separator == b"}":
+            return members, pos + 1
+        if separator != b",":
+            raise ValueError(f"expected ',' or '}}' at offset {pos}")
+        pos = skip_whitespace(buf, pos + 1)
+
+class LazySchemas(Mapping):
+    """components.schemas of a memory-mapped spec; each schema is parsed on first lookup"""
+
+    def __init__(self, buf: Any, offsets: Dict[str, Tuple[int, int]]):
+        self._buf = buf
+        self._offsets = offsets
+        self._schemas: Dict[str, Any] = {}
+
+    def __getitem__(self, name: str) -> Any:
+        if name not in self._schemas:
+            start, end = self._offsets[name]
+            self._schemas[name] = parse_range(self._buf, start, end)
+        return self._schemas[name]
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._offsets
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._offsets)
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    @property
+    def materialized(self) -> int:
+        """Number of schemas parsed so far"""
+        return len(self._schemas)
+
+    def __reduce__(self):
+        # Pickled (IR cache, worker processes) as a plain dict
+        return dict, (dict(self.items()),)
+
+def load_lazy_openapi(path: str) -> Dict[str, Any]:
+    """Like schema_ir.load_openapi, but components.schemas is a LazySchemas mapping"""
+    with open(path, "rb") as f:
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    index, _ = index_object(buf, 0, SCHEMAS_POINTER)
+    openapi: Dict[str, Any] = {}
+    for key, member in index.items():
+        if key != SCHEMAS_POINTER[0] or isinstance(member, tuple):
+            openapi[key] = parse_range(buf, *member)
+            continue
+        openapi[key] = {
+            section: LazySchemas(buf, value) if section == SCHEMAS_POINTER[1] and isinstance(value, dict) else parse_range(buf, *value)
+            for section, value in member.items()
+        }
+    return openapi
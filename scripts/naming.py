@@ -0,0 +1,168 @@
+"""
+Kotlin naming conventions shared by every generator.
+
+Type names (PascalCase), property names (camelCase) and enum cases (SCREAMING_SNAKE_CASE)
+are converted through bounded memo tables, with the regular expressions compiled once.
+NamingTable precomputes the conversions for every schema, property and enum value of a
+spec; SchemaIR builds it (so it is pickled with the IR) and installs it into the memo
+tables, so the stages share one set of conversions and a warm run computes none of them.
+"""
+import functools
+import re
+from typing import Any, Callable, Dict
+
+KOTLIN_RESERVED_KEYWORDS = frozenset({
+    "as", "break", "class", "continue", "do", "else", "false", "for", "fun",
+    "if", "in", "interface", "is", "null", "object", "package", "return", "super",
+    "this", "throw", "true", "try", "typealias", "typeof", "val", "var", "when", "while",
+    "by", "catch", "constructor", "delegate", "dynamic", "field", "file", "finally",
+    "get", "import", "init", "param", "property", "receiver", "set", "setparam", "where",
+    "actual", "abstract", "annotation", "companion", "const", "crossinline", "data",
+    "enum", "expect", "external", "final", "infix", "inline", "inner", "internal",
+    "lateinit", "noinline", "open", "operator", "out", "override", "private", "protected",
+    "public", "reified", "sealed", "suspend", "tailrec", "vararg"
+})
+
+# Entries per memo table; a full table is cleared rather than evicted entry by entry
+NAME_CACHE_SIZE = 1 << 16
+
+_SNAKE_SEPARATORS = str.maketrans({"-": "_", " ": "_", ".": "_", "/": "_", "@": "_"})
+_LOWER_UPPER_BOUNDARY = re.compile(r'([a-z0-9])([A-Z])')
+_ACRONYM_BOUNDARY = re.compile(r'([A-Z]+)([A-Z][a-z])')
+
+_name_tables: Dict[str, Dict[str, str]] = {}
+
+def memoize_name(func: Callable[[str], str]) -> Callable[[str], str]:
+    """Memoize a str -> str naming conversion in a table of at most NAME_CACHE_SIZE entries"""
+    table: Dict[str, str] = {}
+    _name_tables[func.__name__] = table
+
+    @functools.wraps(func)
+    def wrapper(name: str) -> str:
+        result = table.get(name)
+        if result is None:
+            result = func(name)
+            if len(table) >= NAME_CACHE_SIZE:
+                table.clear()
+            table[name] = result
+        return result
+
+    wrapper.table = table
+    return wrapper
+
+def clear_name_tables():
+    for table in _name_tables.values():
+        table.clear()
+
+@memoize_name
+def to_kotlin_type_name(name: str) -> str:
+    """Convert schema name to Kotlin type name (PascalCase)"""
+    if not name:
+        return name
+
+    if "_" in name:
+        return "".join(part.capitalize() if part.islower() else part for part in name.split("_"))
+
+    if name[0].islower():
+        return name[0].upper() + name[1:]
+
+    return name
+
+def escape_kotlin_keyword(property_name: str) -> str:
+    """Escape Kotlin reserved keywords by wrapping in backticks"""
+    if property_name in KOTLIN_RESERVED_KEYWORDS:
+        return f"`{property_name}`"
+    return property_name
+
+def _camel_part(part: str) -> str:
+    """Capitalize one snake_case segment after the first"""
+    if not part:
+        return ""
+    if part.islower():
+        # Digits between letters (e.g. "ed25519key"): upper-case every letter
+        first_digit = next((idx for idx, ch in enumerate(part) if ch.isdigit()), None)
+        if first_digit is not None:
+            last_digit = next(idx for idx in range(len(part) - 1, -1, -1) if part[idx].isdigit())
+            has_letter_before = any(ch.isalpha() for ch in part[:first_digit])
+            has_letter_after = any(ch.isalpha() for ch in part[last_digit + 1:])
+            if has_letter_before and has_letter_after:
+                return "".join(ch.upper() if ch.isalpha() else ch for ch in part)
+        return part.capitalize()
+    if part.isupper():
+        return part
+    return part[0].upper() + part[1:]
+
+@memoize_name
+def to_kotlin_property_name(name: str) -> str:
+    """Convert property name to Kotlin property name (camelCase)"""
+    if "_" in name:
+        parts = name.split("_")
+        return parts[0].lower() + "".join(_camel_part(part) for part in parts[1:])
+
+    if name.isupper() and len(name) > 1:
+        return name.lower()
+
+    return name[0].lower() + name[1:] if name else name
+
+@memoize_name
+def to_screaming_snake_case(value: str) -> str:
+    """Convert a string to SCREAMING_SNAKE_CASE"""
+    result = value.translate(_SNAKE_SEPARATORS)
+    result = _LOWER_UPPER_BOUNDARY.sub(r'\1_\2', result)
+    result = _ACRONYM_BOUNDARY.sub(r'\1_\2', result)
+    return result.upper()
+
+class NamingTable:
+    """Every type, property and enum-case name of one spec, converted once"""
+    __slots__ = ("type_names", "property_names", "enum_cases")
+
+    def __init__(self):
+        self.type_names: Dict[str, str] = {}
+        self.property_names: Dict[str, str] = {}
+        self.enum_cases: Dict[str, str] = {}
+
+    @classmethod
+    def from_spec(cls, openapi: Dict[str, Any]) -> "NamingTable":
+        """Collect and convert the schema names, property names and enum values found anywhere in the spec"""
+        table = cls()
+        components = openapi.get("components", {}).get("schemas", {}) or {}
+        for name in components:
+            table.type_names[name] = to_kotlin_type_name(name)
+        for path_item in openapi.get("paths", {}).values():
+            operation_id = (path_item.get("post") or {}).get("operationId")
+            if operation_id:
+                table.property_names[operation_id] = to_kotlin_property_name(operation_id)
+
+        stack = list(components.values())
+        while stack:
+            node = stack.pop()
+            if isinstance(node, dict):
+                properties = node.get("properties")
+                if isinstance(properties, dict):
+                    for prop_name in properties:
+                        if prop_name not in table.property_names:
+                            table.property_names[prop_name] = to_kotlin_property_name(prop_name)
+                        if prop_name not in table.type_names:
+                            # Inline objects and union variants are named after their properties
+                            table.type_names[prop_name] = to_kotlin_type_name(prop_name)
+                enum_values = node.get("enum")
+                for value in enum_values if isinstance(enum_values, list) else ():
+                    case = str(value)
+                    if case not in table.enum_cases:
+                        table.enum_cases[case] = to_screaming_snake_case(case)
+                stack.extend(node.values())
+            elif isinstance(node, list):
+                stack.extend(node)
+        return table
+
+    def install(self):
+        """Seed the memo tables with these conversions"""
+        for func, names in ((to_kotlin_type_name, self.type_names),
+                            (to_kotlin_property_name, self.property_names),
+                            (to_screaming_snake_case, self.enum_cases)):
+            if len(func.table) + len(names) > NAME_CACHE_SIZE:
+                func.table.clear()
+            func.table.update(names)
+
+    def __len__(self) -> int:
+        return len(self.type_names) + len(self.property_names) + len(self.enum_cases)
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Write-if-changed output for the generators.
+
+A file is only rewritten when the SHA-256 of its new content differs from what is
+on disk, so unchanged outputs keep their mtime and Gradle can skip recompiling and
+rerunning tests. The Kotlin outputs are reformatted by ktlintFormat afterwards and
+never match the raw generator output, so the digest of the last raw output and of the
+file it became are kept in scripts/.cache/outputs.json: running this module after
+formatting (codegen.sh does) records the formatted files, and a file whose raw output
+and on-disk content both match that record is left alone too.
+Outputs a stage no longer produces can be removed as orphans.
+Output paths are relative to scripts/; relocate_output moves them below another root
+with the same layout (used for --methods builds, which cover part of the API only).
+"""
+import argparse
+import hashlib
+import json
+import os
+from typing import Callable, Dict, List, Optional, Sequence, Set
+
+from codegen_cache import CACHE_DIR
+
+OUTPUT_DIGESTS_FILE = "outputs.json"
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def relocate_output(path: str, output_root: Optional[str]) -> str:
+    """`path` (relative to scripts/, e.g. "../types/...") below `output_root` instead of the repository"""
+    if output_root is None:
+        return path
+    return os.path.join(output_root, os.path.relpath(path, os.pardir))
+
+def check_output_root(methods: Optional[Sequence[str]], output_root: Optional[str]):
+    """
+    Raise ValueError unless a --methods run writes to its own output root: its Types.kt,
+    Methods.kt, mocks and tests lack what the hand-written sources and tests in the
+    repository use
+    """
+    if not methods:
+        return
+    if output_root is None:
+        raise ValueError("--methods output covers part of the API only, pass --output-root to write it outside the repository")
+    if os.path.abspath(output_root) == REPO_ROOT:
+        raise ValueError("--output-root must not be the repository itself when --methods is given")
+
+def content_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+def file_digest(path: str) -> Optional[str]:
+    """SHA-256 of the file at `path`, or None if it does not exist"""
+    try:
+        with open(path, "rb") as f:
+            return content_digest(f.read())
+    except FileNotFoundError:
+        return None
+
+def load_output_digests(cache_dir: str = CACHE_DIR) -> Dict[str, Dict[str, str]]:
+    """Absolute output path -> {"output": digest of the raw output, "file": digest of the file it became}"""
+    try:
+        with open(os.path.join(cache_dir, OUTPUT_DIGESTS_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_output_digests(digests: Dict[str, Dict[str, str]], cache_dir: str = CACHE_DIR):
+    path = os.path.join(cache_dir, OUTPUT_DIGESTS_FILE)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(digests, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def record_formatted_outputs(cache_dir: str = CACHE_DIR) -> int:
+    """
+    Take the current content of every recorded output as the formatted form of its raw
+    output (run right after ./gradlew ktlintFormat). Returns the number of files recorded.
+    """
+    digests = load_output_digests(cache_dir)
+    recorded = 0
+    for path, entry in list(digests.items()):
+        on_disk = file_digest(path)
+        if on_disk is None:
+            del digests[path]
+            continue
+        entry["file"] = on_disk
+        recorded += 1
+    save_output_digests(digests, cache_dir)
+    return recorded
+
+class OutputWriter:
+    """Writes one stage's outputs and records which files changed, stayed the same or were removed"""
+
+    def __init__(self, stage: str, cache_dir: str = CACHE_DIR):
+        self.stage = stage
+        self.cache_dir = cache_dir
+        self.changed: List[str] = []
+        self.unchanged: List[str] = []
+        self.removed: List[str] = []
+        self._written: Set[str] = set()
+        self._digests = load_output_digests(cache_dir)
+
+    def write(self, path: str, content: str) -> bool:
+        """
+        Write `content` to `path` unless the file already holds exactly that, or holds the
+        formatted form of the same raw output; returns True if written
+        """
+        data = content.encode("utf-8")
+        digest = content_digest(data)
+        abs_path = os.path.abspath(path)
+        self._written.add(abs_path)
+        on_disk = file_digest(path)
+        recorded = self._digests.get(abs_path)
+        if on_disk == digest or (recorded is not None and recorded["output"] == digest and recorded["file"] == on_disk):
+            self._digests[abs_path] = {"output": digest, "file": on_disk}
+            self.unchanged.append(path)
+            return False
+        os.makedirs(os.path.dirname(abs_path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        self._digests[abs_path] = {"output": digest, "file": digest}
+        self.changed.append(path)
+        return True
+
+    def remove(self, path: str) -> bool:
+        """Delete an output this run no longer produces"""
+        abs_path = os.path.abspath(path)
+        if abs_path in self._written or not os.path.exists(path):
+            return False
+        os.remove(path)
+        self._digests.pop(abs_path, None)
+        self.removed.append(path)
+        return True
+
+    def remove_orphans(self, directory: str, is_output: Callable[[str], bool]) -> List[str]:
+        """
+        Delete every file in `directory` accepted by `is_output` (called with the file path)
+        that was not written during this run. Returns the removed paths.
+        """
+        if not os.path.isdir(directory):
+            return []
+        removed = []
+        for file_name in sorted(os.listdir(directory)):
+            path = os.path.join(directory, file_name)
+            if os.path.abspath(path) not in self._written and os.path.isfile(path) and is_output(path):
+                if self.remove(path):
+                    removed.append(path)
+        return removed
+
+    def save(self):
+        """Persist the output digests; call once the stage has written everything"""
+        # Merge into the file as it is now: another stage may have saved since this one loaded it
+        digests = load_output_digests(self.cache_dir)
+        for path in self.removed:
+            digests.pop(os.path.abspath(path), None)
+        digests.update({path: self._digests[path] for path in self._written if path in self._digests})
+        save_output_digests(digests, self.cache_dir)
+
+    def summary(self) -> str:
+        return f"{self.stage} outputs: {len(self.changed)} changed, {len(self.unchanged)} unchanged, {len(self.removed)} removed"
+
+def main():
+    argparse.ArgumentParser(
+        description="Record the formatted generated files (run after ./gradlew ktlintFormat), so the next "
+                    "generator run leaves them alone while their raw output is unchanged"
+    ).parse_args()
+    print(f"📝 Recorded {record_formatted_outputs()} formatted outputs in {os.path.join(CACHE_DIR, OUTPUT_DIGESTS_FILE)}")
+
+if __name__ == "__main__":
+    main()
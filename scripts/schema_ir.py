@@ -0,0 +1,429 @@
+"""
+Shared schema intermediate representation (IR) used by all code generators.
+
+The OpenAPI spec is parsed once per process and every component schema is indexed
+into a compact node holding its Kotlin name, classification, direct $ref targets
+and merged allOf form. The finished IR is pickled under scripts/.cache/ keyed by the
+spec's SHA-256 and the source of this module and naming.py, so later runs skip
+parsing and indexing. An IR scoped to a subset of the RPC methods (see scope_openapi)
+is built from a lazily loaded spec (lazy_spec.py), so only the schemas those methods
+reach are ever parsed.
+"""
+import hashlib
+import json
+import os
+import pickle
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+import naming
+from codegen_cache import CACHE_DIR, source_fingerprint
+from naming import NamingTable, to_kotlin_type_name
+
+OPENAPI_PATH = "./openapi.json"
+COMPONENT_REF_PREFIX = "#/components/schemas/"
+PRIMITIVE_TYPES = ("string", "integer", "number", "boolean")
+IR_CACHE_FILE = "ir.pickle"
+IR_CACHE_PATH = os.path.join(CACHE_DIR, IR_CACHE_FILE)
+
+def load_openapi(path: str = OPENAPI_PATH, lazy: bool = False) -> Dict[str, Any]:
+    """The parsed spec; with lazy, component schemas are only parsed when first looked up"""
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"{path} not found")
+    if lazy:
+        # Only --methods runs load the spec lazily; full runs never import lazy_spec
+        from lazy_spec import load_lazy_openapi
+        return load_lazy_openapi(path)
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def resolve_ref_name(ref: str) -> Optional[str]:
+    """Extract type name from $ref"""
+    if not ref.startswith(COMPONENT_REF_PREFIX):
+        return None
+    return ref.split("/")[-1]
+
+def resolve_ref_schema(ref: str, components: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Resolve a $ref to its schema definition"""
+    name = resolve_ref_name(ref)
+    if name:
+        return components.get(name)
+    return None
+
+def merge_allof(allof_list: List[Dict[str, Any]], components: Dict[str, Any]) -> Dict[str, Any]:
+    """Merge allOf schemas"""
+    merged = {"properties": {}, "required": []}
+
+    for item in allof_list:
+        if "$ref" in item:
+            resolved = resolve_ref_schema(item["$ref"], components)
+            if resolved:
+                # If resolved schema is a primitive type, use it directly
+                if "type" in resolved and resolved["type"] in ["string", "integer", "number", "boolean"]:
+                    if "properties" not in resolved:
+                        return resolved.copy()
+
+                if "properties" in resolved:
+                    merged["properties"].update(resolved["properties"])
+                if "required" in resolved:
+                    merged["required"].extend(resolved["required"])
+                if "type" in resolved:
+                    merged["type"] = resolved["type"]
+                for key in ["format", "description", "minimum", "maximum", "nullable"]:
+                    if key in resolved and key not in merged:
+                        merged[key] = resolved[key]
+
+        if "properties" in item:
+            merged["properties"].update(item["properties"])
+        if "required" in item:
+            merged["required"].extend(item["required"])
+        if "type" in item:
+            merged["type"] = item["type"]
+        for key in ["format", "description", "minimum", "maximum", "nullable"]:
+            if key in item and key not in merged:
+                merged[key] = item[key]
+
+    if "type" not in merged:
+        merged["type"] = "object"
+
+    merged["required"] = list(dict.fromkeys(merged["required"]))
+    return merged
+
+def canonical_json(value: Any) -> str:
+    """Stable JSON encoding used for content hashing"""
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+def classify_schema(schema: Dict[str, Any]) -> str:
+    """
+    Classify a component schema as one of:
+    enum, union, object, primitive, array, allof, ref or other.
+    """
+    if "enum" in schema:
+        return "enum"
+    if "oneOf" in schema or "anyOf" in schema:
+        return "union"
+    if schema.get("type") == "object" or "properties" in schema:
+        return "object"
+    if schema.get("type") in PRIMITIVE_TYPES:
+        return "primitive"
+    if schema.get("type") == "array":
+        return "array"
+    if "allOf" in schema:
+        return "allof"
+    if "$ref" in schema:
+        return "ref"
+    return "other"
+
+def collect_ref_names(schema: Any) -> Tuple[str, ...]:
+    """Collect the component names referenced anywhere inside a schema, in first-seen order"""
+    found: Dict[str, None] = {}
+    stack = [schema]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            ref = node.get("$ref")
+            if isinstance(ref, str):
+                ref_name = resolve_ref_name(ref)
+                if ref_name:
+                    found.setdefault(ref_name, None)
+            stack.extend(reversed(list(node.values())))
+        elif isinstance(node, list):
+            stack.extend(reversed(node))
+    return tuple(found)
+
+class SchemaNode:
+    """A single component schema and everything the generators derive from it"""
+    __slots__ = ("name", "kotlin_name", "schema", "kind", "refs", "merged", "union_key")
+
+    def __init__(self, name: str, schema: Dict[str, Any], components: Dict[str, Any]):
+        self.name = name
+        self.kotlin_name = to_kotlin_type_name(name)
+        self.schema = schema
+        self.kind = classify_schema(schema)
+        # Direct references, resolved to component names that actually exist
+        self.refs = tuple(ref for ref in collect_ref_names(schema) if ref in components)
+        self.merged = merge_allof(schema["allOf"], components) if "allOf" in schema else None
+        self.union_key = "oneOf" if "oneOf" in schema else ("anyOf" if "anyOf" in schema else None)
+
+    def __repr__(self) -> str:
+        return f"SchemaNode({self.name!r}, kind={self.kind!r})"
+
+class DependencyGraph:
+    """
+    $ref dependency graph between component schemas.
+
+    Strongly connected components are found with Tarjan's algorithm; `order` lists every
+    schema with its dependencies first (members of one SCC are adjacent, sorted by name),
+    so a single pass over it sees recursive groups together.
+    """
+    __slots__ = ("edges", "sccs", "scc_index", "order")
+
+    def __init__(self, nodes: Dict[str, "SchemaNode"]):
+        self.edges: Dict[str, Tuple[str, ...]] = {name: tuple(sorted(node.refs)) for name, node in nodes.items()}
+        self.sccs: List[Tuple[str, ...]] = self._tarjan()
+        self.scc_index: Dict[str, int] = {
+            name: idx for idx, members in enumerate(self.sccs) for name in members
+        }
+        self.order: List[str] = [name for members in self.sccs for name in members]
+
+    def _tarjan(self) -> List[Tuple[str, ...]]:
+        """Iterative Tarjan; SCCs come out in reverse topological order (dependencies first)"""
+        index: Dict[str, int] = {}
+        lowlink: Dict[str, int] = {}
+        on_stack: Set[str] = set()
+        stack: List[str] = []
+        sccs: List[Tuple[str, ...]] = []
+        counter = 0
+
+        for root in sorted(self.edges):
+            if root in index:
+                continue
+            work = [(root, 0)]
+            while work:
+                name, edge_idx = work.pop()
+                if edge_idx == 0:
+                    index[name] = lowlink[name] = counter
+                    counter += 1
+                    stack.append(name)
+                    on_stack.add(name)
+                edges = self.edges[name]
+                descended = False
+                while edge_idx < len(edges):
+                    dep = edges[edge_idx]
+                    edge_idx += 1
+                    if dep not in index:
+                        work.append((name, edge_idx))
+                        work.append((dep, 0))
+                        descended = True
+                        break
+                    if dep in on_stack:
+                        lowlink[name] = min(lowlink[name], index[dep])
+                if descended:
+                    continue
+                if lowlink[name] == index[name]:
+                    members = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        members.append(member)
+                        if member == name:
+                            break
+                    sccs.append(tuple(sorted(members)))
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[name])
+        return sccs
+
+    def scc_of(self, schema_name: str) -> Tuple[str, ...]:
+        """Members of the SCC containing `schema_name`"""
+        return self.sccs[self.scc_index[schema_name]]
+
+    def is_recursive(self, schema_name: str) -> bool:
+        """True if the schema can reach itself through $ref"""
+        return len(self.scc_of(schema_name)) > 1 or schema_name in self.edges[schema_name]
+
+    def recursive_schemas(self) -> Set[str]:
+        """Names of all schemas that take part in a $ref cycle"""
+        return {name for name in self.edges if self.is_recursive(name)}
+
+class SchemaIR:
+    """The parsed spec plus one SchemaNode per component schema"""
+    __slots__ = ("openapi", "components", "nodes", "naming", "_graph", "_digests", "_closures", "_hashes")
+
+    def __init__(self, openapi: Dict[str, Any]):
+        self.openapi = openapi
+        self.components: Dict[str, Any] = openapi.get("components", {}).get("schemas", {}) or {}
+        self.nodes: Dict[str, SchemaNode] = {
+            name: SchemaNode(name, schema, self.components)
+            for name, schema in self.components.items()
+        }
+        # Precomputed name conversions, built with the other indexes
+        self.naming: Optional[NamingTable] = None
+        self._graph: Optional[DependencyGraph] = None
+        self._digests: Dict[str, str] = {}
+        self._closures: Dict[str, Tuple[str, ...]] = {}
+        self._hashes: Dict[str, str] = {}
+
+    @property
+    def graph(self) -> DependencyGraph:
+        """$ref dependency graph, built on first use"""
+        if self._graph is None:
+            self._graph = DependencyGraph(self.nodes)
+        return self._graph
+
+    def transitive_refs(self, schema_name: str) -> Tuple[str, ...]:
+        """All component names reachable from `schema_name` through $ref, sorted, excluding itself"""
+        closure = self._closures.get(schema_name)
+        if closure is not None:
+            return closure
+        seen = set()
+        stack = list(self.nodes[schema_name].refs)
+        while stack:
+            ref = stack.pop()
+            if ref in seen:
+                continue
+            seen.add(ref)
+            stack.extend(self.nodes[ref].refs)
+        seen.discard(schema_name)
+        closure = tuple(sorted(seen))
+        self._closures[schema_name] = closure
+        return closure
+
+    def schema_digest(self, schema_name: str) -> str:
+        """SHA-256 of a single component definition"""
+        digest = self._digests.get(schema_name)
+        if digest is None:
+            payload = canonical_json([schema_name, self.components[schema_name]])
+            digest = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+            self._digests[schema_name] = digest
+        return digest
+
+    def content_hash(self, schema_name: str) -> str:
+        """
+        Canonical hash of a schema's own definition plus everything it transitively references.
+        Two specs give the same hash for a schema exactly when nothing it can see has changed.
+        """
+        content_hash = self._hashes.get(schema_name)
+        if content_hash is None:
+            h = hashlib.sha256(self.schema_digest(schema_name).encode("ascii"))
+            for ref in self.transitive_refs(schema_name):
+                h.update(self.schema_digest(ref).encode("ascii"))
+            content_hash = h.hexdigest()
+            self._hashes[schema_name] = content_hash
+        return content_hash
+
+    def kotlin_name(self, schema_name: str) -> str:
+        """Kotlin type name for a component schema"""
+        node = self.nodes.get(schema_name)
+        return node.kotlin_name if node else to_kotlin_type_name(schema_name)
+
+    def resolve(self, ref: str) -> Optional[SchemaNode]:
+        """Resolve a $ref to its node"""
+        name = resolve_ref_name(ref)
+        return self.nodes.get(name) if name else None
+
+    def build_indexes(self):
+        """Compute every lazily derived index up front (before the IR is pickled)"""
+        self.graph
+        for name in self.nodes:
+            self.content_hash(name)
+        self.naming = NamingTable.from_spec(self.openapi)
+
+    def methods(self) -> List[Tuple[str, Dict[str, Any]]]:
+        """(path, post operation) pairs for every RPC method in the spec"""
+        return spec_methods(self.openapi)
+
+def spec_methods(openapi: Dict[str, Any]) -> List[Tuple[str, Dict[str, Any]]]:
+    return [
+        (path, path_item["post"])
+        for path, path_item in openapi.get("paths", {}).items()
+        if "post" in path_item
+    ]
+
+class UnknownMethodsError(ValueError):
+    """Raised when a method allowlist names an operationId the spec does not define"""
+
+def parse_method_allowlist(value: str) -> Tuple[str, ...]:
+    """
+    operationIds from a comma or whitespace separated list, or from the file `@path`
+    (a `#` starts a comment there); sorted and without duplicates
+    """
+    if value.startswith("@"):
+        with open(value[1:], "r", encoding="utf-8") as f:
+            value = "\n".join(line.split("#", 1)[0] for line in f)
+    return tuple(sorted({name for name in value.replace(",", " ").split() if name}))
+
+def scope_openapi(openapi: Dict[str, Any], operation_ids: Sequence[str]) -> Dict[str, Any]:
+    """
+    The spec reduced to the given RPC methods: their paths plus every component schema their
+    request, response and error schemas reach through $ref. Only those schemas are looked up,
+    so with a lazily loaded spec the rest are never parsed. The closure is complete, so content
+    hashes (and with them the per-schema caches) match the full spec.
+    """
+    paths_by_method = {operation.get("operationId"): path for path, operation in spec_methods(openapi)}
+    unknown = sorted(set(operation_ids) - set(paths_by_method))
+    if unknown:
+        raise UnknownMethodsError(f"unknown RPC methods: {', '.join(unknown)} (the spec defines {', '.join(sorted(paths_by_method))})")
+    
+    kept_paths = {paths_by_method[operation_id] for operation_id in operation_ids}
+    paths = {path: item for path, item in openapi.get("paths", {}).items() if path in kept_paths}
+    components = openapi.get("components", {}) or {}
+    all_schemas = components.get("schemas", {}) or {}
+    reachable: Set[str] = set()
+    stack = [name for path_item in paths.values() for name in collect_ref_names(path_item)]
+    while stack:
+        name = stack.pop()
+        if name in reachable or name not in all_schemas:
+            continue
+        reachable.add(name)
+        stack.extend(collect_ref_names(all_schemas[name]))
+    
+    schemas = {name: all_schemas[name] for name in all_schemas if name in reachable}
+    return {**openapi, "paths": paths, "components": {**components, "schemas": schemas}}
+
+def load_ir(path: str = OPENAPI_PATH, use_cache: bool = True, cache_path: str = IR_CACHE_PATH) -> SchemaIR:
+    """
+    Build the IR for the spec at `path`, reusing the pickled IR when neither the spec
+    nor this module changed since it was written.
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"{path} not found")
+    with open(path, "rb") as f:
+        raw = f.read()
+    cache_key = f"{hashlib.sha256(raw).hexdigest()}:{source_fingerprint(__file__, naming.__file__)}"
+    
+    if use_cache and os.path.exists(cache_path):
+        try:
+            with open(cache_path, "rb") as f:
+                cached_key, cached_ir = pickle.load(f)
+            if cached_key == cache_key:
+                return cached_ir
+        except Exception:
+            # A truncated or incompatible blob is just a cache miss
+            pass
+    
+    ir = SchemaIR(json.loads(raw))
+    ir.build_indexes()
+    if use_cache:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        tmp_path = f"{cache_path}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump((cache_key, ir), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    return ir
+
+_ir_cache: Dict[str, SchemaIR] = {}
+
+def clear_ir_cache():
+    """Forget the IRs built in this process"""
+    _ir_cache.clear()
+
+def ir_cache_key(path: str = OPENAPI_PATH, methods: Optional[Sequence[str]] = None) -> str:
+    key = os.path.abspath(path)
+    return f"{key}#{','.join(sorted(set(methods)))}" if methods else key
+
+def get_ir(path: str = OPENAPI_PATH, use_cache: bool = True, methods: Optional[Sequence[str]] = None,
+           cache_dir: str = CACHE_DIR) -> SchemaIR:
+    """
+    Load and index the spec at `path`, reusing the IR already built in this process.
+    Its naming table is installed so every stage shares the precomputed name conversions.
+    With `methods` (operationIds), the IR is scoped to those RPC methods, see scope_openapi.
+    The pickled IR is kept in `cache_dir`.
+    """
+    key = ir_cache_key(path)
+    ir = _ir_cache.get(key)
+    if methods:
+        scoped_key = ir_cache_key(path, methods)
+        scoped = _ir_cache.get(scoped_key)
+        if scoped is None:
+            # Unless the full spec is already loaded, only the schemas the methods reach are parsed
+            openapi = ir.openapi if ir is not None else load_openapi(path, lazy=True)
+            scoped = SchemaIR(scope_openapi(openapi, methods))
+            scoped.build_indexes()
+            scoped.naming.install()
+            _ir_cache[scoped_key] = scoped
+        return scoped
+    if ir is None:
+        ir = load_ir(path, use_cache, os.path.join(cache_dir, IR_CACHE_FILE))
+        ir.naming.install()
+        _ir_cache[key] = ir
+    return ir
@@ -0,0 +1,146 @@
+"""
+Generated-code size metrics and budget.
+
+generate_types.py records the lines, bytes and nested class declarations it emits for
+every top-level schema, together with the generate_kotlin_* path that emitted it, and
+writes them to METRICS_PATH. The checked-in SIZE_BUDGET_PATH holds the sizes of the
+last accepted spec plus growth thresholds; a run that grows Types.kt or a single
+schema past a threshold warns or fails and names the schema and generator path.
+"""
+import json
+import os
+import re
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from codegen_cache import CACHE_DIR, scoped_cache_dir
+
+METRICS_FILE = "type_metrics.json"
+METRICS_PATH = os.path.join(CACHE_DIR, METRICS_FILE)
+SIZE_BUDGET_PATH = "./type_size_budget.json"
+SIZE_BUDGET_FORMAT_VERSION = 1
+BUDGET_MODES = ("off", "warn", "fail")
+
+# Growth over the budget baseline, in percent, that warns or fails
+DEFAULT_THRESHOLDS = {
+    "total_warn_percent": 5,
+    "total_fail_percent": 15,
+    "schema_warn_percent": 25,
+    "schema_fail_percent": 100,
+    # Growth below this many lines is never reported for a single schema
+    "schema_min_lines": 40,
+    # Lines a schema missing from the baseline may emit before it warns or fails
+    "new_schema_warn_lines": 300,
+    "new_schema_fail_lines": 1000,
+}
+
+_DECLARATION = re.compile(r'\b(?:class|interface|object)\s+[A-Z]\w*')
+
+class SizeBudgetExceeded(Exception):
+    """Raised by the types stage when the generated code grew past a fail threshold"""
+
+class BudgetFinding(NamedTuple):
+    level: str  # "warn" or "fail"
+    schema: Optional[str]  # None for the Types.kt total
+    generator: Optional[str]
+    baseline_lines: int
+    lines: int
+
+    def describe(self) -> str:
+        growth = self.lines - self.baseline_lines
+        percent = f" ({growth / self.baseline_lines:+.0%})" if self.baseline_lines else " (new)"
+        subject = f"{self.schema} ({self.generator})" if self.schema else "Types.kt total"
+        return f"{subject}: {self.baseline_lines} → {self.lines} lines{percent}"
+
+def measure_fragment(code: str) -> Dict[str, int]:
+    """Lines, bytes and nested class/interface/object declarations of one emitted fragment"""
+    declarations = len(_DECLARATION.findall(code))
+    return {
+        "lines": code.count("\n"),
+        "bytes": len(code.encode("utf-8")),
+        "nested_classes": max(0, declarations - 1),
+    }
+
+def summarize_metrics(schemas: Dict[str, Dict[str, Any]]) -> Dict[str, int]:
+    return {
+        "lines": sum(entry["lines"] for entry in schemas.values()),
+        "bytes": sum(entry["bytes"] for entry in schemas.values()),
+        "nested_classes": sum(entry["nested_classes"] for entry in schemas.values()),
+    }
+
+def metrics_path(output_root: Optional[str] = None, cache_dir: str = CACHE_DIR) -> str:
+    """Where a run's metrics go; a --methods run (output_root set) keeps them below its output root"""
+    if output_root is None:
+        return os.path.join(cache_dir, METRICS_FILE)
+    return os.path.join(scoped_cache_dir(output_root), METRICS_FILE)
+
+def write_metrics(schemas: Dict[str, Dict[str, Any]], path: str = METRICS_PATH):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"total": summarize_metrics(schemas), "schemas": dict(sorted(schemas.items()))}, f, indent=2)
+        f.write("\n")
+
+def load_budget(path: str = SIZE_BUDGET_PATH) -> Optional[Dict[str, Any]]:
+    """The checked-in budget, or None if there is none (or it is of another format version)"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            budget = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if budget.get("version") != SIZE_BUDGET_FORMAT_VERSION:
+        return None
+    return budget
+
+def budget_from_metrics(schemas: Dict[str, Dict[str, Any]], thresholds: Optional[Dict[str, int]] = None) -> str:
+    """Budget file content with the given metrics as the new baseline"""
+    return json.dumps({
+        "version": SIZE_BUDGET_FORMAT_VERSION,
+        "thresholds": dict(thresholds or DEFAULT_THRESHOLDS),
+        "total": summarize_metrics(schemas),
+        "schemas": {
+            name: {"generator": entry["generator"], "lines": entry["lines"]}
+            for name, entry in sorted(schemas.items())
+        },
+    }, indent=2) + "\n"
+
+def growth_level(baseline: int, lines: int, warn_percent: float, fail_percent: float) -> Optional[str]:
+    if lines <= baseline:
+        return None
+    percent = (lines - baseline) * 100 / baseline if baseline else float("inf")
+    if percent > fail_percent:
+        return "fail"
+    if percent > warn_percent:
+        return "warn"
+    return None
+
+def check_budget(schemas: Dict[str, Dict[str, Any]], budget: Dict[str, Any]) -> List[BudgetFinding]:
+    """Compare the metrics of this run with the budget baseline; failures first, then by growth"""
+    thresholds = dict(DEFAULT_THRESHOLDS, **budget.get("thresholds", {}))
+    findings = []
+
+    total_lines = summarize_metrics(schemas)["lines"]
+    baseline_total = budget.get("total", {}).get("lines", 0)
+    level = growth_level(baseline_total, total_lines, thresholds["total_warn_percent"], thresholds["total_fail_percent"])
+    if level and baseline_total:
+        findings.append(BudgetFinding(level, None, None, baseline_total, total_lines))
+
+    baseline_schemas = budget.get("schemas", {})
+    for name, entry in schemas.items():
+        baseline = baseline_schemas.get(name)
+        if baseline is None:
+            if entry["lines"] > thresholds["new_schema_fail_lines"]:
+                level = "fail"
+            elif entry["lines"] > thresholds["new_schema_warn_lines"]:
+                level = "warn"
+            else:
+                level = None
+            baseline_lines = 0
+        else:
+            baseline_lines = baseline["lines"]
+            if entry["lines"] - baseline_lines < thresholds["schema_min_lines"]:
+                continue
+            level = growth_level(baseline_lines, entry["lines"], thresholds["schema_warn_percent"], thresholds["schema_fail_percent"])
+        if level:
+            findings.append(BudgetFinding(level, name, entry["generator"], baseline_lines, entry["lines"]))
+
+    findings.sort(key=lambda finding: (finding.level != "fail", -(finding.lines - finding.baseline_lines), finding.schema or ""))
+    return findings
@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+"""
+Semantic diff of two OpenAPI specs.
+
+Compares the component schemas and RPC methods of an old and a new openapi.json
+structurally rather than textually. Every schema and method is reported as added,
+removed, changed (its own definition differs) or changed_via_ref (only something it
+references through $ref differs, detected with SchemaIR.content_hash), and each
+change is classified as breaking or non-breaking for users of the generated Kotlin
+client. The JSON report lists the affected schemas, Kotlin types and methods for the
+generators (see codegen.py --changes); the Markdown report is the PR changelog.
+"""
+
+import argparse
+import copy
+import json
+import sys
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from schema_ir import SchemaIR, canonical_json, collect_ref_names, load_ir, resolve_ref_name
+from symbols import load_symbols
+
+CHANGE_REPORT_VERSION = 1
+
+# Keywords that only change documentation
+DOC_KEYWORDS = frozenset({"description", "title", "default", "example", "examples", "$schema"})
+# Validation keywords the generated Kotlin types do not encode
+CONSTRAINT_KEYWORDS = frozenset({
+    "minimum", "maximum", "exclusiveMinimum", "exclusiveMaximum", "multipleOf",
+    "minItems", "maxItems", "uniqueItems", "minLength", "maxLength", "pattern",
+    "minProperties", "maxProperties",
+})
+# Keywords whose change alters the Kotlin type of a value
+TYPE_KEYWORDS = ("type", "format", "nullable")
+VARIANT_KEYWORDS = ("oneOf", "anyOf", "allOf")
+NESTED_KEYWORDS = ("items", "additionalProperties")
+COMPARED_KEYWORDS = frozenset(("$ref", "properties", "required", "enum") + TYPE_KEYWORDS + VARIANT_KEYWORDS + NESTED_KEYWORDS)
+
+STATUS_LABELS = {"added": "added", "removed": "removed", "changed": "changed", "changed_via_ref": "changed"}
+
+class Change(NamedTuple):
+    """One difference inside a schema or operation"""
+    pointer: str
+    kind: str
+    breaking: bool
+    detail: str
+
+def escape_pointer(token: Any) -> str:
+    """Escape a JSON pointer reference token"""
+    return str(token).replace("~", "~0").replace("/", "~1")
+
+def ref_label(ref: Optional[str]) -> str:
+    if ref is None:
+        return "inline schema"
+    return resolve_ref_name(ref) or ref
+
+def compare_schemas(old: Any, new: Any, pointer: str, changes: List[Change]):
+    """Append the differences between two schema nodes to `changes`, recursing into nested schemas"""
+    if old == new:
+        return
+    if not isinstance(old, dict) or not isinstance(new, dict):
+        changes.append(Change(pointer or "/", "schema_replaced", True, f"{json.dumps(old)} → {json.dumps(new)}"))
+        return
+
+    if old.get("$ref") != new.get("$ref"):
+        changes.append(Change(pointer or "/", "ref_changed", True, f"{ref_label(old.get('$ref'))} → {ref_label(new.get('$ref'))}"))
+
+    for keyword in TYPE_KEYWORDS:
+        if old.get(keyword) != new.get(keyword):
+            changes.append(Change(f"{pointer}/{keyword}", f"{keyword}_changed", True, f"{old.get(keyword)!r} → {new.get(keyword)!r}"))
+
+    compare_properties(old, new, pointer, changes)
+    compare_enum(old.get("enum"), new.get("enum"), f"{pointer}/enum", changes)
+    for keyword in VARIANT_KEYWORDS:
+        compare_variants(keyword, old.get(keyword) or [], new.get(keyword) or [], f"{pointer}/{keyword}", changes)
+    for keyword in NESTED_KEYWORDS:
+        if keyword in old or keyword in new:
+            compare_schemas(old.get(keyword), new.get(keyword), f"{pointer}/{keyword}", changes)
+
+    for keyword in sorted((set(old) | set(new)) - COMPARED_KEYWORDS):
+        if old.get(keyword) == new.get(keyword):
+            continue
+        if keyword in DOC_KEYWORDS:
+            changes.append(Change(f"{pointer}/{keyword}", "documentation_changed", False, keyword))
+        elif keyword in CONSTRAINT_KEYWORDS:
+            changes.append(Change(f"{pointer}/{keyword}", "constraint_changed", False, f"{old.get(keyword)!r} → {new.get(keyword)!r}"))
+        else:
+            changes.append(Change(f"{pointer}/{keyword}", "keyword_changed", True, keyword))
+
+def compare_properties(old: Dict[str, Any], new: Dict[str, Any], pointer: str, changes: List[Change]):
+    """Added, removed and re-required properties; the properties both sides have are compared recursively"""
+    old_props = old.get("properties") or {}
+    new_props = new.get("properties") or {}
+    old_required = set(old.get("required") or [])
+    new_required = set(new.get("required") or [])
+
+    for prop_name in sorted(set(old_props) | set(new_props)):
+        prop_pointer = f"{pointer}/properties/{escape_pointer(prop_name)}"
+        if prop_name not in new_props:
+            changes.append(Change(prop_pointer, "property_removed", True, prop_name))
+        elif prop_name not in old_props:
+            if prop_name in new_required:
+                changes.append(Change(prop_pointer, "required_property_added", True, prop_name))
+            else:
+                changes.append(Change(prop_pointer, "optional_property_added", False, prop_name))
+        else:
+            # Optional properties are generated as nullable, so either direction changes the Kotlin type
+            if prop_name in old_required and prop_name not in new_required:
+                changes.append(Change(prop_pointer, "property_made_optional", True, prop_name))
+            elif prop_name in new_required and prop_name not in old_required:
+                changes.append(Change(prop_pointer, "property_made_required", True, prop_name))
+            compare_schemas(old_props[prop_name], new_props[prop_name], prop_pointer, changes)
+
+def compare_enum(old_values: Optional[List[Any]], new_values: Optional[List[Any]], pointer: str, changes: List[Change]):
+    if old_values == new_values:
+        return
+    old_keys = {canonical_json(value): value for value in old_values or []}
+    new_keys = {canonical_json(value): value for value in new_values or []}
+    for key in sorted(set(old_keys) - set(new_keys)):
+        changes.append(Change(pointer, "enum_value_removed", True, key))
+    for key in sorted(set(new_keys) - set(old_keys)):
+        changes.append(Change(pointer, "enum_value_added", False, key))
+
+def compare_variants(keyword: str, old_variants: List[Any], new_variants: List[Any], pointer: str, changes: List[Change]):
+    """
+    Variants are compared position by position when their number is unchanged, otherwise
+    as sets. A new oneOf/anyOf variant is additive; a new allOf member may add required fields.
+    """
+    if old_variants == new_variants:
+        return
+    if len(old_variants) == len(new_variants):
+        for index, (old_variant, new_variant) in enumerate(zip(old_variants, new_variants)):
+            compare_schemas(old_variant, new_variant, f"{pointer}/{index}", changes)
+        return
+    old_keys = {canonical_json(variant): variant for variant in old_variants}
+    new_keys = {canonical_json(variant): variant for variant in new_variants}
+    for key, variant in old_keys.items():
+        if key not in new_keys:
+            changes.append(Change(pointer, "variant_removed", True, variant_label(variant)))
+    for key, variant in new_keys.items():
+        if key not in old_keys:
+            changes.append(Change(pointer, "variant_added", keyword == "allOf", variant_label(variant)))
+
+def variant_label(variant: Any) -> str:
+    """Short human-readable name for a oneOf/anyOf/allOf member"""
+    if isinstance(variant, dict):
+        if "$ref" in variant:
+            return ref_label(variant["$ref"])
+        if "title" in variant:
+            return variant["title"]
+        if variant.get("enum"):
+            return ", ".join(json.dumps(value) for value in variant["enum"])
+        if isinstance(variant.get("properties"), dict) and variant["properties"]:
+            return "{" + ", ".join(variant["properties"]) + "}"
+        if "type" in variant:
+            return str(variant["type"])
+    return json.dumps(variant)
+
+def operation_schemas(operation: Dict[str, Any]) -> Dict[str, Any]:
+    """The request and response body schemas of an operation, keyed by JSON pointer"""
+    found = {}
+    for content_type, media in ((operation.get("requestBody") or {}).get("content") or {}).items():
+        found[f"/requestBody/content/{escape_pointer(content_type)}/schema"] = media.get("schema")
+    for status, response in (operation.get("responses") or {}).items():
+        for content_type, media in (response.get("content") or {}).items():
+            found[f"/responses/{escape_pointer(status)}/content/{escape_pointer(content_type)}/schema"] = media.get("schema")
+    return found
+
+def strip_operation(operation: Dict[str, Any]) -> Dict[str, Any]:
+    """An operation without its documentation and body schemas, for comparing what is left"""
+    stripped = copy.deepcopy(operation)
+    for keyword in ("description", "summary"):
+        stripped.pop(keyword, None)
+    for media in ((stripped.get("requestBody") or {}).get("content") or {}).values():
+        media.pop("schema", None)
+    for response in (stripped.get("responses") or {}).values():
+        response.pop("description", None)
+        for media in (response.get("content") or {}).values():
+            media.pop("schema", None)
+    return stripped
+
+def compare_operations(old_path: str, old: Dict[str, Any], new_path: str, new: Dict[str, Any]) -> List[Change]:
+    changes: List[Change] = []
+    if old_path != new_path:
+        changes.append(Change("", "path_changed", True, f"{old_path} → {new_path}"))
+    old_schemas = operation_schemas(old)
+    new_schemas = operation_schemas(new)
+    for pointer in sorted(set(old_schemas) | set(new_schemas)):
+        compare_schemas(old_schemas.get(pointer), new_schemas.get(pointer), pointer, changes)
+    for keyword in ("description", "summary"):
+        if old.get(keyword) != new.get(keyword):
+            changes.append(Change(f"/{keyword}", "documentation_changed", False, keyword))
+    if strip_operation(old) != strip_operation(new):
+        changes.append(Change("", "operation_changed", True, "request or response definition"))
+    return changes
+
+def method_index(ir: SchemaIR) -> Dict[str, Tuple[str, Dict[str, Any]]]:
+    """RPC method name (operationId, or the path without slashes) -> (path, post operation)"""
+    return {
+        (operation.get("operationId") or path.strip("/")): (path, operation)
+        for path, operation in ir.methods()
+    }
+
+def schema_entry(status: str, breaking: bool, changes: List[Change] = (), via: List[str] = ()) -> Dict[str, Any]:
+    return {
+        "status": status,
+        "breaking": breaking,
+        "changes": [change._asdict() for change in changes],
+        "via": list(via),
+    }
+
+def diff_schemas(old_ir: SchemaIR, new_ir: SchemaIR) -> Dict[str, Dict[str, Any]]:
+    """
+    Per-schema entries for every component that was added, removed or changed, directly
+    or through a schema it references. An indirect change is breaking when one of the
+    schemas it goes through changed in a breaking way or was removed.
+    """
+    entries: Dict[str, Dict[str, Any]] = {}
+    for name in old_ir.nodes.keys() - new_ir.nodes.keys():
+        entries[name] = schema_entry("removed", True)
+    for name in new_ir.nodes.keys() - old_ir.nodes.keys():
+        entries[name] = schema_entry("added", False)
+
+    common = sorted(old_ir.nodes.keys() & new_ir.nodes.keys())
+    for name in common:
+        if old_ir.schema_digest(name) != new_ir.schema_digest(name):
+            changes: List[Change] = []
+            compare_schemas(old_ir.components[name], new_ir.components[name], "", changes)
+            entries[name] = schema_entry("changed", any(change.breaking for change in changes), changes)
+
+    # Changes reached through $ref, resolved against the direct entries only
+    direct = dict(entries)
+    for name in common:
+        if old_ir.content_hash(name) == new_ir.content_hash(name):
+            continue
+        reachable = set(old_ir.transitive_refs(name)) | set(new_ir.transitive_refs(name))
+        via = sorted(ref for ref in reachable if ref in direct)
+        breaking_via = any(direct[ref]["breaking"] for ref in via)
+        entry = entries.get(name)
+        if entry is None:
+            entries[name] = schema_entry("changed_via_ref", breaking_via, via=via)
+        else:
+            entry["via"] = via
+            entry["breaking"] = entry["breaking"] or breaking_via
+
+    return dict(sorted(entries.items()))
+
+def diff_methods(old_ir: SchemaIR, new_ir: SchemaIR, schema_entries: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Per-method entries; a method is affected when its operation or a schema it uses changed"""
+    old_methods = method_index(old_ir)
+    new_methods = method_index(new_ir)
+    entries: Dict[str, Dict[str, Any]] = {}
+    for name in old_methods.keys() - new_methods.keys():
+        entries[name] = schema_entry("removed", True)
+    for name in new_methods.keys() - old_methods.keys():
+        entries[name] = schema_entry("added", False)
+
+    for name in old_methods.keys() & new_methods.keys():
+        old_path, old_operation = old_methods[name]
+        new_path, new_operation = new_methods[name]
+        changes = []
+        if old_path != new_path or canonical_json(old_operation) != canonical_json(new_operation):
+            changes = compare_operations(old_path, old_operation, new_path, new_operation)
+        roots = set(collect_ref_names(old_operation)) | set(collect_ref_names(new_operation))
+        via = sorted(root for root in roots if root in schema_entries)
+        if not changes and not via:
+            continue
+        breaking = any(change.breaking for change in changes) or any(schema_entries[root]["breaking"] for root in via)
+        entries[name] = schema_entry("changed" if changes else "changed_via_ref", breaking, changes, via)
+
+    return dict(sorted(entries.items()))
+
+def diff_specs(old_path: str, new_path: str) -> Dict[str, Any]:
+    """Build the change report for two spec files"""
+    old_ir = load_ir(old_path, use_cache=False)
+    new_ir = load_ir(new_path, use_cache=False)
+    schemas = diff_schemas(old_ir, new_ir)
+    methods = diff_methods(old_ir, new_ir, schemas)
+
+    # Name outputs after the symbols the types stage last emitted, like the mock stage does
+    symbols = load_symbols()
+    for name, entry in schemas.items():
+        ir = new_ir if name in new_ir.nodes else old_ir
+        entry["kotlin_name"] = symbols.symbol_for(name, ir.kotlin_name(name))
+
+    return {
+        "version": CHANGE_REPORT_VERSION,
+        "old": old_path,
+        "new": new_path,
+        "breaking": any(entry["breaking"] for entry in list(schemas.values()) + list(methods.values())),
+        "affected": {
+            "schemas": list(schemas),
+            "kotlin_types": sorted({entry["kotlin_name"] for entry in schemas.values()}),
+            "methods": list(methods),
+        },
+        "schemas": schemas,
+        "methods": methods,
+    }
+
+def load_change_report(path: str) -> Dict[str, Any]:
+    """Read a report written by --json; raises ValueError for a report of another format version"""
+    with open(path, "r", encoding="utf-8") as f:
+        report = json.load(f)
+    if report.get("version") != CHANGE_REPORT_VERSION:
+        raise ValueError(f"{path}: unsupported change report version {report.get('version')!r}")
+    return report
+
+def describe_change(change: Dict[str, Any]) -> str:
+    location = f" at `{change['pointer']}`" if change["pointer"] else ""
+    return f"{change['kind'].replace('_', ' ')}{location} ({change['detail']})"
+
+def describe_entry(name: str, entry: Dict[str, Any], max_changes: int) -> str:
+    line = f"- `{name}` — {STATUS_LABELS[entry['status']]}"
+    if entry["via"]:
+        line += (" via " if entry["status"] == "changed_via_ref" else ", also via ") + ", ".join(f"`{ref}`" for ref in entry["via"][:max_changes])
+        if len(entry["via"]) > max_changes:
+            line += f" and {len(entry['via']) - max_changes} more"
+    details = [describe_change(change) for change in entry["changes"]]
+    for detail in details[:max_changes]:
+        line += f"\n  - {detail}"
+    if len(details) > max_changes:
+        line += f"\n  - … {len(details) - max_changes} more"
+    return line
+
+def render_markdown(report: Dict[str, Any], max_changes: int = 5) -> str:
+    """Changelog for the generated PR: methods first, then schemas, breaking changes on top"""
+    lines = ["## OpenAPI spec changes", ""]
+    total = len(report["schemas"]) + len(report["methods"])
+    if not total:
+        lines.append("No schema or RPC method changes.")
+        return "\n".join(lines) + "\n"
+    breaking_count = sum(entry["breaking"] for section in ("schemas", "methods") for entry in report[section].values())
+    if breaking_count:
+        lines.append(f"⚠️ **{breaking_count} breaking change{'s' if breaking_count != 1 else ''}** out of {total}")
+    else:
+        lines.append(f"✅ No breaking changes ({total} in total)")
+
+    for section, title in (("methods", "RPC methods"), ("schemas", "Schemas")):
+        entries = report[section]
+        if not entries:
+            continue
+        lines += ["", f"### {title}"]
+        for breaking, heading in ((True, "Breaking"), (False, "Non-breaking")):
+            selected = [(name, entry) for name, entry in entries.items() if entry["breaking"] == breaking]
+            if selected:
+                lines += ["", f"#### {heading}", ""]
+                lines += [describe_entry(name, entry, max_changes) for name, entry in selected]
+    return "\n".join(lines) + "\n"
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two OpenAPI specs and report the affected schemas and RPC methods")
+    parser.add_argument("old", help="previous openapi.json")
+    parser.add_argument("new", help="new openapi.json")
+    parser.add_argument("--json", help="write the machine-readable change report to this file")
+    parser.add_argument("--markdown", help="write the Markdown changelog to this file")
+    parser.add_argument("--max-changes", type=int, default=5, help="changes listed per schema or method in the changelog")
+    parser.add_argument("--fail-on-breaking", action="store_true", help="exit with status 1 when a change is breaking")
+    args = parser.parse_args()
+
+    report = diff_specs(args.old, args.new)
+    markdown = render_markdown(report, args.max_changes)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+    if args.markdown:
+        with open(args.markdown, "w", encoding="utf-8") as f:
+            f.write(markdown)
+
+    affected = report["affected"]
+    print(f"🔍 {len(affected['schemas'])} schemas and {len(affected['methods'])} RPC methods affected")
+    if not args.markdown:
+        print()
+        print(markdown, end="")
+    if report["breaking"]:
+        print("⚠️  The new spec contains breaking changes")
+        if args.fail_on_breaking:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Derive larger synthetic OpenAPI specs from the real NEAR spec for stress-testing the generators.
+
+Transformations (all deterministic for a given --seed):
+- clone: every component schema and RPC path is copied factor - 1 times under a CopyN
+  suffix, with $refs pointing into the same copy. JsonRpcRequest_/JsonRpcResponse_ wrappers
+  keep their prefix, so each cloned method still has its request/response pair.
+- deepen allOf: selected object schemas are split into a chain of allOf levels, each
+  level holding a slice of the properties and referencing the next one.
+- widen unions: selected oneOf/anyOf schemas get extra variants cloned from their existing
+  ones with a new tag, so externally-tagged ({"Tag": {...}}), enum and discriminated
+  unions keep their shape.
+- recursive refs: selected object schemas get optional array properties pointing at
+  themselves and at another schema that points back.
+
+nullable fields are copied verbatim. With the default options only cloning happens, and
+--factor 1 reproduces the input.
+"""
+
+import argparse
+import copy
+import json
+import random
+from typing import Any, Dict, List, Optional, Set
+
+from schema_ir import COMPONENT_REF_PREFIX, OPENAPI_PATH, classify_schema, load_openapi
+
+WRAPPER_PREFIXES = ("JsonRpcRequest", "JsonRpcResponse")
+
+def rewrite_refs(value: Any, rename: Dict[str, str]) -> Any:
+    """Deep copy of `value` with every component $ref renamed through `rename`"""
+    if isinstance(value, dict):
+        result = {}
+        for key, item in value.items():
+            if key == "$ref" and isinstance(item, str) and item.startswith(COMPONENT_REF_PREFIX):
+                name = item[len(COMPONENT_REF_PREFIX):]
+                result[key] = COMPONENT_REF_PREFIX + rename.get(name, name)
+            else:
+                result[key] = rewrite_refs(item, rename)
+        return result
+    if isinstance(value, list):
+        return [rewrite_refs(item, rename) for item in value]
+    return value
+
+def ref_to(name: str) -> Dict[str, str]:
+    return {"$ref": f"{COMPONENT_REF_PREFIX}{name}"}
+
+def is_wrapper(name: str) -> bool:
+    """JSON-RPC request/response envelopes are kept as they are"""
+    return name.startswith(WRAPPER_PREFIXES)
+
+def clone_spec(spec: Dict[str, Any], factor: int):
+    """Add factor - 1 renamed copies of every component schema and path"""
+    schemas = spec["components"]["schemas"]
+    paths = spec["paths"]
+    original_schemas = dict(schemas)
+    original_paths = dict(paths)
+
+    for copy_idx in range(1, factor):
+        rename = {name: f"{name}Copy{copy_idx}" for name in original_schemas}
+        for name, schema in original_schemas.items():
+            schemas[rename[name]] = rewrite_refs(schema, rename)
+        for path, path_item in original_paths.items():
+            cloned = rewrite_refs(path_item, rename)
+            post_op = cloned.get("post")
+            if post_op and post_op.get("operationId"):
+                post_op["operationId"] = f"{post_op['operationId']}_copy{copy_idx}"
+            paths[f"{path}_copy{copy_idx}"] = cloned
+
+def deepen_allof(schemas: Dict[str, Any], name: str, depth: int) -> int:
+    """
+    Turn an object schema into an allOf chain of `depth` extra levels (<name>Level1..N).
+    Each level keeps a slice of the properties; returns the number of schemas added.
+    """
+    schema = schemas[name]
+    prop_names = list(schema["properties"])
+    required = set(schema.get("required", []))
+    levels = min(depth, len(prop_names) - 1)
+    if levels < 1:
+        return 0
+
+    chunk = -(-len(prop_names) // (levels + 1))
+    slices = [prop_names[i:i + chunk] for i in range(0, len(prop_names), chunk)]
+
+    def part(props: List[str]) -> Dict[str, Any]:
+        result = {"type": "object", "properties": {prop: schema["properties"][prop] for prop in props}}
+        part_required = [prop for prop in props if prop in required]
+        if part_required:
+            result["required"] = part_required
+        return result
+
+    level_names = [f"{name}Level{idx}" for idx in range(1, len(slices))]
+    for idx, level_name in enumerate(level_names):
+        props_part = part(slices[idx + 1])
+        if idx + 1 < len(level_names):
+            schemas[level_name] = {"allOf": [ref_to(level_names[idx + 1]), props_part]}
+        else:
+            schemas[level_name] = props_part
+
+    top = {key: value for key, value in schema.items() if key not in ("type", "properties", "required", "additionalProperties")}
+    top["allOf"] = [ref_to(level_names[0]), part(slices[0])]
+    schemas[name] = top
+    return len(level_names)
+
+def retag_variant(variant: Dict[str, Any], suffix: str, same_kind: Dict[str, List[str]],
+                  used_refs: Set[str], rng: random.Random) -> Optional[Dict[str, Any]]:
+    """Copy a union variant under a new tag, keeping its shape; None if it cannot be retagged"""
+    variant = copy.deepcopy(variant)
+    if variant.get("type") == "string" and variant.get("enum"):
+        variant["enum"] = [f"{value}_{suffix.lower()}" for value in variant["enum"]]
+        return variant
+
+    props = variant.get("properties")
+    if variant.get("type") == "object" and props:
+        # Internally discriminated: rename the discriminator value
+        for prop_schema in props.values():
+            if prop_schema.get("enum"):
+                prop_schema["enum"] = [f"{value}_{suffix.lower()}" for value in prop_schema["enum"]]
+                return variant
+        # Externally tagged ({"Tag": value}): rename the single wrapper key
+        if len(props) == 1:
+            tag = next(iter(props))
+            new_tag = f"{tag}{suffix}"
+            variant["properties"] = {new_tag: props[tag]}
+            if tag in variant.get("required", []):
+                variant["required"] = [new_tag if item == tag else item for item in variant["required"]]
+            return variant
+
+    ref = variant.get("$ref")
+    if isinstance(ref, str) and ref.startswith(COMPONENT_REF_PREFIX):
+        # Point at another component of the same kind so the variant names stay distinct
+        target = ref[len(COMPONENT_REF_PREFIX):]
+        candidates = same_kind.get(target, [])
+        for _ in range(8):
+            if not candidates:
+                break
+            candidate = rng.choice(candidates)
+            if candidate not in used_refs:
+                used_refs.add(candidate)
+                return ref_to(candidate)
+    return None
+
+def widen_union(schemas: Dict[str, Any], name: str, width: int, same_kind: Dict[str, List[str]], rng: random.Random) -> int:
+    """Add up to `width` retagged variants to a oneOf/anyOf schema; returns how many were added"""
+    schema = schemas[name]
+    union_key = "oneOf" if "oneOf" in schema else "anyOf"
+    variants = schema[union_key]
+    originals = list(variants)
+    used_refs = {v["$ref"][len(COMPONENT_REF_PREFIX):] for v in originals if isinstance(v.get("$ref"), str)}
+    added = 0
+    for idx in range(width):
+        new_variant = retag_variant(originals[idx % len(originals)], f"Wide{idx + 1}", same_kind, used_refs, rng)
+        if new_variant is not None:
+            variants.append(new_variant)
+            added += 1
+    return added
+
+def add_recursion(schemas: Dict[str, Any], name: str, partner: str):
+    """Give `name` a self reference and a reference to `partner`, which points back"""
+    schemas[name]["properties"]["children"] = {"type": "array", "items": ref_to(name)}
+    schemas[name]["properties"]["linked"] = {"type": "array", "items": ref_to(partner), "nullable": True}
+    schemas[partner]["properties"]["backlinks"] = {"type": "array", "items": ref_to(name)}
+
+def scale_spec(openapi: Dict[str, Any], factor: int = 1, allof_depth: int = 0, union_width: int = 0,
+               recursive: bool = False, rate: float = 0.2, seed: int = 0) -> Dict[str, Any]:
+    """
+    Return a scaled copy of `openapi`. `rate` is the fraction of eligible schemas each of
+    the allOf / union / recursion transformations is applied to.
+    """
+    spec = copy.deepcopy(openapi)
+    spec.setdefault("components", {}).setdefault("schemas", {})
+    spec.setdefault("paths", {})
+    clone_spec(spec, factor)
+
+    schemas = spec["components"]["schemas"]
+    rng = random.Random(seed)
+    names = sorted(name for name in schemas if not is_wrapper(name))
+    objects = [name for name in names if classify_schema(schemas[name]) == "object" and len(schemas[name].get("properties", {})) > 1]
+    unions = [name for name in names if classify_schema(schemas[name]) == "union" and schemas[name].get("oneOf", schemas[name].get("anyOf"))]
+
+    if union_width > 0:
+        by_kind: Dict[str, List[str]] = {}
+        for name in names:
+            by_kind.setdefault(classify_schema(schemas[name]), []).append(name)
+        same_kind = {name: by_kind[classify_schema(schemas[name])] for name in names}
+        for name in unions:
+            if rng.random() < rate:
+                widen_union(schemas, name, union_width, same_kind, rng)
+
+    if recursive:
+        candidates = [name for name in objects if rng.random() < rate]
+        for idx in range(0, len(candidates) - 1, 2):
+            add_recursion(schemas, candidates[idx], candidates[idx + 1])
+
+    if allof_depth > 0:
+        for name in objects:
+            if rng.random() < rate:
+                deepen_allof(schemas, name, allof_depth)
+
+    return spec
+
+def main():
+    parser = argparse.ArgumentParser(description="Derive a larger synthetic spec from openapi.json for stress tests")
+    parser.add_argument("--input", default=OPENAPI_PATH, help=f"spec to scale (default: {OPENAPI_PATH})")
+    parser.add_argument("--output", "-o", required=True, help="where to write the scaled spec")
+    parser.add_argument("--factor", type=int, default=2, help="how many copies of every schema and method to produce")
+    parser.add_argument("--allof-depth", type=int, default=0, help="extra allOf levels to split selected object schemas into")
+    parser.add_argument("--union-width", type=int, default=0, help="extra variants to add to selected oneOf/anyOf unions")
+    parser.add_argument("--recursive", action="store_true", help="add self and mutual $ref cycles to selected object schemas")
+    parser.add_argument("--rate", type=float, default=0.2, help="fraction of eligible schemas each transformation touches")
+    parser.add_argument("--seed", type=int, default=0, help="seed for choosing which schemas are transformed")
+    args = parser.parse_args()
+
+    openapi = load_openapi(args.input)
+    spec = scale_spec(openapi, args.factor, args.allof_depth, args.union_width, args.recursive, args.rate, args.seed)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(spec, f, indent=2)
+
+    before = len(openapi.get("components", {}).get("schemas", {}))
+    after = len(spec["components"]["schemas"])
+    print(f"📈 {before} → {after} schemas, {len(openapi.get('paths', {}))} → {len(spec['paths'])} paths")
+    print(f"💾 Written to {args.output}")
+
+if __name__ == "__main__":
+    main()
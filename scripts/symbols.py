@@ -0,0 +1,98 @@
+"""
+Kotlin symbol table shared by the generators.
+
+Unique names are handed out in constant time from a per-base suffix counter instead
+of probing Name2, Name3, ... one by one. The table also records which Kotlin symbol
+every schema was emitted as; generate_types.py saves that mapping in scripts/.cache/
+so the mock and test stages use the emitted names instead of re-deriving them.
+"""
+import json
+import os
+from typing import Dict, Iterable, Iterator, Optional, Set
+
+from codegen_cache import CACHE_DIR, scoped_cache_dir
+
+SYMBOLS_FILE = "symbols.json"
+SYMBOLS_PATH = os.path.join(CACHE_DIR, SYMBOLS_FILE)
+SYMBOLS_FORMAT_VERSION = 1
+
+def symbols_path(output_root: Optional[str] = None, cache_dir: str = CACHE_DIR) -> str:
+    """
+    Where the symbol table of a run lives: in the run's cache directory, or for a
+    --methods run (output_root set) in the .cache/ of its output tree, so it never
+    replaces the full one.
+    """
+    if output_root is None:
+        return os.path.join(cache_dir, SYMBOLS_FILE)
+    return os.path.join(scoped_cache_dir(output_root), SYMBOLS_FILE)
+
+class SymbolTable:
+    """Claimed Kotlin names plus the schema name -> Kotlin symbol mapping"""
+
+    def __init__(self, schema_symbols: Optional[Dict[str, str]] = None):
+        self._taken: Set[str] = set()
+        # Next numeric suffix to try per base name; every smaller suffix is already taken
+        self._next_suffix: Dict[str, int] = {}
+        self.schema_symbols: Dict[str, str] = dict(schema_symbols or {})
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._taken
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._taken)
+
+    def __len__(self) -> int:
+        return len(self._taken)
+
+    def names(self) -> Set[str]:
+        return set(self._taken)
+
+    def claim(self, name: str) -> bool:
+        """Take `name` as is; returns False if it was already taken"""
+        if name in self._taken:
+            return False
+        self._taken.add(name)
+        return True
+
+    def update(self, names: Iterable[str]):
+        self._taken.update(names)
+
+    def allocate(self, base: str, first_suffix: int = 2) -> str:
+        """Claim `base`, or `base` plus the next free numeric suffix (starting at first_suffix) if it is taken"""
+        if self.claim(base):
+            return base
+        suffix = self._next_suffix.get(base, first_suffix)
+        # Only names claimed verbatim (e.g. a schema called Foo2) are skipped here
+        while f"{base}{suffix}" in self._taken:
+            suffix += 1
+        self._taken.add(f"{base}{suffix}")
+        self._next_suffix[base] = suffix + 1
+        return f"{base}{suffix}"
+
+    def bind(self, schema_name: str, symbol: str):
+        """Record the Kotlin symbol emitted for a schema (the first binding wins)"""
+        self.schema_symbols.setdefault(schema_name, symbol)
+
+    def symbol_for(self, schema_name: str, default: Optional[str] = None) -> Optional[str]:
+        return self.schema_symbols.get(schema_name, default)
+
+    def schemas_by_symbol(self) -> Dict[str, str]:
+        """Reverse mapping, Kotlin symbol -> schema name"""
+        return {symbol: schema_name for schema_name, symbol in self.schema_symbols.items()}
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "version": SYMBOLS_FORMAT_VERSION,
+            "schemas": dict(sorted(self.schema_symbols.items())),
+        }, indent=2) + "\n"
+
+def load_symbols(path: str = SYMBOLS_PATH) -> SymbolTable:
+    """Load the schema -> symbol mapping saved by the types stage (empty if missing or outdated)"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return SymbolTable()
+    if data.get("version") != SYMBOLS_FORMAT_VERSION:
+        return SymbolTable()
+    return SymbolTable(data.get("schemas", {}))
@@ -0,0 +1 @@
+"""Unit tests for the code generators (run from scripts/: python -m unittest discover -s tests)"""
@@ -0,0 +1,48 @@
+"""Tests for --dedupe hash-consing of structurally identical types"""
+import tempfile
+import unittest
+
+from codegen_cache import FragmentCache
+from generate_types import dedupe_fragments, generate_type_fragments, shape_key
+from schema_ir import SchemaIR
+
+def ref(name):
+    return {"$ref": f"#/components/schemas/{name}"}
+
+VIEW = {"type": "object", "properties": {"amount": {"type": "string"}, "nonce": {"type": "integer"}}, "required": ["amount"]}
+
+SCHEMAS = {
+    "AccountView": {**VIEW, "description": "An account"},
+    "ContractView": {**VIEW, "description": "A contract"},
+    "AccountResult": {"type": "object", "properties": {"view": ref("AccountView")}, "required": ["view"]},
+    "ContractResult": {"type": "object", "properties": {"view": ref("ContractView")}, "required": ["view"]},
+    "Other": {"type": "object", "properties": {"amount": {"type": "integer"}}},
+}
+
+class DedupeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.ir = SchemaIR({"openapi": "3.0.0", "paths": {}, "components": {"schemas": SCHEMAS}})
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = FragmentCache("types", "test", enabled=False, cache_dir=tmp)
+            self.fragments, self.symbols = generate_type_fragments(self.ir, cache)
+
+    def test_identical_shapes_and_their_dependents_are_merged(self):
+        _, duplicates = dedupe_fragments(self.ir, self.fragments, self.symbols)
+        self.assertEqual(duplicates, {"ContractView": "AccountView", "ContractResult": "AccountResult"})
+
+    def test_duplicates_become_typealiases(self):
+        deduped, _ = dedupe_fragments(self.ir, self.fragments, self.symbols)
+        code = dict(deduped)
+        self.assertIn("typealias ContractView = AccountView", code["ContractView"])
+        self.assertIn("A contract", code["ContractView"])
+        self.assertEqual(code["ContractResult"].strip(), "typealias ContractResult = AccountResult")
+        self.assertEqual(code["Other"], dict(self.fragments)["Other"])
+        self.assertEqual([name for name, _ in deduped], [name for name, _ in self.fragments])
+
+    def test_shape_key_ignores_descriptions(self):
+        self.assertEqual(shape_key(SCHEMAS["AccountView"]), shape_key(SCHEMAS["ContractView"]))
+        self.assertNotEqual(shape_key(SCHEMAS["AccountView"]), shape_key(SCHEMAS["Other"]))
+
+if __name__ == "__main__":
+    unittest.main()
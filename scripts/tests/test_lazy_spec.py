@@ -0,0 +1,87 @@
+"""Tests for the lazily parsed spec"""
+import json
+import os
+import pickle
+import tempfile
+import unittest
+
+from lazy_spec import LazySchemas, index_object, load_lazy_openapi, value_end
+from schema_ir import scope_openapi
+
+SPEC = {
+    "openapi": "3.0.0",
+    "info": {"title": "brackets } ] { [ and \"quotes\" \\", "version": "1"},
+    "paths": {
+        "/block": {"post": {"operationId": "block", "requestBody": {"content": {"application/json": {"schema": {"$ref": "#/components/schemas/Block"}}}}}},
+    },
+    "components": {
+        "schemas": {
+            "Block": {"type": "object", "properties": {"header": {"$ref": "#/components/schemas/Header"}}},
+            "Header": {"type": "object", "description": "escaped \\\" } and unicode é中", "properties": {}},
+            "Heights": {"type": "array", "items": {"type": "integer"}, "example": [1, [2, [3]], {"a": []}]},
+            "Empty": {},
+        },
+        "securitySchemes": {"none": {}},
+    },
+}
+
+class LazySpecTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "openapi.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write_spec(self, **dump_args):
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(SPEC, f, **dump_args)
+        return load_lazy_openapi(self.path)
+
+    def test_matches_json_load(self):
+        for dump_args in ({}, {"indent": 2}, {"ensure_ascii": False}, {"separators": (",", ":")}):
+            openapi = self.write_spec(**dump_args)
+            with open(self.path, "r", encoding="utf-8") as f:
+                expected = json.load(f)
+            self.assertEqual(openapi["components"]["schemas"], expected["components"]["schemas"], dump_args)
+            self.assertEqual({**openapi, "components": None}, {**expected, "components": None}, dump_args)
+
+    def test_schemas_are_parsed_on_first_lookup(self):
+        schemas = self.write_spec(indent=2)["components"]["schemas"]
+        self.assertIsInstance(schemas, LazySchemas)
+        self.assertEqual(list(schemas), ["Block", "Header", "Heights", "Empty"])
+        self.assertIn("Empty", schemas)
+        self.assertEqual(schemas.materialized, 0)
+        self.assertEqual(schemas["Header"]["type"], "object")
+        self.assertEqual(schemas.materialized, 1)
+
+    def test_scoping_only_parses_what_it_reaches(self):
+        openapi = self.write_spec()
+        scoped = scope_openapi(openapi, ["block"])
+        self.assertEqual(list(scoped["components"]["schemas"]), ["Block", "Header"])
+        self.assertEqual(openapi["components"]["schemas"].materialized, 2)
+
+    def test_pickles_as_a_plain_dict(self):
+        schemas = self.write_spec()["components"]["schemas"]
+        restored = pickle.loads(pickle.dumps(schemas))
+        self.assertIs(type(restored), dict)
+        self.assertEqual(restored, SPEC["components"]["schemas"])
+
+    def test_value_end(self):
+        buf = b'{"a": "}]\\"", "b": [1, {"c": []}]} tail'
+        self.assertEqual(value_end(buf, 0), buf.index(b" tail"))
+        self.assertEqual(value_end(buf, buf.index(b"[")), buf.index(b"}", buf.index(b"[")) + 2)
+        with self.assertRaises(ValueError):
+            value_end(b'{"a": [1, 2}', 0)
+        with self.assertRaises(ValueError):
+            value_end(b'{"a": "unterminated', 0)
+
+    def test_index_object(self):
+        buf = b' {"x": 1, "y": {"z": [true]}} '
+        index, end = index_object(buf, 1)
+        self.assertEqual(end, len(buf) - 1)
+        self.assertEqual({key: buf[start:stop] for key, (start, stop) in index.items()}, {"x": b"1", "y": b'{"z": [true]}'})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+"""Tests for write-if-changed output"""
+import os
+import tempfile
+import unittest
+
+from output_writer import (
+    REPO_ROOT, OutputWriter, check_output_root, load_output_digests, record_formatted_outputs, relocate_output,
+)
+
+class OutputWriterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.tmp.name, ".cache")
+        self.out_dir = os.path.join(self.tmp.name, "out")
+        self.path = os.path.join(self.out_dir, "Types.kt")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, content, path=None):
+        writer = OutputWriter("types", cache_dir=self.cache_dir)
+        written = writer.write(path or self.path, content)
+        writer.save()
+        return written
+
+    def read(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            return f.read()
+
+    def test_unchanged_output_keeps_its_mtime(self):
+        self.assertTrue(self.write("class A\n"))
+        os.utime(self.path, (0, 0))
+        self.assertFalse(self.write("class A\n"))
+        self.assertEqual(os.stat(self.path).st_mtime, 0)
+        self.assertTrue(self.write("class B\n"))
+        self.assertEqual(self.read(), "class B\n")
+
+    def test_formatted_output_is_kept(self):
+        self.write("class A{}\n")
+        # What ktlintFormat would leave behind
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write("class A {}\n")
+        self.assertEqual(record_formatted_outputs(self.cache_dir), 1)
+        os.utime(self.path, (0, 0))
+        self.assertFalse(self.write("class A{}\n"))
+        self.assertEqual(self.read(), "class A {}\n")
+        self.assertEqual(os.stat(self.path).st_mtime, 0)
+        self.assertTrue(self.write("class B{}\n"))
+        self.assertEqual(self.read(), "class B{}\n")
+
+    def test_edited_output_is_rewritten(self):
+        self.write("class A\n")
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write("class A // edited\n")
+        self.assertTrue(self.write("class A\n"))
+        self.assertEqual(self.read(), "class A\n")
+
+    def test_remove_orphans(self):
+        writer = OutputWriter("mock", cache_dir=self.cache_dir)
+        writer.write(os.path.join(self.out_dir, "kept.json"), "{}")
+        for name in ("stale.json", "notes.txt"):
+            with open(os.path.join(self.out_dir, name), "w", encoding="utf-8") as f:
+                f.write("{}")
+        removed = writer.remove_orphans(self.out_dir, lambda path: path.endswith(".json"))
+        writer.save()
+        self.assertEqual(removed, [os.path.join(self.out_dir, "stale.json")])
+        self.assertEqual(sorted(os.listdir(self.out_dir)), ["kept.json", "notes.txt"])
+        self.assertEqual(list(load_output_digests(self.cache_dir)), [os.path.abspath(os.path.join(self.out_dir, "kept.json"))])
+        self.assertEqual(writer.summary(), "mock outputs: 1 changed, 0 unchanged, 1 removed")
+
+    def test_stages_merge_their_records(self):
+        first = OutputWriter("types", cache_dir=self.cache_dir)
+        second = OutputWriter("tests", cache_dir=self.cache_dir)
+        first.write(self.path, "class A\n")
+        second.write(os.path.join(self.out_dir, "Test.kt"), "class T\n")
+        first.save()
+        second.save()
+        self.assertEqual(len(load_output_digests(self.cache_dir)), 2)
+
+class OutputRootTest(unittest.TestCase):
+
+    def test_relocate_output(self):
+        self.assertEqual(relocate_output("../types/Types.kt", None), "../types/Types.kt")
+        self.assertEqual(relocate_output("../types/Types.kt", "/tmp/out"), os.path.join("/tmp/out", "types", "Types.kt"))
+
+    def test_check_output_root(self):
+        check_output_root(None, None)
+        check_output_root(["block"], "/tmp/out")
+        with self.assertRaises(ValueError):
+            check_output_root(["block"], None)
+        with self.assertRaises(ValueError):
+            check_output_root(["block"], REPO_ROOT)
+
+if __name__ == "__main__":
+    unittest.main()
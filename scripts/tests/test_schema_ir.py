@@ -0,0 +1,129 @@
+"""Tests for the schema IR: $ref dependency graph, content hashes and method scoping"""
+import unittest
+
+from schema_ir import SchemaIR, UnknownMethodsError, parse_method_allowlist, scope_openapi
+
+def ref(name):
+    return {"$ref": f"#/components/schemas/{name}"}
+
+def make_openapi(schemas, paths=None):
+    return {"openapi": "3.0.0", "paths": paths or {}, "components": {"schemas": schemas}}
+
+def object_with(*names):
+    return {"type": "object", "properties": {name.lower(): ref(name) for name in names}}
+
+def method_path(operation_id, request, response):
+    return {
+        "post": {
+            "operationId": operation_id,
+            "requestBody": {"content": {"application/json": {"schema": ref(request)}}},
+            "responses": {"200": {"content": {"application/json": {"schema": ref(response)}}}},
+        }
+    }
+
+class DependencyGraphTest(unittest.TestCase):
+
+    def setUp(self):
+        # Entry -> Tree <-> Forest, Tree -> Leaf; Node refers to itself; Lone stands alone
+        self.schemas = {
+            "Entry": object_with("Tree"),
+            "Tree": object_with("Forest", "Leaf"),
+            "Forest": {"type": "array", "items": ref("Tree")},
+            "Leaf": {"type": "string"},
+            "Node": object_with("Node"),
+            "Lone": {"type": "integer"},
+        }
+        self.graph = SchemaIR(make_openapi(self.schemas)).graph
+
+    def test_sccs_come_dependencies_first(self):
+        position = {name: index for index, name in enumerate(self.graph.order)}
+        for name, refs in self.graph.edges.items():
+            for dependency in refs:
+                if self.graph.scc_of(name) != self.graph.scc_of(dependency):
+                    self.assertLess(position[dependency], position[name], f"{dependency} after {name}")
+
+    def test_cycle_members_are_one_sorted_scc(self):
+        self.assertEqual(self.graph.scc_of("Tree"), ("Forest", "Tree"))
+        self.assertEqual(self.graph.scc_of("Forest"), ("Forest", "Tree"))
+        self.assertIn(("Forest", "Tree"), self.graph.sccs)
+        self.assertEqual(len(self.graph.order), len(self.schemas))
+
+    def test_recursive_schemas(self):
+        self.assertEqual(self.graph.recursive_schemas(), {"Tree", "Forest", "Node"})
+        self.assertFalse(self.graph.is_recursive("Entry"))
+        self.assertFalse(self.graph.is_recursive("Lone"))
+
+    def test_order_does_not_depend_on_spec_order(self):
+        reordered = dict(reversed(list(self.schemas.items())))
+        self.assertEqual(SchemaIR(make_openapi(reordered)).graph.sccs, self.graph.sccs)
+
+    def test_deep_chain_does_not_hit_the_recursion_limit(self):
+        depth = 5000
+        schemas = {f"S{i}": object_with(f"S{i + 1}") for i in range(depth)}
+        schemas[f"S{depth}"] = {"type": "string"}
+        graph = SchemaIR(make_openapi(schemas)).graph
+        self.assertEqual(graph.order[0], f"S{depth}")
+        self.assertEqual(graph.order[-1], "S0")
+
+class ContentHashTest(unittest.TestCase):
+
+    def setUp(self):
+        self.schemas = {
+            "Outer": object_with("Inner"),
+            "Inner": object_with("Leaf"),
+            "Leaf": {"type": "string"},
+            "Other": {"type": "integer"},
+        }
+
+    def test_hash_covers_referenced_schemas(self):
+        old = SchemaIR(make_openapi(self.schemas))
+        new = SchemaIR(make_openapi({**self.schemas, "Leaf": {"type": "integer"}}))
+        for name in ("Outer", "Inner", "Leaf"):
+            self.assertNotEqual(old.content_hash(name), new.content_hash(name), name)
+        self.assertEqual(old.content_hash("Other"), new.content_hash("Other"))
+        self.assertEqual(old.schema_digest("Outer"), new.schema_digest("Outer"))
+
+    def test_transitive_refs_exclude_the_schema_itself(self):
+        ir = SchemaIR(make_openapi({**self.schemas, "Leaf": object_with("Outer")}))
+        self.assertEqual(ir.transitive_refs("Outer"), ("Inner", "Leaf"))
+
+class ScopeOpenapiTest(unittest.TestCase):
+
+    def setUp(self):
+        self.openapi = make_openapi(
+            {
+                "Request_a": object_with("Shared"),
+                "Response_a": object_with("Result_a"),
+                "Result_a": {"type": "string"},
+                "Shared": {"type": "integer"},
+                "Request_b": object_with("Shared"),
+                "Response_b": {"type": "boolean"},
+                "Unused": {"type": "string"},
+            },
+            {
+                "/a": method_path("a", "Request_a", "Response_a"),
+                "/b": method_path("b", "Request_b", "Response_b"),
+            },
+        )
+
+    def test_keeps_the_ref_closure_of_the_selected_methods(self):
+        scoped = scope_openapi(self.openapi, ["a"])
+        self.assertEqual(list(scoped["paths"]), ["/a"])
+        self.assertEqual(set(scoped["components"]["schemas"]), {"Request_a", "Response_a", "Result_a", "Shared"})
+
+    def test_scoped_hashes_match_the_full_spec(self):
+        full = SchemaIR(self.openapi)
+        scoped = SchemaIR(scope_openapi(self.openapi, ["a"]))
+        for name in scoped.nodes:
+            self.assertEqual(scoped.content_hash(name), full.content_hash(name), name)
+
+    def test_unknown_method(self):
+        with self.assertRaises(UnknownMethodsError) as raised:
+            scope_openapi(self.openapi, ["a", "missing"])
+        self.assertIn("missing", str(raised.exception))
+
+    def test_parse_method_allowlist(self):
+        self.assertEqual(parse_method_allowlist("b, a a\nc"), ("a", "b", "c"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+"""Tests for the classification of spec changes"""
+import unittest
+
+from schema_ir import SchemaIR
+from spec_diff import compare_schemas, diff_schemas
+
+def ref(name):
+    return {"$ref": f"#/components/schemas/{name}"}
+
+def changes_between(old, new):
+    changes = []
+    compare_schemas(old, new, "", changes)
+    return [(change.pointer, change.kind, change.breaking) for change in changes]
+
+def make_ir(schemas):
+    return SchemaIR({"openapi": "3.0.0", "paths": {}, "components": {"schemas": schemas}})
+
+BLOCK = {
+    "type": "object",
+    "properties": {"hash": {"type": "string"}, "height": {"type": "integer"}},
+    "required": ["hash"],
+}
+
+class CompareSchemasTest(unittest.TestCase):
+
+    def test_identical_schemas(self):
+        self.assertEqual(changes_between(BLOCK, dict(BLOCK)), [])
+
+    def test_properties(self):
+        new = {
+            "type": "object",
+            "properties": {"height": {"type": "integer"}, "author": {"type": "string"}, "chunks": {"type": "integer"}},
+            "required": ["chunks", "height"],
+        }
+        self.assertEqual(changes_between(BLOCK, new), [
+            ("/properties/author", "optional_property_added", False),
+            ("/properties/chunks", "required_property_added", True),
+            ("/properties/hash", "property_removed", True),
+            ("/properties/height", "property_made_required", True),
+        ])
+        self.assertEqual(changes_between({**BLOCK, "required": []}, BLOCK), [("/properties/hash", "property_made_required", True)])
+        self.assertEqual(changes_between(BLOCK, {**BLOCK, "required": []}), [("/properties/hash", "property_made_optional", True)])
+
+    def test_nested_type_change(self):
+        new = {**BLOCK, "properties": {**BLOCK["properties"], "height": {"type": "string"}}}
+        self.assertEqual(changes_between(BLOCK, new), [("/properties/height/type", "type_changed", True)])
+
+    def test_enum_values(self):
+        self.assertEqual(changes_between({"enum": ["a", "b"]}, {"enum": ["b", "c"]}), [
+            ("/enum", "enum_value_removed", True),
+            ("/enum", "enum_value_added", False),
+        ])
+
+    def test_variants(self):
+        self.assertEqual(changes_between({"oneOf": [ref("A")]}, {"oneOf": [ref("A"), ref("B")]}), [("/oneOf", "variant_added", False)])
+        self.assertEqual(changes_between({"allOf": [ref("A")]}, {"allOf": [ref("A"), ref("B")]}), [("/allOf", "variant_added", True)])
+        self.assertEqual(changes_between({"anyOf": [ref("A"), ref("B")]}, {"anyOf": [ref("A")]}), [("/anyOf", "variant_removed", True)])
+        # Same number of variants: compared position by position
+        self.assertEqual(changes_between({"oneOf": [ref("A")]}, {"oneOf": [ref("B")]}), [("/oneOf/0", "ref_changed", True)])
+
+    def test_keywords(self):
+        self.assertEqual(changes_between({**BLOCK, "description": "old"}, {**BLOCK, "description": "new"}), [("/description", "documentation_changed", False)])
+        self.assertEqual(changes_between({"type": "string"}, {"type": "string", "maxLength": 64}), [("/maxLength", "constraint_changed", False)])
+        self.assertEqual(changes_between({"type": "object"}, {"type": "object", "discriminator": {}}), [("/discriminator", "keyword_changed", True)])
+        self.assertEqual(changes_between({"type": "string"}, {"type": "string", "format": "uint64"}), [("/format", "format_changed", True)])
+
+class DiffSchemasTest(unittest.TestCase):
+
+    def setUp(self):
+        self.old = {
+            "Block": {"type": "object", "properties": {"header": ref("Header")}},
+            "Header": {"type": "object", "properties": {"height": {"type": "integer"}}},
+            "Chunk": {"type": "object", "properties": {"header": ref("Header")}, "description": "chunk"},
+            "Gone": {"type": "string"},
+        }
+
+    def test_statuses(self):
+        new = dict(self.old)
+        del new["Gone"]
+        new["Fresh"] = {"type": "string"}
+        new["Chunk"] = {**self.old["Chunk"], "description": "a chunk"}
+        new["Header"] = {"type": "object", "properties": {"height": {"type": "integer"}, "author": {"type": "string"}}}
+        entries = diff_schemas(make_ir(self.old), make_ir(new))
+        self.assertEqual({name: entry["status"] for name, entry in entries.items()}, {
+            "Block": "changed_via_ref",
+            "Chunk": "changed",
+            "Fresh": "added",
+            "Gone": "removed",
+            "Header": "changed",
+        })
+        self.assertFalse(entries["Header"]["breaking"])
+        self.assertEqual(entries["Block"]["via"], ["Header"])
+        self.assertFalse(entries["Block"]["breaking"])
+        self.assertEqual(entries["Chunk"]["via"], ["Header"])
+        self.assertTrue(entries["Gone"]["breaking"])
+        self.assertFalse(entries["Fresh"]["breaking"])
+
+    def test_breaking_change_propagates_through_refs(self):
+        new = {**self.old, "Header": {"type": "object", "properties": {}}}
+        entries = diff_schemas(make_ir(self.old), make_ir(new))
+        self.assertTrue(entries["Header"]["breaking"])
+        self.assertEqual(entries["Block"]["status"], "changed_via_ref")
+        self.assertTrue(entries["Block"]["breaking"])
+        self.assertNotIn("Gone", entries)
+
+if __name__ == "__main__":
+    unittest.main()
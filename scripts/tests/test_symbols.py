@@ -0,0 +1,59 @@
+"""Tests for the Kotlin symbol table"""
+import os
+import tempfile
+import unittest
+
+from codegen_cache import scoped_cache_dir
+from symbols import SYMBOLS_FILE, SymbolTable, load_symbols, symbols_path
+
+class SymbolTableTest(unittest.TestCase):
+
+    def test_allocate_suffixes_taken_names(self):
+        symbols = SymbolTable()
+        self.assertEqual(symbols.allocate("Foo"), "Foo")
+        self.assertEqual(symbols.allocate("Foo"), "Foo2")
+        self.assertEqual(symbols.allocate("Foo"), "Foo3")
+        self.assertEqual(symbols.allocate("Bar", first_suffix=1), "Bar")
+        self.assertEqual(symbols.allocate("Bar", first_suffix=1), "Bar1")
+
+    def test_allocate_skips_names_claimed_verbatim(self):
+        symbols = SymbolTable()
+        self.assertTrue(symbols.claim("Foo"))
+        self.assertTrue(symbols.claim("Foo2"))
+        self.assertFalse(symbols.claim("Foo"))
+        self.assertEqual(symbols.allocate("Foo"), "Foo3")
+        self.assertEqual(symbols.names(), {"Foo", "Foo2", "Foo3"})
+
+    def test_first_binding_wins(self):
+        symbols = SymbolTable()
+        symbols.bind("block_id", "BlockId")
+        symbols.bind("block_id", "BlockId2")
+        self.assertEqual(symbols.symbol_for("block_id"), "BlockId")
+        self.assertEqual(symbols.symbol_for("missing", "Fallback"), "Fallback")
+        self.assertEqual(symbols.schemas_by_symbol(), {"BlockId": "block_id"})
+
+    def test_round_trip(self):
+        symbols = SymbolTable()
+        symbols.bind("b", symbols.allocate("Name"))
+        symbols.bind("a", symbols.allocate("Name"))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, SYMBOLS_FILE)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(symbols.to_json())
+            loaded = load_symbols(path)
+        self.assertEqual(loaded.schema_symbols, {"a": "Name2", "b": "Name"})
+
+    def test_missing_or_outdated_file_loads_empty(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.assertEqual(len(load_symbols(os.path.join(tmp, SYMBOLS_FILE))), 0)
+            path = os.path.join(tmp, "old.json")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write('{"version": 0, "schemas": {"a": "A"}}')
+            self.assertEqual(load_symbols(path).schema_symbols, {})
+
+    def test_scoped_runs_keep_their_table_in_the_output_root(self):
+        self.assertEqual(symbols_path(cache_dir="cache"), os.path.join("cache", SYMBOLS_FILE))
+        self.assertEqual(symbols_path("out", cache_dir="cache"), os.path.join(scoped_cache_dir("out"), SYMBOLS_FILE))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+"""
+Span tracing for the generators, written as Chrome trace-event JSON.
+
+Open the trace in chrome://tracing or https://ui.perfetto.dev to see which stages,
+schemas and validation attempts dominate a run. Tracing is off unless a generator is
+started with --profile; span() is then a shared no-op context manager.
+"""
+import contextlib
+import functools
+import json
+import os
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+DEFAULT_TRACE_PATH = "codegen-trace.json"
+
+class Tracer:
+    """Collects complete ("X") trace events with microsecond timestamps"""
+
+    def __init__(self):
+        # Only needed once tracing is on, so plain runs do not import threading
+        import threading
+        self.events: List[Dict[str, Any]] = []
+        self._origin = time.perf_counter()
+        self._pid = os.getpid()
+        self._thread_id = threading.get_ident
+
+    def _now_us(self) -> float:
+        return (time.perf_counter() - self._origin) * 1e6
+
+    @contextlib.contextmanager
+    def span(self, name: str, category: str, **args: Any) -> Iterator[Dict[str, Any]]:
+        """Record the duration of the block; the yielded dict can be filled with extra args"""
+        start = self._now_us()
+        try:
+            yield args
+        finally:
+            self.events.append({
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                "ts": round(start, 3),
+                "dur": round(self._now_us() - start, 3),
+                "pid": self._pid,
+                "tid": self._thread_id(),
+                "args": args,
+            })
+
+    def save(self, path: str):
+        """Write the collected events as a Chrome trace file"""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, f)
+
+# Active tracer; None while tracing is off
+_tracer: Optional[Tracer] = None
+
+class _NullSpan(contextlib.AbstractContextManager):
+    """Shared do-nothing span used while tracing is off"""
+
+    def __enter__(self) -> Dict[str, Any]:
+        return {}
+
+    def __exit__(self, *exc_info: Any) -> None:
+        return None
+
+_null_span = _NullSpan()
+
+def span(name: str, category: str = "codegen", **args: Any) -> contextlib.AbstractContextManager:
+    """Context manager recording one span on the active tracer (a no-op when tracing is off)"""
+    if _tracer is None:
+        return _null_span
+    return _tracer.span(name, category, **args)
+
+def traced(category: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """Decorator recording one span per call, named after the call's first argument (the schema name)"""
+    def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if _tracer is None:
+                return func(*args, **kwargs)
+            with _tracer.span(str(args[0]) if args else func.__name__, category, function=func.__name__):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def add_profile_arguments(parser: Any):
+    """Add the --profile and --cprofile options shared by every generator"""
+    parser.add_argument("--profile", nargs="?", const=DEFAULT_TRACE_PATH, metavar="TRACE_JSON",
+                        help=f"record stage/schema/validation spans as Chrome trace events (default file: {DEFAULT_TRACE_PATH})")
+    parser.add_argument("--cprofile", metavar="PSTATS", help="also write a cProfile dump (readable with pstats or snakeviz)")
+
+@contextlib.contextmanager
+def profiling(trace_path: Optional[str] = None, cprofile_path: Optional[str] = None) -> Iterator[None]:
+    """Enable span tracing and/or cProfile for the block and write the results when it ends"""
+    global _tracer
+    if trace_path:
+        _tracer = Tracer()
+    profiler = None
+    if cprofile_path:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(cprofile_path)
+            print(f"🔬 cProfile stats written to {cprofile_path}")
+        if _tracer is not None:
+            _tracer.save(trace_path)
+            print(f"🔬 Trace ({len(_tracer.events)} spans) written to {trace_path}")
+            _tracer = None